@@ -0,0 +1,75 @@
+"""Compares the ways thonny-edulint can run EduLint on files of different sizes.
+
+- subprocess: a fresh `python -m edulint check --json` per check (the default)
+- in-process: check_to_json() called repeatedly in this process (what the in-process engine does)
+
+The first in-process check pays for importing edulint and pylint, it is reported separately.
+
+    PYTHONPATH=.. python3 benchmark_engines.py [--rounds N] [--sizes 20,200,1000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FUNCTION_TEMPLATE = '''
+def function_{i}(values):
+    result = []
+    for i in range(len(values)):
+        if values[i] % 2 == 0 == True:
+            result.append(values[i] * {i})
+    return result
+'''
+
+
+def generate_source(n_lines: int) -> str:
+    lines_per_function = FUNCTION_TEMPLATE.count("\n")
+    return "".join(FUNCTION_TEMPLATE.format(i=i) for i in range(max(1, n_lines // lines_per_function)))
+
+
+def time_subprocess(path: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "edulint", "check", "--disable-version-check", "--json", path],
+        capture_output=True, check=False
+    )
+    return time.perf_counter() - start
+
+
+def time_in_process(path: str) -> float:
+    from thonnycontrib.edulint.worker_server import check_to_json
+
+    start = time.perf_counter()
+    check_to_json([path], [])
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--sizes", default="20,200,1000", help="comma separated numbers of lines")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for size in map(int, args.sizes.split(",")):
+            paths[size] = os.path.join(tmp, f"lines_{size}.py")
+            with open(paths[size], "w", encoding="utf8") as f:
+                f.write(generate_source(size))
+
+        first = time_in_process(paths[min(paths)])
+        print(f"first in-process check (includes imports): {first * 1000:.0f} ms")
+        print(f"{'lines':>6} {'subprocess':>12} {'in-process':>12} {'speedup':>8}")
+
+        for size, path in paths.items():
+            sub = statistics.median(time_subprocess(path) for _ in range(args.rounds))
+            inp = statistics.median(time_in_process(path) for _ in range(args.rounds))
+            print(f"{size:>6} {sub * 1000:>9.0f} ms {inp * 1000:>9.0f} ms {sub / inp:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
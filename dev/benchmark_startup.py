@@ -0,0 +1,99 @@
+"""Measures what thonny-edulint adds to Thonny's startup.
+
+Each round runs in a fresh interpreter, which first imports the Thonny modules Thonny itself
+would already have loaded, then times `import thonnycontrib.edulint` and `load_plugin()`
+against a stand-in workbench (no Tk window is created).
+
+    PYTHONPATH=.. python3 benchmark_startup.py [--rounds N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules the plugin should only import on first use, not at startup
+HEAVY_MODULES = ["requests", "mistune", "platformdirs", "dataclasses_json", "sqlite3", "docutils", "edulint"]
+
+ROUND_SCRIPT = r"""
+import json, sys, time
+
+# what Thonny has imported anyway by the time it loads plugins
+import thonny, thonny.ui_utils, thonny.config_ui, thonny.running, thonny.rst_utils, thonny.tktextext
+
+class StandInWorkbench:
+    def __init__(self):
+        self._options = {}
+        self.idle_callbacks = []
+
+    def set_default(self, name, value):
+        self._options.setdefault(name, value)
+
+    def get_option(self, name, default=None):
+        return self._options.get(name, default)
+
+    def set_option(self, name, value):
+        self._options[name] = value
+
+    def in_simple_mode(self):
+        return False
+
+    def after_idle(self, func, *args):
+        self.idle_callbacks.append(func)
+
+    def __getattr__(self, name):
+        # add_view, add_command, add_configuration_page, bind, ...
+        return lambda *args, **kwargs: None
+
+thonny._workbench = StandInWorkbench()
+modules_before = set(sys.modules)
+
+t0 = time.perf_counter()
+import thonnycontrib.edulint
+t1 = time.perf_counter()
+thonnycontrib.edulint.load_plugin()
+t2 = time.perf_counter()
+
+print(json.dumps({
+    "import": t1 - t0,
+    "load_plugin": t2 - t1,
+    "new_modules": sorted(set(sys.modules) - modules_before),
+    "deferred_callbacks": len(thonny._workbench.idle_callbacks),
+}))
+"""
+
+
+def run_round() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))] + [env.get("PYTHONPATH", "")]
+    )
+    out = subprocess.run([sys.executable, "-c", ROUND_SCRIPT], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    rounds = [run_round() for _ in range(args.rounds)]
+    import_ms = [r["import"] * 1000 for r in rounds]
+    load_ms = [r["load_plugin"] * 1000 for r in rounds]
+
+    print(f"import thonnycontrib.edulint: median {statistics.median(import_ms):.1f} ms, min {min(import_ms):.1f} ms")
+    print(f"load_plugin():                median {statistics.median(load_ms):.1f} ms, min {min(load_ms):.1f} ms")
+    print(f"modules imported by the plugin: {len(rounds[0]['new_modules'])}")
+    print(f"callbacks deferred until Thonny is idle: {rounds[0]['deferred_callbacks']}")
+
+    heavy = [m for m in HEAVY_MODULES if m in rounds[0]["new_modules"]]
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        return 1
+    print("OK: no heavy modules imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
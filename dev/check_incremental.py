@@ -0,0 +1,259 @@
+"""Checks that incremental re-analysis gives exactly the same findings as analyzing the file in full.
+
+For every file of the corpus (generated ones, plus the given directory if any), the file is
+analyzed in full, then a series of edits is applied to it. After each edit, the incremental
+result is compared with a full analysis of the edited file.
+
+The default config enables checks looking at the whole module, for which the incremental analysis
+isn't used. Unless --config is given, the files are analyzed with the default config restricted
+to the region-local checks (see REGION_LOCAL_CHECKS and REGION_LOCAL_FLAKE8_PREFIXES).
+
+    PYTHONPATH=.. python3 check_incremental.py [corpus_dir] [--edits N] [--config FILE]
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from thonnycontrib.edulint.incremental import (
+    IncrementalIndex,
+    MIN_LINES,
+    REGION_LOCAL_CHECKS,
+    REGION_LOCAL_FLAKE8_PREFIXES,
+    _is_incremental_config,
+)
+from thonnycontrib.edulint.worker_server import check_to_json
+
+PROLOGUE = '''import math
+import os
+from random import randint
+
+LIMIT = 10
+counter = 0
+'''
+
+TEMPLATES = [
+    '''
+
+def compute_{i}(values):
+    result = []
+    for i in range(len(values)):
+        if values[i] % 2 == 0 == True:
+            result.append(values[i] * LIMIT)
+    return result
+''',
+    '''
+
+def describe_{i}(number):
+    if number > 0:
+        text = "positive"
+    else:
+        text = "positive"
+    unused_{i} = math.sqrt(abs(number))
+    return text
+''',
+    '''
+
+def bump_{i}():
+    global counter
+    counter = counter + 1
+    return counter
+''',
+    '''
+
+class Shape{i}:
+    def __init__(self, size):
+        self.size = size
+
+    def area(self):
+        return self.size * self.size
+
+    def grow(self, by=1):
+        self.size = self.size + by
+        return self
+''',
+    '''
+
+def use_previous_{i}(x):
+    shape = Shape{j}(x)
+    total = 0
+    while True:
+        total += shape.area()
+        if total > LIMIT:
+            break
+    return compute_{k}([total, randint(1, 6)])
+''',
+]
+
+EPILOGUE = '''
+
+def main():
+    print(describe_1(-1))
+    print(use_previous_4([1, 2]))
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+def generate_module(seed: int, n_lines: int) -> str:
+    rng = random.Random(seed)
+    parts = [PROLOGUE]
+    i = 0
+    while sum(part.count("\n") for part in parts) < n_lines:
+        template = TEMPLATES[i % len(TEMPLATES)]
+        parts.append(template.format(i=i, j=max(0, i - 1 - (i - 1) % 5 + 3), k=max(0, i - i % 5)))
+        if rng.random() < 0.1:
+            parts.append("\n\n# a comment between definitions\n")
+        i += 1
+    parts.append(EPILOGUE)
+    return "".join(parts)
+
+
+def _top_level_functions(source):
+    return [node for node in ast.parse(source).body if isinstance(node, (ast.FunctionDef, ast.ClassDef))]
+
+
+def edit(source: str, rng: random.Random) -> str:
+    lines = source.splitlines(keepends=True)
+    definitions = _top_level_functions(source)
+    node = rng.choice(definitions)
+    body_line = node.body[-1].lineno - 1 if isinstance(node, ast.FunctionDef) else node.lineno
+    indent = " " * 4
+    kind = rng.randrange(6)
+    if kind == 0 and isinstance(node, ast.FunctionDef):  # add an unused variable
+        lines.insert(body_line, f"{indent}tmp = {rng.randint(0, 100)}\n")
+    elif kind == 1 and isinstance(node, ast.FunctionDef):  # start using an unused import
+        lines.insert(body_line, f"{indent}print(os.getcwd())\n")
+    elif kind == 2:  # remove the definition
+        del lines[node.lineno - 1 - len(getattr(node, "decorator_list", [])): node.end_lineno]
+    elif kind == 3:  # add a new function calling the edited one
+        lines.insert(node.end_lineno, f"\n\ndef extra_{rng.randint(0, 10**6)}():\n{indent}return {node.name}\n")
+    elif kind == 4:  # rename the definition
+        lines[node.lineno - 1] = lines[node.lineno - 1].replace(node.name, node.name + "_renamed", 1)
+    else:  # change a line somewhere in the body
+        line = rng.randrange(node.lineno, node.end_lineno) if node.end_lineno > node.lineno else node.lineno - 1
+        if lines[line].strip() and not lines[line].rstrip().endswith(":"):
+            lines[line] = lines[line].rstrip("\n") + "  # changed\n"
+    return "".join(lines)
+
+
+def write_region_local_config(directory: str) -> str:
+    """Writes the default config restricted to the checks the incremental analysis supports."""
+    sample = os.path.join(directory, "sample.py")
+    with open(sample, "w", encoding="utf8") as f:
+        f.write("pass\n")
+    config = json.loads(check_to_json([sample], [])[0])["configs"][0]
+    enabled = [
+        check
+        for arg in config["pylint"] if arg.startswith("--enable=")
+        for check in arg[len("--enable="):].split(",") if check in REGION_LOCAL_CHECKS
+    ]
+    selected = [
+        code
+        for arg in config["flake8"] if arg.startswith("--select=")
+        for code in arg[len("--select="):].split(",") if code.startswith(REGION_LOCAL_FLAKE8_PREFIXES)
+    ]
+    path = os.path.join(directory, "region_local.toml")
+    with open(path, "w", encoding="utf8") as f:
+        f.write('[pylint]\ndisable = "all"\nenable = %s\n\n[flake8]\nselect = %s\n'
+                % (json.dumps(enabled), json.dumps(",".join(selected))))
+    return path
+
+
+def full_run(path: str, options):
+    out, _ = check_to_json([path], options)
+    result = json.loads(out)
+    return result["problems"], result["configs"][0] if len(result["configs"]) == 1 else None
+
+
+def incremental_run(index: IncrementalIndex, path: str, source: str, options):
+    plan = index.plan(path, source, "check")
+    if plan is None:
+        return None, None
+    reduced_path = plan.write_reduced_module()
+    sys.path.insert(0, os.path.dirname(path))
+    try:
+        out, _ = check_to_json([reduced_path], options)
+    finally:
+        sys.path.remove(os.path.dirname(path))
+    return plan.merge(json.loads(out)["problems"]), plan
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus_dir", nargs="?")
+    parser.add_argument("--edits", type=int, default=10)
+    parser.add_argument("--generated", type=int, default=3)
+    parser.add_argument("--config", help="an EduLint config file, the region-local checks by default")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        options = ["config=" + os.path.abspath(args.config or write_region_local_config(tmp))]
+        corpus = {}
+        for seed in range(args.generated):
+            corpus[os.path.join(tmp, f"generated_{seed}.py")] = generate_module(seed, MIN_LINES + 100 * seed)
+        if args.corpus_dir:
+            for root, _, files in os.walk(args.corpus_dir):
+                for name in sorted(files):
+                    if name.endswith(".py"):
+                        with open(os.path.join(root, name), encoding="utf8") as f:
+                            corpus[os.path.join(tmp, f"corpus_{len(corpus)}_{name}")] = f.read()
+
+        n_compared = n_mismatches = n_full = 0
+        full_time = incremental_time = 0.0
+        for path, source in corpus.items():
+            rng = random.Random(path)
+            index = IncrementalIndex()
+            with open(path, "w", encoding="utf8") as f:
+                f.write(source)
+            problems, config = full_run(path, options)
+            if not _is_incremental_config(config):
+                print(f"The config enables checks which aren't region-local, {path} is always analyzed in full")
+            index.record(path, source, problems, config, "check")
+
+            for _ in range(args.edits):
+                try:
+                    source = edit(source, rng)
+                except (IndexError, ValueError, SyntaxError):
+                    break
+                with open(path, "w", encoding="utf8") as f:
+                    f.write(source)
+
+                start = time.perf_counter()
+                expected, config = full_run(path, options)
+                full_duration = time.perf_counter() - start
+
+                start = time.perf_counter()
+                merged, plan = incremental_run(index, path, source, options)
+                if plan is None:
+                    n_full += 1
+                else:
+                    full_time += full_duration
+                    incremental_time += time.perf_counter() - start
+                    n_compared += 1
+                    if merged != expected:
+                        n_mismatches += 1
+                        print(f"MISMATCH in {path} after an edit, reanalyzed regions {plan.reanalyzed}")
+                        for p in expected:
+                            if p not in (merged or []):
+                                print("  missing:", p["line"], p["code"], p["text"])
+                        for p in merged or []:
+                            if p not in expected:
+                                print("  extra:  ", p["line"], p["code"], p["text"])
+
+                index.record(path, source, expected, config, "check")
+
+    print(f"{n_compared} incremental results compared, {n_mismatches} mismatches, {n_full} edits needed a full run")
+    if n_compared:
+        print(f"full runs of the compared edits: {full_time:.1f} s, incremental runs: {incremental_time:.1f} s")
+    return 1 if n_mismatches or not n_compared else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
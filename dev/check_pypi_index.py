@@ -0,0 +1,92 @@
+"""Checks the version lookup against a local stand-in for PyPI's JSON simple index (PEP 691):
+the selection of fully released versions, and that an unchanged index costs an empty 304.
+
+Run from the dev directory, with the repository root on the path:
+
+    PYTHONPATH=.. python3 check_pypi_index.py
+"""
+import functools
+import json
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from checks import Checks
+from thonnycontrib.edulint import pypi_helper, state_store
+from thonnycontrib.edulint.version_checker import PackageInfoManager
+
+
+def project_json(releases, with_versions=True):
+    files = []
+    for version, yanked in releases:
+        files.append({"filename": f"thonny_edulint-{version}-py3-none-any.whl", "yanked": yanked})
+        files.append({"filename": f"thonny-edulint-{version}.tar.gz", "yanked": False})
+    data = {"meta": {"api-version": "1.1" if with_versions else "1.0"}, "name": "thonny-edulint", "files": files}
+    if with_versions:
+        data["versions"] = [version for version, _ in releases] + ["0.0.1"]  # 0.0.1 has no files
+    return data
+
+
+class Index:
+    def __init__(self):
+        self.data = project_json([("0.6.0", False), ("0.7.4", False), ("0.8.0", "broken build")])
+        self.requests = []  # (status, body length)
+        index = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(index.data).encode()
+                etag = '"%x"' % hash(body)
+                if self.headers.get("If-None-Match") == etag:
+                    index.requests.append((304, 0))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                index.requests.append((200, len(body)))
+                self.send_response(200)
+                self.send_header("Content-Type", pypi_helper.SIMPLE_JSON_CONTENT_TYPE)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d/simple/" % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+def main():
+    check = Checks()
+    index = Index()
+
+    response = pypi_helper.fetch_versions("thonny-edulint", index_url=index.url)
+    check(sorted(map(str, response.versions)) == ["0.6.0", "0.7.4"], "yanked and file-less versions are left out")
+    check(response.etag is not None, "the ETag is kept")
+
+    again = pypi_helper.fetch_versions("thonny-edulint", response.etag, index_url=index.url)
+    check(again.versions is None and index.requests[-1] == (304, 0), "unchanged index: 304 without a body")
+
+    index.data = project_json([("0.6.0", False), ("0.7.4", False), ("0.9.0", False)], with_versions=False)
+    changed = pypi_helper.fetch_versions("thonny-edulint", response.etag, index_url=index.url)
+    check(sorted(map(str, changed.versions)) == ["0.6.0", "0.7.4", "0.9.0"], "a new release is seen (API 1.0 too)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        state_store.versions_state._get_dir = lambda: directory
+        pypi_helper.fetch_versions = functools.partial(pypi_helper.fetch_versions, index_url=index.url)
+        n_requests = len(index.requests)
+        first = PackageInfoManager.get_latest_version("thonny-edulint", ttl=0)
+        second = PackageInfoManager.get_latest_version("thonny-edulint", ttl=0)
+        check(first == second == "0.9.0", "PackageInfoManager gives the newest version")
+        check([status for status, _ in index.requests[n_requests:]] == [200, 304], "and revalidates with the stored ETag")
+        check(PackageInfoManager._get_package_info_locally("thonny-edulint").etag is not None, "stored in versions.json")
+
+    return check.summary()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
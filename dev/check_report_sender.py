@@ -0,0 +1,113 @@
+"""Checks ReportSender against a local stand-in for the reporting server.
+
+Covers single reports, batching with gzip, retries after 503, giving up on a server that doesn't
+answer in time, dropping reports when the queue is full, and callbacks.
+
+Run from the dev directory, with the repository root on the path:
+
+    PYTHONPATH=.. python3 check_report_sender.py
+"""
+import gzip
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from checks import Checks
+from thonnycontrib.edulint.report_sender import ReportSender
+
+
+class Server:
+    def __init__(self, fail_first=0, delay=0.0, port=0):
+        self.fail_first = fail_first
+        self.delay = delay
+        self.received = []  # (headers, decoded body)
+        self.n_requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                server.n_requests += 1
+                if server.delay:
+                    time.sleep(server.delay)
+                    if server.delay > 1:  # the client has timed out and left
+                        return
+                if server.n_requests <= server.fail_first:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                server.received.append((dict(self.headers), json.loads(body)))
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = "http://127.0.0.1:%d/" % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    check = Checks()
+
+    server = Server()
+    sender = ReportSender(server.url)
+    responses = []
+    for i in range(3):
+        sender.submit({"n": i}, callback=responses.append if i == 2 else None)
+    sender.close(5)
+    check([body for _, body in server.received] == [{"n": 0}, {"n": 1}, {"n": 2}], "single reports sent in order")
+    check(len(responses) == 1 and responses[0].status_code == 200, "callback gets the response")
+    check(not sender.submit({"n": 3}), "closed sender refuses reports")
+    server.stop()
+
+    server = Server(delay=0.2)
+    sender = ReportSender(server.url, max_batch=10, compress=True)
+    for i in range(20):
+        sender.submit({"n": i})
+    sender.close(10)
+    records = []
+    for headers, body in server.received:
+        records.extend(body["records"] if body.get("type") == "batch" else [body])
+    check(records == [{"n": i} for i in range(20)], "batched reports all arrive, in order")
+    check(server.n_requests < 20, "%d requests for 20 reports" % server.n_requests)
+    check(all(h.get("Content-Encoding") == "gzip" for h, _ in server.received), "batches are gzipped")
+    server.stop()
+
+    server = Server(fail_first=2)
+    sender = ReportSender(server.url, backoff_seconds=0.05)
+    sender.submit({"n": 0})
+    sender.close(5)
+    check(server.received and server.received[0][1] == {"n": 0} and sender.n_requests == 3, "retried after 503")
+    server.stop()
+
+    server = Server(delay=2)
+    sender = ReportSender(server.url, timeout=(1, 0.3), max_attempts=2, backoff_seconds=0.05)
+    start = time.time()
+    sender.submit({"n": 0})
+    sender.close(5)
+    check(sender.n_dropped == 1 and time.time() - start < 4, "gives up on a slow server")
+    server.stop()
+
+    server = Server(delay=0.5)
+    sender = ReportSender(server.url, max_queue=2)
+    accepted = sum(sender.submit({"n": i}) for i in range(10))
+    check(accepted < 10 and sender.n_dropped == 10 - accepted, "full queue drops %d reports" % (10 - accepted))
+    sender.close(5)
+    server.stop()
+
+    return check.summary()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Checks ReportSpool: keeping reports while offline, the disk cap, the flush-time check
+of the reporting options, and handing unsent reports over to the next session, but not the
+reports of another running session.
+
+Run from the dev directory, with the repository root on the path:
+
+    PYTHONPATH=.. python3 check_report_spool.py
+"""
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from check_report_sender import Server
+from checks import Checks
+from thonnycontrib.edulint.report_sender import ReportSender
+from thonnycontrib.edulint.report_spool import ReportSpool
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_spool(spool_dir, port, is_allowed=lambda record: True, **kwargs):
+    sender = ReportSender("http://127.0.0.1:%d/" % port, timeout=(0.5, 2))
+    kwargs.setdefault("flush_interval", 0.1)
+    kwargs.setdefault("max_retry_interval", 0.3)
+    return ReportSpool(sender, is_allowed, get_spool_dir=lambda: spool_dir, **kwargs)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    check = Checks()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        port = free_port()
+        spool = make_spool(spool_dir, port)
+        start = time.perf_counter()
+        for i in range(5):
+            spool.append({"type": "code", "n": i})
+        check(time.perf_counter() - start < 0.1, "appending doesn't wait for the network")
+        time.sleep(1)
+        check(spool.n_sent == 0 and spool.n_dropped == 0, "offline, the reports stay in the spool")
+
+        server = Server(port=port)
+        check(wait_for(lambda: len(server.received) == 5), "delivered once the server is back")
+        check([body["n"] for _, body in server.received] == list(range(5)), "in order")
+        spool.close()
+        check(not [name for name in os.listdir(spool_dir) if name.endswith(".jsonl")], "nothing is left behind")
+        server.stop()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        allowed = {"code": True, "result": True}
+        server = Server()
+        port = server.httpd.server_address[1]
+        spool = make_spool(spool_dir, port, is_allowed=lambda record: allowed[record["type"]], flush_interval=1)
+        spool.append({"type": "code", "n": 0})
+        spool.append({"type": "result", "n": 1})
+        allowed["code"] = False  # e.g. the server forced disabling code reporting in the meantime
+        check(wait_for(lambda: len(server.received) == 1), "the options are checked when sending")
+        check(server.received[0][1]["type"] == "result" and wait_for(lambda: spool.n_dropped == 1), "the disallowed record is dropped")
+        spool.close()
+        server.stop()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        port = free_port()
+        spool = make_spool(spool_dir, port, max_bytes=10_000)
+        for i in range(1000):
+            spool.append({"type": "code", "n": i, "padding": "x" * 50})
+        time.sleep(1.5)
+        size = sum(os.path.getsize(os.path.join(spool_dir, name)) for name in os.listdir(spool_dir))
+        check(size <= 2 * 10_000, "the spool stays under the cap while offline (%d bytes)" % size)
+
+        server = Server(port=port)
+        wait_for(lambda: spool.n_sent + spool.n_dropped == 1000)
+        received = [body["n"] for _, body in server.received]
+        check(received and received[-1] == 999 and received == sorted(received), "the oldest are dropped (%d kept)" % len(received))
+        spool.close()
+        server.stop()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        port = free_port()
+        spool = make_spool(spool_dir, port)
+        for i in range(3):
+            spool.append({"type": "code", "n": i})
+        spool.close()
+        names = os.listdir(spool_dir)
+        check(len(names) == 1 and names[0].startswith("pending-"), "unsent reports are left for the next session")
+
+        server = Server(port=port)
+        spool = make_spool(spool_dir, port)
+        spool.start()
+        check(wait_for(lambda: len(server.received) == 3), "the next session sends them")
+        check(wait_for(lambda: not os.listdir(spool_dir)), "and removes the file")
+        spool.close()
+        server.stop()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        port = free_port()
+        idle = make_spool(spool_dir, port)
+        idle.append({"type": "code", "n": 0})
+        own_path = idle._own.path
+        day_ago = time.time() - 2 * 24 * 60 * 60
+        os.utime(own_path, (day_ago, day_ago))  # a Thonny left open, with nothing reported for days
+
+        crashed_path = os.path.join(spool_dir, "1-1.jsonl")
+        with open(crashed_path, "w") as f:
+            f.write('{"type": "code", "n": 1}\n')
+
+        other = make_spool(spool_dir, port)
+        other.start()
+        check(wait_for(lambda: not os.path.exists(crashed_path)), "another session takes over a crashed session's file")
+        check(os.path.exists(own_path) and not other._adopted[1:], "but not the file of an idle running session")
+        other.close()
+        idle.close()
+
+    return check.summary()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Checks AnalysisScheduler with requests coming faster than the debounce: bursts are coalesced
+into one analysis of the latest code, a changed request supersedes the one in flight, and a request
+for the code already being analyzed (including the modules it imports) is dropped.
+
+Then runs hundreds of rapid requests through EduLintView, with analyzers finishing in random order,
+and checks that the final results presented are the ones of the last source. The view's Tk
+rendering is left out, so that no display is needed.
+
+Run from the dev directory, with the repository root on the path:
+
+    PYTHONPATH=.. python3 check_scheduler.py
+"""
+import os
+import random
+import sys
+import tempfile
+from functools import partial
+
+import thonny
+
+from checks import Checks
+from thonnycontrib.edulint import view
+from thonnycontrib.edulint.finding import Finding
+from thonnycontrib.edulint.scheduler import AnalysisScheduler
+from thonnycontrib.edulint.source_snapshot import SourceSnapshot
+from thonnycontrib.edulint.view import EduLintView, ProgramAnalyzer, _analysis_fingerprint
+
+
+class FakeClock:
+    """Stands in for a widget's after and after_cancel, time only moves in advance()."""
+
+    def __init__(self):
+        self.now = 0
+        self._timers = {}
+        self._next_id = 0
+
+    def after(self, ms, callback):
+        self._next_id += 1
+        self._timers[self._next_id] = (self.now + ms, callback)
+        return self._next_id
+
+    def after_cancel(self, timer_id):
+        del self._timers[timer_id]
+
+    def advance(self, ms):
+        end = self.now + ms
+        while True:
+            due_timers = [item for item in self._timers.items() if item[1][0] <= end]
+            if not due_timers:
+                break
+            timer_id, (due, callback) = min(due_timers, key=lambda item: item[1][0])
+            del self._timers[timer_id]
+            self.now = max(self.now, due)
+            callback()
+        self.now = end
+
+
+class FakeWorkbench:
+    def __init__(self, options):
+        self.options = options
+
+    def get_option(self, name, default=None):
+        return self.options.get(name, default)
+
+    def show_view(self, name):
+        pass
+
+
+class FakeAnalyzer(ProgramAnalyzer):
+    """Reports the analyzed source as the message of its one warning, after a random delay.
+
+    Cancelling doesn't stop the timer, so superseded analyzers still report, as a subprocess
+    finishing just before it's killed would.
+    """
+
+    clock = None
+    rng = random.Random(0)
+
+    def start_analysis(self, main_file_path, imported_file_paths):
+        text = self.sources[main_file_path].text
+        self.clock.after(self.rng.randint(50, 600), lambda: self.completion_handler(
+            self, [Finding(main_file_path, 1, 0, "X0000", text)], None
+        ))
+
+    def cancel_analysis(self):
+        self.cancelled = True
+
+
+class HeadlessView(EduLintView):
+    """EduLintView's analysis flow with the Tk widget and the rendering left out."""
+
+    def __init__(self, clock):
+        self.after = clock.after
+        self.after_cancel = clock.after_cancel
+        self._analyzer_instances = []
+        self._accepted_warnings = {}
+        self._live_analysis = None
+        self._current_snapshot = None
+        self._scheduler = AnalysisScheduler(lambda args: self._run_analysis(*args), self.after, self.after_cancel)
+        self._live_scheduler = AnalysisScheduler(self._run_live_analysis, self.after, self.after_cancel)
+        self.presented = []  # (messages, final) of every _present_warnings
+
+    def _prepare_view(self, main_file_path):
+        self._cancel_analyses()
+
+    def _start_snapshot(self, key):
+        self._current_snapshot = {}
+
+    def _append_progress(self, text):
+        pass
+
+    def _present_warnings(self, warnings, final=True):
+        self.presented.append(([w.msg for w in warnings], final))
+
+    def _render_later(self, item):
+        pass
+
+
+def check_view(check: Checks):
+    clock = FakeClock()
+    FakeAnalyzer.clock = clock
+    thonny._workbench = FakeWorkbench({"edulint.open_edulint_on_warnings": False})
+    view._is_local_cpython_backend = lambda: True
+    view.add_program_analyzer(FakeAnalyzer)
+    headless = HeadlessView(clock)
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "main.py")
+        n_requests = 500
+        for i in range(n_requests):
+            # a few runs of unchanged code, as when Run is pressed repeatedly
+            if i == 0 or rng.random() < 0.8:
+                text = "print(%d)\n" % i
+                with open(path, "w") as f:
+                    f.write(text)
+            headless.handle_toplevel_response({"command_name": "Run", "filename": path})
+            clock.advance(rng.choice([0, 5, 20, 100, 200, 400]))
+        clock.advance(10000)
+
+    final = [messages for messages, is_final in headless.presented if is_final]
+    check(bool(final) and final[-1] == [text], "the last final results are of the last source")
+    versions = [int(messages[0][len("print("):-2]) for messages in final]
+    check(versions == sorted(versions), "no final results of older code after newer ones")
+    check(
+        headless._scheduler.n_requested == n_requests and headless._scheduler.n_started < n_requests // 2,
+        "%d requests, %d analyses started" % (headless._scheduler.n_requested, headless._scheduler.n_started),
+    )
+
+
+def main() -> int:
+    check = Checks()
+    clock = FakeClock()
+    started = []
+    scheduler = AnalysisScheduler(started.append, clock.after, clock.after_cancel, debounce_ms=150)
+
+    for i in range(500):
+        scheduler.request("a.py", "v%d" % i, "run %d" % i)
+        clock.advance(1)
+    clock.advance(150)
+    check(started == ["run 499"], "a burst of 500 requests starts one analysis, of the latest one")
+
+    scheduler.request("a.py", "v499", "same again")
+    clock.advance(150)
+    check(started == ["run 499"], "the code in flight isn't analyzed again")
+
+    scheduler.request("a.py", "v20", "changed")
+    clock.advance(150)
+    check(started[-1] == "changed", "changed code supersedes the analysis in flight")
+
+    scheduler.analysis_finished("a.py")
+    scheduler.request("a.py", "v20", "after finishing")
+    clock.advance(150)
+    check(started[-1] == "after finishing", "once finished, the same code may be analyzed again")
+
+    scheduler.request("a.py", "v21", "cancelled")
+    scheduler.cancel()
+    clock.advance(1000)
+    check(started[-1] == "after finishing", "a cancelled request doesn't start")
+
+    scheduler.request("a.py", "v22", "postponed", delay_ms=1000)
+    clock.advance(500)
+    check(started[-1] == "after finishing", "delay_ms postpones the start")
+    clock.advance(500)
+    check(started[-1] == "postponed", "and it starts after the delay")
+    check(scheduler.n_requested == 505 and scheduler.n_started == 4, "505 requested, 4 started")
+
+    n_calls = []
+
+    def fingerprint():
+        n_calls.append(1)
+        return "v22"
+
+    for i in range(10):
+        scheduler.request("a.py", fingerprint, "lazy %d" % i)
+        clock.advance(10)
+    clock.advance(150)
+    check(len(n_calls) == 1, "a callable fingerprint is computed once per burst")
+    check(started[-1] == "postponed", "and dedupes like a plain one")
+
+    with tempfile.TemporaryDirectory() as directory:
+        main_path = os.path.join(directory, "main.py")
+        helper_path = os.path.join(directory, "helper.py")
+        with open(main_path, "w") as f:
+            f.write("import helper\nhelper.greet()\n")
+        with open(helper_path, "w") as f:
+            f.write("def greet():\n    print('hi')\n")
+
+        scheduler.cancel()
+        scheduler.request(main_path, partial(_analysis_fingerprint, SourceSnapshot.read(main_path)), "main")
+        clock.advance(150)
+        with open(helper_path, "w") as f:
+            f.write("def greet():\n    print('hello')\n")
+        scheduler.request(main_path, partial(_analysis_fingerprint, SourceSnapshot.read(main_path)), "helper changed")
+        clock.advance(150)
+        check(started[-2:] == ["main", "helper changed"], "a change in an imported module isn't deduped")
+
+        scheduler.request(main_path, partial(_analysis_fingerprint, SourceSnapshot.read(main_path)), "nothing changed")
+        clock.advance(150)
+        check(started[-1] == "helper changed", "but unchanged modules are")
+
+    check_view(check)
+    return check.summary()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Checks JsonStateFile: concurrent Thonny instances (processes here) updating the same file
+neither lose updates nor leave a corrupt file, and reads are served from memory.
+
+Run from the dev directory, with the repository root on the path:
+
+    PYTHONPATH=.. python3 check_state_store.py [--processes N] [--updates N]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from checks import Checks
+from thonnycontrib.edulint.state_store import JsonStateFile
+
+
+def increment_many(directory, n_updates):
+    state = JsonStateFile("counter.json", get_dir=lambda: directory)
+
+    def increment(data):
+        data["count"] = data.get("count", 0) + 1
+        data.setdefault("pids", {})[str(os.getpid())] = data["count"]
+
+    for _ in range(n_updates):
+        state.update(increment)
+
+
+def read_many(directory, duration):
+    deadline = time.time() + duration
+    n_corrupt = 0
+    path = os.path.join(directory, "counter.json")
+    while time.time() < deadline:
+        try:
+            with open(path, encoding="utf8") as f:
+                json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            n_corrupt += 1
+    return n_corrupt
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+
+    check = Checks()
+    with tempfile.TemporaryDirectory() as directory:
+        with multiprocessing.Pool(args.processes + 1) as pool:
+            reader = pool.apply_async(read_many, (directory, 2.0))
+            writers = [pool.apply_async(increment_many, (directory, args.updates)) for _ in range(args.processes)]
+            for writer in writers:
+                writer.get()
+            n_corrupt = reader.get()
+
+        state = JsonStateFile("counter.json", get_dir=lambda: directory)
+        expected = args.processes * args.updates
+        check(state.get("count") == expected, "no update is lost (%s of %d)" % (state.get("count"), expected))
+        check(n_corrupt == 0, "no corrupt reads (%d)" % n_corrupt)
+
+        start = time.perf_counter()
+        for _ in range(10000):
+            state.get("count")
+        check(
+            state.n_loads == 1,
+            "10000 reads: %.1f ms, %d load(s) from disk" % ((time.perf_counter() - start) * 1000, state.n_loads),
+        )
+
+        other = JsonStateFile("counter.json", get_dir=lambda: directory)
+        other.update(lambda data: data.update(count=-1))
+        state.revalidate_seconds = 0
+        check(state.get("count") == -1, "sees another instance's change")
+
+        leftovers = [name for name in os.listdir(directory) if name.endswith(".tmp")]
+        check(not leftovers, "no temporary files are left behind")
+
+    return check.summary()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""Reporting shared by the dev/check_*.py scripts, which exit with the number of failed checks."""
+
+
+class Checks:
+    def __init__(self):
+        self.n_failed = 0
+
+    def __call__(self, condition, message: str) -> bool:
+        print(("OK:   " if condition else "FAIL: ") + message)
+        if not condition:
+            self.n_failed += 1
+        return bool(condition)
+
+    def summary(self) -> int:
+        print("All checks passed" if not self.n_failed else "%d checks FAILED" % self.n_failed)
+        return self.n_failed
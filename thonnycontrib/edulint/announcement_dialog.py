@@ -7,15 +7,13 @@ from thonny.ui_utils import CommonDialog
 
 from thonnycontrib.edulint.reporting import post_async_with_session_id
 
-import requests
-
 logger = getLogger("EduLint")
 
 
 def check_for_announcement():
     post_async_with_session_id(filepath="", type="thonny-annoucement-request", data={}, callback=process_announcement_response)
 
-def process_announcement_response(resp: requests.Response):
+def process_announcement_response(resp: "requests.Response"):
     if resp.status_code != 200:
         logger.info(f"Announcement endpoint failed {resp}")
         return
@@ -0,0 +1,112 @@
+"""Headless batch linting of whole directories of submissions, e.g. for grading.
+
+Usage: python -m thonnycontrib.edulint batch <dir> [-j JOBS] [-o OPTION ...] [--explanations] > results.jsonl
+
+Writes one JSON record per file to stdout, in the order the files finish, and a throughput
+and latency summary to stderr at the end. Warnings carry their code and more_info_url, the
+explanations of the codes are included only with --explanations.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+
+def find_python_files(directory: str) -> List[str]:
+    result = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+        result.extend(os.path.join(root, f) for f in sorted(files) if f.endswith(".py"))
+    return result
+
+
+def lint_file(path: str, options: List[str], include_explanations: bool = False) -> Dict[str, Any]:
+    """Runs in a pool process, which keeps edulint imported between files."""
+    from thonnycontrib.edulint.finding import Finding
+    from thonnycontrib.edulint.worker_server import check_to_json
+
+    started_at = time.perf_counter()
+    record: Dict[str, Any] = {"path": path}
+    try:
+        out, err = check_to_json([path], options)
+        edulint_result = json.loads(out)
+        record["warnings"] = [
+            Finding.from_edulint(finding).to_dict(include_explanation=include_explanations)
+            for finding in edulint_result["problems"]
+        ]
+        record["config"] = edulint_result["configs"][0] if len(edulint_result["configs"]) == 1 else None
+        if err:
+            record["stderr"] = err
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started_at, 4)
+    return record
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_batch(
+    directory: str,
+    jobs: int,
+    options: List[str],
+    out=sys.stdout,
+    stats_out=sys.stderr,
+    include_explanations: bool = False,
+) -> int:
+    paths = find_python_files(directory)
+    if not paths:
+        print(f"No Python files found in {directory}", file=stats_out)
+        return 1
+
+    started_at = time.perf_counter()
+    latencies = []
+    n_errors = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(lint_file, path, options, include_explanations) for path in paths]
+        for future in as_completed(futures):
+            record = future.result()
+            latencies.append(record["seconds"])
+            n_errors += "error" in record
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    print(
+        f"{len(paths)} files in {elapsed:.1f} s using {jobs} processes: {len(paths) / elapsed:.2f} files/s, "
+        f"{n_errors} failed\n"
+        f"per-file latency: p50 {percentile(latencies, 50):.2f} s, p90 {percentile(latencies, 90):.2f} s, "
+        f"p99 {percentile(latencies, 99):.2f} s, max {latencies[-1]:.2f} s",
+        file=stats_out,
+    )
+    return 0 if n_errors == 0 else 2
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m thonnycontrib.edulint")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    batch_parser = subparsers.add_parser("batch", description="Lints all .py files in a directory.")
+    batch_parser.add_argument("directory")
+    batch_parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1, help="number of processes (default: number of CPUs)"
+    )
+    batch_parser.add_argument(
+        "-o", "--option", dest="options", action="append", default=[], help="EduLint option, same as in `edulint check`"
+    )
+    batch_parser.add_argument(
+        "--explanations", action="store_true", help="include the RST explanation of each warning's code"
+    )
+
+    args = parser.parse_args(argv)
+    return run_batch(args.directory, max(1, args.jobs), args.options, include_explanations=args.explanations)
@@ -0,0 +1,154 @@
+"""EduLint's explanations, converted from Markdown to RST once per installed edulint version.
+
+The converted explanations are kept in a JSON file in the user data dir, so that showing
+findings needs neither edulint nor mistune in Thonny's process, just a dictionary lookup.
+On the UI thread, the store is loaded (and converted again, if it's missing or stale) in
+the background, see get_explanation_rst(wait=False).
+"""
+import importlib
+import json
+import os
+import threading
+from logging import getLogger
+from pathlib import Path
+from typing import Dict, Optional
+
+from thonnycontrib.edulint.utils import add_path, get_pylint_plugins_dir
+from thonnycontrib.edulint.version_checker import PackageInfoManager
+
+logger = getLogger("EduLint")
+
+STORE_FORMAT_VERSION = 1
+
+_explanations_rst: Optional[Dict[str, str]] = None
+_lock = threading.Lock()
+_loading_thread: Optional[threading.Thread] = None
+
+
+def get_explanations_store_path() -> str:
+    from platformdirs import PlatformDirs
+
+    return os.path.join(PlatformDirs(appname="thonny-edulint").user_data_dir, "explanations_rst.json")
+
+
+def _get_online_explanations_path() -> str:
+    from platformdirs import PlatformDirs
+
+    # edulint may replace the explanations shipped with the package by ones downloaded from GitHub
+    return os.path.join(PlatformDirs(appname="edulint").user_data_dir, "explanations_online.toml")
+
+
+def _current_store_key() -> str:
+    try:
+        online_mtime = os.stat(_get_online_explanations_path()).st_mtime_ns
+    except OSError:
+        online_mtime = 0
+    edulint_version = PackageInfoManager.get_local_module_version("edulint")
+    return f"{STORE_FORMAT_VERSION}:{edulint_version}:{online_mtime}"
+
+
+def _get_all_edulint_explanations() -> Dict[str, Dict[str, str]]:
+    try:
+        plugins_dir = get_pylint_plugins_dir()
+    except Exception:
+        # not running inside Thonny (e.g. batch mode), edulint has to be importable directly
+        edulint = importlib.import_module('edulint')
+    else:
+        with add_path(plugins_dir):
+            edulint = importlib.import_module('edulint')
+    return edulint.get_explanations()
+
+
+def markdown_explanation_to_rst(explanation: Dict[str, str], md=None) -> str:
+    if md is None:
+        import mistune
+        from mistune.renderers.rst import RSTRenderer
+        md = mistune.create_markdown(renderer=RSTRenderer())
+
+    text_explanation_md: str = explanation.get("why", "") + "\n"
+
+    if "examples" in explanation:
+        text_explanation_md += "\n" + explanation["examples"] + "\n"
+
+    text_explanation_rst = md(text_explanation_md)
+    # This can be used to replace code-block with literal block.
+    # text_explanation_rst = text_explanation_rst.replace(".. code-block:: py", "::")
+    text_explanation_rst = text_explanation_rst.replace(".. code:: py", ".. code::")
+
+    # Syntax can be checked for example here:
+    # https://raw.githubusercontent.com/thonny/thonny/66b3cb853cfc28ec504d29090d55ec86eee3f178/thonny/plugins/help/debugging.rst
+
+    return text_explanation_rst
+
+
+def _build_explanations_rst() -> Dict[str, str]:
+    import mistune
+    from mistune.renderers.rst import RSTRenderer
+
+    md = mistune.create_markdown(renderer=RSTRenderer())
+    return {
+        code: markdown_explanation_to_rst(explanation, md)
+        for code, explanation in _get_all_edulint_explanations().items()
+    }
+
+
+def _save_store(path: str, key: str, explanations_rst: Dict[str, str]):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as f:
+        json.dump({"key": key, "explanations": explanations_rst}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)  # atomic, so concurrent Thonny instances never read a half-written store
+
+
+def _load_explanations_rst() -> Dict[str, str]:
+    path = get_explanations_store_path()
+    key = _current_store_key()
+
+    try:
+        with open(path, "r", encoding="utf8") as f:
+            store = json.load(f)
+        if store.get("key") == key:
+            return store["explanations"]
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    logger.info("Converting EduLint explanations to RST for %s.", key)
+    explanations_rst = _build_explanations_rst()
+    try:
+        _save_store(path, key, explanations_rst)
+    except OSError as e:
+        logger.warning("Could not save converted explanations: %s", e)
+    return explanations_rst
+
+
+def get_all_explanations_rst() -> Dict[str, str]:
+    global _explanations_rst
+    with _lock:
+        if _explanations_rst is None:
+            _explanations_rst = _load_explanations_rst()
+        return _explanations_rst
+
+
+def load_explanations_in_background() -> None:
+    global _loading_thread
+    if _explanations_rst is not None or _loading_thread is not None and _loading_thread.is_alive():
+        return
+
+    def load():
+        global _explanations_rst
+        try:
+            get_all_explanations_rst()
+        except Exception:
+            logger.exception("Could not load EduLint explanations")
+            _explanations_rst = {}  # not tried again in every warning shown
+
+    _loading_thread = threading.Thread(target=load, name="EduLintExplanations", daemon=True)
+    _loading_thread.start()
+
+
+def get_explanation_rst(code: str, wait: bool = True) -> Optional[str]:
+    """Without waiting, None means the explanations are being loaded in the background."""
+    if _explanations_rst is None and not wait:
+        load_explanations_in_background()
+        return None
+    return get_all_explanations_rst().get(code, "")
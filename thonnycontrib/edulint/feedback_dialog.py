@@ -13,6 +13,8 @@ from thonny.common import REPL_PSEUDO_FILENAME
 from thonny.misc_utils import running_on_mac_os
 from thonny.ui_utils import CommonDialog, get_hyperlink_cursor, scrollbar_style
 
+from thonnycontrib.edulint.version_probe import get_installed_version
+
 
 logger = getLogger(__name__)
 _last_feedback_timestamps: Dict[str, str] = {}
@@ -244,31 +246,13 @@ class FeedbackDialog(CommonDialog):
             "comments": self.comments_text_frame.text.get("1.0", "end"),
         }
 
-        try:
-            import mypy.version
-
-            submission["mypy_version"] = str(mypy.version.__version__)
-        except ImportError:
-            logger.exception("Could not get MyPy version")
-
-        try:
-            import pylint
-
-            submission["pylint_version"] = str(pylint.__version__)
-        except ImportError:
-            logger.exception("Could not get Pylint version")
-
-        try:
-            import flake8
-            submission["flake8_version"] = str(flake8.__version__)
-        except ImportError:
-            logger.exception("Could not get Flake8 version")
-
-        try:
-            import edulint
-            submission["edulint_version"] = str(edulint.__version__)
-        except ImportError:
-            logger.exception("Could not get EduLint version")
+        # from the packages' metadata, importing them would take a while
+        for distribution_name in ("mypy", "pylint", "flake8", "edulint"):
+            version = get_installed_version(distribution_name)
+            if version is None:
+                logger.warning("Could not get %s version", distribution_name)
+            else:
+                submission[f"{distribution_name}_version"] = version
 
         if self.include_snapshots_var.get():
             submission["snapshots"] = self.snapshots
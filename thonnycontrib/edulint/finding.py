@@ -0,0 +1,191 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Finding:
+    """One warning, as passed from the analyzers to the view and the caches.
+
+    Immutable and slotted, with its hash computed once, so that large result sets stay small
+    and deduplicating them is a set lookup per finding. to_dict() gives the dict shape of
+    Thonny's assistant API.
+    """
+
+    __slots__ = (
+        "filename", "lineno", "col_offset", "end_lineno", "end_col_offset", "code", "msg", "enabled_by",
+        "more_info_url", "_explanation_rst", "relevance", "fingerprint",
+    )
+
+    def __init__(
+        self,
+        filename: str,
+        lineno: Optional[int],
+        col_offset: Optional[int],
+        code: str,
+        msg: str,
+        enabled_by: Optional[str] = None,
+        end_lineno: Optional[int] = None,
+        end_col_offset: Optional[int] = None,
+        more_info_url: Optional[str] = None,
+        explanation_rst: Optional[str] = None,  # None means EduLint's explanation of the code
+        relevance: Optional[int] = None,  # orders the warnings on the same line, as in Thonny's assistant
+    ):
+        set_ = object.__setattr__
+        set_(self, "filename", filename)
+        set_(self, "lineno", lineno)
+        set_(self, "col_offset", col_offset)
+        set_(self, "end_lineno", end_lineno)
+        set_(self, "end_col_offset", end_col_offset)
+        set_(self, "code", code)
+        set_(self, "msg", msg)
+        set_(self, "enabled_by", enabled_by)
+        set_(self, "more_info_url", more_info_url)
+        set_(self, "_explanation_rst", explanation_rst)
+        set_(self, "relevance", relevance)
+        set_(self, "fingerprint", hash(self._key()))
+
+    def _key(self):
+        return (
+            self.filename, self.lineno, self.col_offset, self.end_lineno, self.end_col_offset, self.code,
+            self.msg, self.enabled_by, self.more_info_url, self._explanation_rst, self.relevance,
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Finding is immutable, use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Finding is immutable")
+
+    def __hash__(self):
+        return self.fingerprint
+
+    def __eq__(self, other):
+        if not isinstance(other, Finding):
+            return NotImplemented
+        return self.fingerprint == other.fingerprint and self._key() == other._key()
+
+    def __repr__(self):
+        return f"Finding({self.filename!r}, {self.lineno!r}, {self.col_offset!r}, {self.code!r}, {self.msg!r})"
+
+    def __reduce__(self):  # the slots can't be set by the default unpickling
+        return Finding.from_dict, (self.to_dict(include_explanation=self._explanation_rst is not None),)
+
+    @property
+    def explanation_rst(self) -> str:
+        return self.get_explanation_rst()
+
+    def get_explanation_rst(self, wait: bool = True) -> Optional[str]:
+        """Without waiting, None means EduLint's explanations are still being loaded."""
+        if self._explanation_rst is None:
+            from thonnycontrib.edulint.explanations import get_explanation_rst
+
+            return get_explanation_rst(self.code, wait)
+        return self._explanation_rst
+
+    def replace(self, **changes) -> "Finding":
+        values = self.to_dict(include_explanation=self._explanation_rst is not None)
+        values.update(changes)
+        return Finding.from_dict(values)
+
+    def to_dict(self, include_explanation: bool = True) -> Dict[str, Any]:
+        result = {
+            "msg": self.msg,
+            "filename": self.filename,
+            "lineno": self.lineno,
+            "col_offset": self.col_offset,
+            "end_lineno": self.end_lineno,
+            "end_col_offset": self.end_col_offset,
+            "code": self.code,
+            "enabled_by": self.enabled_by,
+        }
+        if self.more_info_url is not None:
+            result["more_info_url"] = self.more_info_url
+        if self.relevance is not None:
+            result["relevance"] = self.relevance
+        if include_explanation:
+            result["explanation_rst"] = self.explanation_rst
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Finding":
+        explanation_rst = data.get("explanation_rst")
+        if not explanation_rst and data.get("explanation"):
+            # the plain text explanation of Thonny's assistant API, used by analyzers of other plugins
+            from thonny import rst_utils
+
+            explanation_rst = rst_utils.escape(data["explanation"])
+        return cls(
+            data["filename"],
+            data.get("lineno"),
+            data.get("col_offset"),
+            data.get("code", ""),
+            data.get("msg", ""),
+            data.get("enabled_by"),
+            data.get("end_lineno"),
+            data.get("end_col_offset"),
+            data.get("more_info_url"),
+            explanation_rst,
+            data.get("relevance"),
+        )
+
+    @classmethod
+    def from_edulint(cls, problem: Dict[str, Any]) -> "Finding":
+        """Converts a problem from EduLint's JSON output."""
+        return cls(
+            problem["path"],
+            problem["line"],
+            problem["column"],
+            problem["code"],
+            problem["text"],
+            problem["enabled_by"],
+            problem.get("end_line"),
+            problem.get("end_column"),
+        )
+
+
+class FindingIndex:
+    """Groups findings by file, and counts them by code and by enabler, in a single pass.
+
+    Duplicates (pylint may report the same problem twice, e.g. when a module imports itself)
+    are kept out of by_file, but counted, as the summary always did.
+    """
+
+    def __init__(self, findings: Iterable[Finding]):
+        self.by_file: Dict[str, List[Finding]] = {}
+        self.code_counts: Counter = Counter()
+        self.enabler_counts: Counter = Counter()
+        self.total = 0
+
+        seen = set()
+        for finding in findings:
+            self.total += 1
+            self.code_counts[finding.code] += 1
+            self.enabler_counts[finding.enabled_by] += 1
+            if finding in seen:
+                continue
+            seen.add(finding)
+            self.by_file.setdefault(finding.filename, []).append(finding)
+
+
+def stable_keys(findings: List[Finding], sources: Dict[str, str]) -> List[tuple]:
+    """Keys identifying the findings across runs, even when the lines they are on move.
+
+    A key is the code, the file and the whitespace-normalized text of the finding's line (its number
+    if the file's source is not known), plus a counter telling apart the same problem on equal lines.
+    """
+    lines_per_file = {}
+    occurrences: Counter = Counter()
+    keys = []
+    for finding in findings:
+        if finding.filename not in lines_per_file:
+            source = sources.get(finding.filename)
+            lines_per_file[finding.filename] = source.splitlines() if source is not None else None
+
+        lines = lines_per_file[finding.filename]
+        if lines is not None and finding.lineno and finding.lineno <= len(lines):
+            line = " ".join(lines[finding.lineno - 1].split())
+        else:
+            line = finding.lineno
+        key = (finding.code, finding.filename, line)
+        occurrences[key] += 1
+        keys.append(key + (occurrences[key],))
+    return keys
@@ -0,0 +1,182 @@
+import ast
+import os
+import tokenize
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Dict, List, Optional, Set, Tuple
+
+from thonnycontrib.edulint.source_snapshot import SourceSnapshot
+
+logger = getLogger("EduLint")
+
+MODULE_EXTENSIONS = (".py", ".pyw")
+MAX_MODULES = 500  # a safety net against scripts next to huge directory trees
+
+
+@dataclass(frozen=True)
+class _Import:
+    module: Optional[str]  # None for `from . import x`
+    level: int  # 0 for absolute imports
+    names: Tuple[str, ...]  # imported names for `from` imports, which may be submodules
+
+
+@dataclass
+class _ModuleEntry:
+    fingerprint: tuple  # (mtime, size) of the file, or the hash of the snapshot it was given as
+    imports: Tuple[_Import, ...]
+
+
+def _parse_imports(root: Optional[ast.Module]) -> Tuple[_Import, ...]:
+    if root is None:
+        return ()
+
+    imports = []
+    for node in ast.walk(root):
+        if isinstance(node, ast.Import):
+            imports.extend(_Import(item.name, 0, ()) for item in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append(_Import(node.module, node.level, tuple(item.name for item in node.names)))
+    return tuple(imports)
+
+
+class ImportGraph:
+    """Finds the user's modules imported by a script, recursively, the way Python would find them.
+
+    Imports are resolved against the script's directory (the first entry of sys.path when it runs),
+    including packages and relative imports. Each module's imports are parsed once and kept until
+    its mtime or size changes, and directory listings are kept until the directory's mtime changes,
+    so resolving an unchanged project costs a stat per module and per directory.
+    """
+
+    def __init__(self):
+        self._modules: Dict[str, _ModuleEntry] = {}
+        self._listings: Dict[str, Tuple[int, Dict[str, bool]]] = {}  # dir -> (mtime, name -> is dir)
+        self.n_parsed = 0
+
+    def get_imported_files(self, main_file: str, source: Optional[SourceSnapshot] = None) -> Set[str]:
+        """Paths of the user's modules imported directly or indirectly by main_file.
+
+        source is main_file's content, if it's already read (or differs from the saved file).
+        """
+        root_dir = os.path.dirname(main_file)
+        main_key = os.path.normcase(main_file)
+        imported = {}  # normcased path -> path
+        to_visit = [main_file]
+        visited = set()
+        while to_visit and len(visited) < MAX_MODULES:
+            path = to_visit.pop()
+            key = os.path.normcase(path)
+            if key in visited:
+                continue
+            visited.add(key)
+
+            imports = self._get_imports(path, source if key == main_key else None)
+            for target in self._resolve_imports(path, imports, root_dir):
+                target_key = os.path.normcase(target)
+                if target_key != main_key and target_key not in imported:
+                    imported[target_key] = target
+                    to_visit.append(target)
+
+        if to_visit:
+            logger.warning("Stopped looking for imported modules of %s after %d of them", main_file, MAX_MODULES)
+        return set(imported.values())
+
+    def _get_imports(self, path: str, source: Optional[SourceSnapshot]) -> Tuple[_Import, ...]:
+        if source is not None:
+            fingerprint = ("sha256", source.sha256)
+        else:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return ()
+            fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._modules.get(path)
+        if entry is not None and entry.fingerprint == fingerprint:
+            return entry.imports
+
+        if source is None:
+            try:
+                with tokenize.open(path) as f:
+                    tree = ast.parse(f.read(), path)
+            except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+                tree = None
+        else:
+            tree = source.tree
+
+        self.n_parsed += 1
+        entry = _ModuleEntry(fingerprint, _parse_imports(tree))
+        self._modules[path] = entry
+        return entry.imports
+
+    def _list_dir(self, directory: str) -> Dict[str, bool]:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return {}
+
+        cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        entries = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        entries[entry.name] = entry.is_dir()
+                    except OSError:
+                        pass
+        except OSError:
+            return {}
+        self._listings[directory] = (mtime, entries)
+        return entries
+
+    def _resolve_imports(self, path: str, imports: Tuple[_Import, ...], root_dir: str) -> List[str]:
+        result = []
+        for imp in imports:
+            if imp.level == 0:
+                base_dir = root_dir
+            else:
+                base_dir = os.path.dirname(path)
+                for _ in range(imp.level - 1):
+                    base_dir = os.path.dirname(base_dir)
+
+            if imp.module is not None:
+                files, package_dir = self._resolve_module(base_dir, imp.module)
+                result.extend(files)
+            else:
+                package_dir = base_dir
+
+            if package_dir is not None:
+                # `from package import name` imports the submodule if there is one
+                for name in imp.names:
+                    if name != "*":
+                        result.extend(self._resolve_module(package_dir, name)[0])
+        return result
+
+    def _resolve_module(self, base_dir: str, dotted_name: str) -> Tuple[List[str], Optional[str]]:
+        """The files run by importing the module from base_dir (its packages' __init__ and the module itself),
+        and the directory of the module, if it's a package."""
+        files = []
+        directory = base_dir
+        for part in dotted_name.split("."):
+            entries = self._list_dir(directory)
+            package_dir = os.path.join(directory, part)
+            if entries.get(part) and "__init__.py" in self._list_dir(package_dir):
+                files.append(os.path.join(package_dir, "__init__.py"))
+                directory = package_dir
+                continue
+
+            module_files = [os.path.join(directory, part + ext) for ext in MODULE_EXTENSIONS if entries.get(part + ext) is False]
+            if module_files:
+                files.append(module_files[0])
+                return files, None
+            if entries.get(part):  # namespace package
+                directory = package_dir
+                continue
+            return files, None
+        return files, directory
+
+
+import_graph = ImportGraph()
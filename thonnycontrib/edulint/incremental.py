@@ -0,0 +1,563 @@
+"""Function-level incremental re-analysis of large files.
+
+After a full run, the module is split into regions -- top-level statements together with the
+blank lines and comments following them -- and the findings of each region are remembered.
+When the file changes, only the changed regions and the regions whose findings may depend on
+them are analyzed again. They are analyzed in a reduced module, in which the definitions they
+don't need are replaced by stubs of the same length. The remaining findings are taken over from
+the previous run, moved by the number of lines their region moved.
+
+Whenever the reuse can't be shown to give the same result as a full run, plan() returns None
+and the file has to be analyzed in full.
+"""
+import ast
+import atexit
+import hashlib
+import io
+import os
+import re
+import shutil
+import symtable
+import tempfile
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from thonnycontrib.edulint.result_cache import config_fingerprint
+
+logger = getLogger("EduLint")
+
+# smaller files are analyzed in full, it's fast enough
+MIN_LINES = 500
+# reduced modules which would keep most of the file aren't worth the bookkeeping
+MIN_STUBBED_SHARE = 0.25
+
+# Checks whose findings depend only on the top-level statement they are in, by name and by code.
+# Checks looking at neighbouring statements (sequential ifs, the initialization before a loop, code
+# after a raise) or comparing code across the module (the duplication checks) are left out, as are
+# the ones not reviewed yet: a config enabling any check not listed here is always analyzed in full.
+REGION_LOCAL_CHECKS = {
+    "superfluous-parens", "C0325",
+    "use-foreach", "R6307",
+    "use-enumerate", "R6308",
+    "simplifiable-if-return", "R6201",  # the return after the if is in the same function
+    "simplifiable-if-expr", "R6204",
+    "simplifiable-if-pass", "R6205",
+    "simplifiable-if-nested", "R6207",
+    "inconsistent-return-statements", "R1710",
+    "no-is-bool", "R6613",
+    "no-else-break", "R1723",
+    "no-else-continue", "R1724",
+    "redundant-elif", "R6611",
+    "redundant-arithmetic", "R6608",
+    "import-outside-toplevel", "C0415",
+    "use-dict-literal", "R1735",
+    "use-list-literal", "R1734",
+    "duplicate-value", "W0130",
+    "duplicate-key", "W0109",
+    "use-append", "R6601",
+    "use-augmented-assign", "R6609",
+    "unnecessary-pass", "W0107",
+    "use-literal-letter", "R6615",
+    "use-ord-letter", "R6614",
+    "pointless-statement", "W0104",
+    "pointless-string-statement", "W0105",
+    "no-loop-else", "R6604",
+    "no-while-true", "R6301",
+    "at-most-one-iteration-for-loop", "R6606",
+    "loop-shadows-control-variable", "R6306",
+    "changing-control-variable", "R6304",
+    "modifying-iterated-structure", "R6303",
+    "redefined-argument-from-local", "R1704",
+    "unneeded-not", "C0117",
+    "self-assigning-variable", "W0127",
+    "dangerous-default-value", "W0102",
+    "use-implicit-booleaness-not-len", "C1802",
+    "unnecessary-dunder-call", "C2801",
+    "unnecessary-dict-index-lookup", "R1733",
+    "unidiomatic-typecheck", "C0123",
+    "comparison-of-constants", "R0133",
+    "comparison-with-itself", "R0124",
+    "comparison-with-callable", "W0143",
+    "simplifiable-condition", "R1726",
+    "condition-evals-to-constant", "R1727",
+    "chained-comparison", "R1716",
+    "consider-using-get", "R1715",
+    "consider-using-max-builtin", "R1731",
+    "consider-using-min-builtin", "R1730",
+    "trailing-comma-tuple", "R1707",
+    "unreachable-else", "R6612",
+    "non-ascii-name", "C2401",
+    "no-self-argument", "E0213",
+    "unused-argument", "W0613",
+    "unnecessary-semicolon", "W0301",
+    "missing-parentheses-for-call-in-test", "W0126",
+    "for-target-subscript", "invalid-for-target", "E9984",
+    "one-iteration", "E9996",
+    "no-else-return", "R1705",
+    "no-value-in-one-branch-return", "R6206",
+    "no-method-argument", "E0211",
+    "return-in-init", "E0101",
+    "not-in-loop", "E0103",
+    "use-integral-division", "R6602",
+    "use-isdecimal", "R6603",
+    "do-not-multiply-mutable", "R6610",
+    "disallowed-name", "C0104",
+    "consider-using-from-import", "R0402",
+    "wildcard-import", "W0401",
+    "noop", "R6600",
+    # these depend on names bound in other statements, plan() re-analyzes the regions sharing them
+    "redefined-builtin", "W0622",
+    "redefined-outer-name", "W0621",
+    "function-redefined", "E0102",
+    "method-hidden", "E0202",
+    "attribute-defined-outside-init", "W0201",
+    "reimported", "W0404",  # its text mentions the other import's line, see _MENTIONS_LINE_RE
+}
+
+# Prefixes of the flake8 codes whose findings depend only on the lines of their region. The blank
+# line checks (E3) and the end-of-file ones (W391, W292) look at the neighbouring regions and the
+# last one, which plan() always re-analyzes. Unused and undefined names (F401, F811, F821...),
+# star imports (F403, F405) and imports not at the top (E402) depend on the whole module.
+REGION_LOCAL_FLAKE8_PREFIXES = (
+    "E1", "E2", "E3", "E401", "E5", "E7", "E9", "W1", "W2", "W3", "W6", "F5", "F6", "F7", "F841", "F901",
+)
+
+# pattern matching was added in Python 3.10
+_MATCH_CAPTURES = tuple(getattr(ast, name) for name in ("MatchAs", "MatchStar") if hasattr(ast, name))
+_MATCH_MAPPING = getattr(ast, "MatchMapping", ())
+
+# findings whose text refers to other lines, e.g. "Reimport 'os' (imported line 1)"
+_MENTIONS_LINE_RE = re.compile(r"\blines?\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Region:
+    start: int  # first line of the span, 1-based
+    end: int  # last line of the span, including the blank lines and comments after the statement
+    fingerprint: str  # of the span's text
+    context_fingerprint: str  # of what precedes the span and matters for the style checks of its first line
+    defines: FrozenSet[str]  # module-level names the region binds
+    references: FrozenSet[str]  # module-level names the region uses
+    local_names: FrozenSet[str]  # names local to its functions, checks for shadowing depend on module-level ones
+    mentions_edulint: bool  # may contain in-file configuration
+    stub: Optional[Tuple[str, ...]]  # lines replacing the span in a reduced module, None if it can't be stubbed
+
+
+def _split_lines(source: str) -> List[str]:
+    # only the line endings Python itself recognizes, unlike str.splitlines
+    return io.StringIO(source, newline="").readlines()
+
+
+def _hash(*parts: str) -> str:
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode("utf8", errors="surrogatepass") + b"\0")
+    return hasher.hexdigest()
+
+
+def _names_in(nodes) -> Tuple[set, set]:
+    """Returns names bound and names used in module scope by the given nodes (a superset of them)."""
+    bound, used = set(), set()
+    for root in nodes:
+        for node in ast.walk(root):
+            if isinstance(node, ast.Name):
+                (used if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+            elif isinstance(node, ast.alias):
+                bound.add(node.asname or node.name.split(".")[0])
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bound.add(node.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                used.update(node.names)
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, _MATCH_CAPTURES) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, _MATCH_MAPPING) and node.rest:
+                bound.add(node.rest)
+    return bound, used
+
+
+def _header_nodes(stmt) -> list:
+    """Parts of a definition which are evaluated in module scope."""
+    nodes = list(stmt.decorator_list)
+    if isinstance(stmt, ast.ClassDef):
+        nodes += stmt.bases + stmt.keywords
+    else:
+        args = stmt.args
+        nodes += args.defaults + [d for d in args.kw_defaults if d is not None]
+        nodes += [
+            a.annotation for a in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]
+            if a is not None and a.annotation is not None
+        ]
+        if stmt.returns is not None:
+            nodes.append(stmt.returns)
+    return nodes
+
+
+def _scope_names(table) -> Tuple[set, set, set, bool]:
+    """Returns module-level names used and assigned within the scope, its local names,
+    and whether it declares globals."""
+    used, assigned, local, declares_global = set(), set(), set(), False
+    for symbol in table.get_symbols():
+        if symbol.is_global():
+            if symbol.is_referenced():
+                used.add(symbol.get_name())
+            if symbol.is_assigned():
+                assigned.add(symbol.get_name())
+        else:
+            local.add(symbol.get_name())
+        if symbol.is_declared_global():
+            declares_global = True
+    for child in table.get_children():
+        child_used, child_assigned, child_local, child_declares = _scope_names(child)
+        used |= child_used
+        assigned |= child_assigned
+        local |= child_local
+        declares_global = declares_global or child_declares
+    return used, assigned, local, declares_global
+
+
+def _make_stub(lines: List[str], start: int, stmt, names: List[str]) -> Optional[Tuple[str, ...]]:
+    """Keeps the header of the definition, replaces its body by a tuple of the global names it uses."""
+    body_start = stmt.body[0].lineno
+    if body_start <= stmt.lineno or body_start > stmt.end_lineno:
+        return None  # the body starts on the header's line
+
+    body_line = lines[body_start - 1]
+    indent = body_line[: len(body_line) - len(body_line.lstrip(" \t"))]
+    n_body_lines = stmt.end_lineno - body_start + 1
+
+    if n_body_lines == 1:
+        body = [indent + "(" + "".join(name + ", " for name in names) + ")\n"]
+    else:
+        per_line = -(-len(names) // (n_body_lines - 1)) if names else 0
+        body = [indent + "(" + "".join(name + ", " for name in names[:per_line]) + "\n"]
+        for i in range(1, n_body_lines - 1):
+            body.append(indent + "".join(name + ", " for name in names[i * per_line: (i + 1) * per_line]) + "\n")
+        body.append(indent + ")\n")
+
+    header = lines[start - 1: body_start - 1]
+    return tuple(header + body)
+
+
+def split_regions(source: str, filename: str = "<module>") -> Optional[List[Region]]:
+    """Splits the module into regions, None if it can't be parsed."""
+    try:
+        tree = ast.parse(source, filename)
+        table = symtable.symtable(source, filename, "exec")
+    except (SyntaxError, ValueError):
+        return None
+
+    lines = _split_lines(source)
+    if not tree.body or not lines:
+        return None
+
+    scopes = {(child.get_name(), child.get_lineno()): child for child in table.get_children()}
+
+    # statements sharing a line (e.g. separated by ';') belong to the same region
+    groups = []
+    for stmt in tree.body:
+        first_line = min([stmt.lineno] + [d.lineno for d in getattr(stmt, "decorator_list", [])])
+        if groups and first_line <= groups[-1][2]:
+            groups[-1][1].append(stmt)
+            groups[-1][2] = max(groups[-1][2], stmt.end_lineno)
+        else:
+            groups.append([first_line, [stmt], stmt.end_lineno])
+    groups[0][0] = 1  # leading comments belong to the first region
+
+    regions = []
+    for i, (start, stmts, stmt_end) in enumerate(groups):
+        end = groups[i + 1][0] - 1 if i + 1 < len(groups) else len(lines)
+        text = "".join(lines[start - 1: end])
+
+        if i == 0:
+            context = ""
+        else:
+            previous_start, _, previous_stmt_end = groups[i - 1]
+            context = lines[previous_start - 1] + "".join(lines[previous_stmt_end - 1: start - 1])
+
+        stub = None
+        local_names = set()
+        stmt = stmts[0]
+        if len(stmts) == 1 and isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            header_bound, header_used = _names_in(_header_nodes(stmt))
+            scope = scopes.get((stmt.name, stmt.lineno))
+            if scope is None:
+                defines, references = _names_in(stmts)
+            else:
+                body_used, body_assigned, local_names, declares_global = _scope_names(scope)
+                defines = {stmt.name} | body_assigned | header_bound
+                references = header_used | body_used
+                if not declares_global and "edulint" not in text:
+                    stub = _make_stub(lines, start, stmt, sorted(body_used))
+        else:
+            defines, references = _names_in(stmts)
+
+        regions.append(Region(
+            start=start,
+            end=end,
+            fingerprint=_hash(text),
+            context_fingerprint=_hash(context),
+            defines=frozenset(defines),
+            references=frozenset(references),
+            local_names=frozenset(local_names),
+            mentions_edulint="edulint" in text,
+            stub=stub + tuple(lines[stmt_end: end]) if stub is not None else None,
+        ))
+    return regions
+
+
+def _region_index(regions: List[Region], line: int) -> int:
+    low, high = 0, len(regions) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if regions[middle].start <= line:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _move(problem: Dict[str, Any], path: str, delta: int) -> Dict[str, Any]:
+    moved = dict(problem, path=path, line=problem["line"] + delta)
+    if moved.get("end_line") is not None:
+        moved["end_line"] += delta
+    return moved
+
+
+def _is_incremental_config(config: Optional[Dict[str, Any]]) -> bool:
+    """Only configs enabling an explicit list of checks, all of them region-local, are safe.
+
+    The default configs enable checks looking at the whole module (invalid-name, F401, F821...),
+    so the incremental analysis only applies to configs restricted to the checks listed above.
+    """
+    if config is None:
+        return False
+    pylint_args = config.get("pylint", [])
+    if "--disable=all" not in pylint_args:
+        return False
+    for arg in pylint_args:
+        if arg.startswith("--enable="):
+            enabled = {check.strip() for check in arg[len("--enable="):].split(",") if check.strip()}
+            if not enabled <= REGION_LOCAL_CHECKS:
+                return False
+    if config.get("no-flake8"):
+        return True
+    for arg in config.get("flake8", []):
+        if arg.startswith(("--select=", "--extend-select=")):
+            selected = [code.strip() for code in arg.split("=", 1)[1].split(",") if code.strip()]
+            if not all(code.startswith(REGION_LOCAL_FLAKE8_PREFIXES) for code in selected):
+                return False
+    return True
+
+
+@dataclass
+class _FileState:
+    edulint_version: Optional[str]
+    config: Dict[str, Any]
+    config_fingerprint: str
+    n_lines: int
+    ends_with_newline: bool
+    regions: List[Region]
+    problems: List[List[Dict[str, Any]]]  # per region
+
+
+class IncrementalPlan:
+    """Which regions are analyzed again and which findings are taken over from the previous run."""
+
+    def __init__(
+        self, path: str, source: str, regions: List[Region], reused: Dict[int, List[Dict[str, Any]]], stubbed: Set[int]
+    ):
+        self.path = path
+        self.source = source
+        self.regions = regions
+        self.reused = reused
+
+        lines = _split_lines(source)
+        reduced = []
+        self.stubbed_lines = 0
+        for i, region in enumerate(regions):
+            if i in stubbed:
+                reduced.extend(region.stub)
+                self.stubbed_lines += region.end - region.start + 1
+            else:
+                reduced.extend(lines[region.start - 1: region.end])
+        self.reduced_source = "".join(reduced)
+        self.n_lines = len(lines)
+
+    @property
+    def reanalyzed(self) -> List[int]:
+        return [i for i in range(len(self.regions)) if i not in self.reused]
+
+    def merge(self, problems: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Combines the findings of the reduced module with the reused ones, None if they don't fit."""
+        new_per_region = defaultdict(list)
+        for problem in problems:
+            line = problem.get("line")
+            if not isinstance(line, int) or not 1 <= line <= self.n_lines:
+                return None
+            new_per_region[_region_index(self.regions, line)].append(problem)
+
+        result = []
+        for i in range(len(self.regions)):
+            if i in self.reused:
+                result.extend(self.reused[i])
+            else:
+                result.extend(dict(problem, path=self.path) for problem in new_per_region[i])
+        return result
+
+    def write_reduced_module(self) -> str:
+        """Writes the reduced module under the file's own name, so that the module name stays the same."""
+        path = os.path.join(_get_work_dir(), os.path.basename(self.path))
+        with open(path, "w", encoding="utf8", newline="") as f:
+            f.write(self.reduced_source)
+        return path
+
+
+_work_dir = None
+
+
+def _get_work_dir() -> str:
+    global _work_dir
+    if _work_dir is None or not os.path.isdir(_work_dir):
+        _work_dir = tempfile.mkdtemp(prefix="thonny-edulint-incremental-")
+        atexit.register(shutil.rmtree, _work_dir, True)
+    return _work_dir
+
+
+class IncrementalIndex:
+    def __init__(self, max_files: int = 16):
+        self.max_files = max_files
+        self._states: "OrderedDict[str, _FileState]" = OrderedDict()
+
+    def forget(self, path: str):
+        self._states.pop(path, None)
+
+    def record(
+        self, path: str, source: str, problems: List[Dict[str, Any]], config: Optional[Dict[str, Any]],
+        edulint_version: Optional[str]
+    ):
+        """Remembers the findings of a complete analysis of source, so that the next one can reuse them."""
+        self.forget(path)
+        lines = _split_lines(source)
+        if len(lines) < MIN_LINES or not _is_incremental_config(config):
+            return
+
+        regions = split_regions(source, path)
+        if regions is None:
+            return
+
+        per_region = [[] for _ in regions]
+        for problem in problems:
+            line = problem.get("line")
+            if problem.get("path") != path or not isinstance(line, int) or not 1 <= line <= len(lines):
+                return
+            per_region[_region_index(regions, line)].append(problem)
+
+        self._states[path] = _FileState(
+            edulint_version, config, config_fingerprint(config), len(lines), source.endswith(("\n", "\r")),
+            regions, per_region
+        )
+        while len(self._states) > self.max_files:
+            self._states.popitem(last=False)
+
+    def plan(self, path: str, source: str, edulint_version: Optional[str]) -> Optional[IncrementalPlan]:
+        state = self._states.get(path)
+        if state is None:
+            return None
+        self._states.move_to_end(path)
+
+        if state.edulint_version != edulint_version or config_fingerprint(state.config) != state.config_fingerprint:
+            return None
+
+        regions = split_regions(source, path)
+        if regions is None or regions[-1].end < MIN_LINES:
+            return None
+        old_regions = state.regions
+
+        # unchanged regions, matched in order -- a moved region counts as removed and added
+        old_positions = defaultdict(deque)
+        for j, region in enumerate(old_regions):
+            old_positions[region.fingerprint].append(j)
+        matches = {}
+        last_matched = -1
+        for i, region in enumerate(regions):
+            candidates = old_positions.get(region.fingerprint)
+            while candidates and candidates[0] <= last_matched:
+                candidates.popleft()
+            if candidates:
+                matches[i] = last_matched = candidates.popleft()
+
+        changed = [regions[i] for i in range(len(regions)) if i not in matches]
+        matched_old = set(matches.values())
+        changed += [old_regions[j] for j in range(len(old_regions)) if j not in matched_old]
+        if not changed:
+            return None  # the same code, the result cache takes care of that
+        if any(region.mentions_edulint for region in changed):
+            return None  # in-file configuration may have changed
+
+        # names whose values may differ, and names the changed code used or bound
+        changed_defines = set().union(*(region.defines for region in changed))
+        changed_values = set(changed_defines)
+        touched_names = set().union(*(region.defines | region.references for region in changed))
+        layout_changed = any(regions[i].start != old_regions[j].start for i, j in matches.items())
+
+        dirty = {i for i in range(len(regions)) if i not in matches}
+        dirty.add(0)  # module-level checks report on the first line
+        if not source.endswith(("\n", "\r")) or not state.ends_with_newline:
+            dirty.add(len(regions) - 1)  # missing final newline is reported on the last line
+        for i, j in matches.items():
+            if (
+                regions[i].context_fingerprint != old_regions[j].context_fingerprint
+                or regions[i].defines & touched_names
+                or regions[i].local_names & changed_defines
+                or layout_changed and any(_MENTIONS_LINE_RE.search(p.get("text", "")) for p in state.problems[j])
+            ):
+                dirty.add(i)
+
+        # regions using names whose values changed have to be analyzed again, and so on transitively
+        grew = True
+        while grew:
+            grew = False
+            for i in matches:
+                if i not in dirty and regions[i].references & changed_values:
+                    dirty.add(i)
+                    changed_values |= regions[i].defines
+                    grew = True
+
+        # the analyzed regions need everything they use in full, for inference
+        definers = defaultdict(list)
+        for i, region in enumerate(regions):
+            for name in region.defines:
+                definers[name].append(i)
+        needed = set(dirty)
+        stack = list(dirty)
+        while stack:
+            for name in regions[stack.pop()].references:
+                for k in definers.get(name, []):
+                    if k not in needed:
+                        needed.add(k)
+                        stack.append(k)
+
+        reused = {}
+        for i, j in matches.items():
+            if i not in dirty:
+                delta = regions[i].start - old_regions[j].start
+                reused[i] = [_move(problem, path, delta) for problem in state.problems[j]]
+
+        # regions needed as context are reused as well, but must be kept in full in the reduced module
+        stubbed = {i for i in reused if i not in needed and regions[i].stub is not None}
+        plan = IncrementalPlan(path, source, regions, reused, stubbed)
+        if plan.stubbed_lines < MIN_STUBBED_SHARE * plan.n_lines:
+            return None
+
+        logger.info(
+            "Analyzing %d of %d regions of %s again, %d of %d lines stubbed.",
+            len(dirty), len(regions), path, plan.stubbed_lines, plan.n_lines
+        )
+        return plan
+
+
+incremental_index = IncrementalIndex()
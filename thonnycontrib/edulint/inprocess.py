@@ -0,0 +1,142 @@
+"""Runs EduLint inside Thonny's own process, on a background thread.
+
+Has the same interface as worker.EdulintWorker, so the analyzer can use either of them.
+The checks change process-wide state while they run (sys.path, loguru's handlers, pylint's
+and flake8's globals), which other plugins running at the same time would see.
+"""
+import os
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import List, Optional, Sequence
+
+from thonny import get_workbench
+
+from thonnycontrib.edulint.utils import add_path, get_pylint_plugins_dir
+from thonnycontrib.edulint.worker import PartialCallback, WorkerCallback
+
+logger = getLogger("EduLint")
+
+
+class InProcessEngine:
+    POLL_DELAY_MS = 50
+
+    def __init__(self):
+        # pylint and flake8 keep global state, so the checks must not run concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="EduLint")
+        self._next_id = 0
+        self._pending = {}
+        self._events = queue.Queue()
+        self._polling = False
+        self._edulint_importable = None
+
+    def is_usable(self) -> bool:
+        """False once edulint failed to import. The import itself happens with the first check, off the UI thread."""
+        return self._edulint_importable is not False
+
+    def _import_edulint(self) -> bool:
+        # runs in the background thread
+        if self._edulint_importable is None:
+            try:
+                with add_path(get_pylint_plugins_dir()):
+                    import edulint.edulint  # noqa: F401
+                    import thonnycontrib.edulint.worker_server  # noqa: F401
+                self._edulint_importable = True
+            except Exception:
+                logger.exception("EduLint can't be imported into Thonny's process, using subprocesses instead.")
+                self._edulint_importable = False
+        return self._edulint_importable
+
+    def submit(
+        self,
+        files: List[str],
+        options: List[str],
+        on_completion: WorkerCallback,
+        on_partial: Optional[PartialCallback] = None,
+        import_dirs: Sequence[str] = (),
+    ) -> int:
+        self._next_id += 1
+        request_id = self._next_id
+        self._pending[request_id] = {"on_completion": on_completion, "on_partial": on_partial}
+        self._executor.submit(
+            self._run, request_id, list(files), list(options), on_partial is not None, list(import_dirs)
+        )
+        self._schedule_poll()
+        return request_id
+
+    def cancel(self, request_id: int):
+        """The running check can't be interrupted, its result just gets dropped."""
+        self._pending.pop(request_id, None)
+
+    def _run(self, request_id, files, options, stream, import_dirs):
+        # runs in the background thread
+        if request_id not in self._pending:
+            return
+
+        if not self._import_edulint():
+            self._events.put((request_id, "done", None))
+            return
+
+        from thonnycontrib.edulint.worker_server import check_to_json
+
+        on_partial = (lambda problems: self._events.put((request_id, "partial", problems))) if stream else None
+        try:
+            out, err = check_to_json(files, options, on_partial, import_dirs)
+        except Exception:
+            logger.exception("EduLint failed in Thonny's process.")
+            self._events.put((request_id, "done", None))
+            return
+        self._events.put((request_id, "done", (out, err)))
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            get_workbench().after(self.POLL_DELAY_MS, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                request_id, kind, data = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            request = self._pending.get(request_id)
+            if request is None:
+                continue  # cancelled
+            if kind == "partial":
+                request["on_partial"](data)
+            else:
+                del self._pending[request_id]
+                if data is None:  # failed, to be re-run in a subprocess
+                    request["on_completion"]("", "", True)
+                else:
+                    out, err = data
+                    request["on_completion"](out, err, False)
+
+        if self._pending:
+            self._schedule_poll()
+
+
+_engine: Optional[InProcessEngine] = None
+
+
+def _same_interpreter(a: str, b: str) -> bool:
+    return os.path.normcase(os.path.realpath(a)) == os.path.normcase(os.path.realpath(b))
+
+
+def get_inprocess_engine(python_executable: str) -> Optional[InProcessEngine]:
+    """Returns the shared in-process engine, or None if edulint can't run in Thonny's process.
+
+    Only Thonny's own interpreter sees the same edulint as the subprocesses would, with another
+    one (e.g. a virtual environment chosen in Thonny's options) the analysis runs there instead.
+    """
+    global _engine
+    if not _same_interpreter(python_executable, sys.executable):
+        return None
+    if _engine is None:
+        _engine = InProcessEngine()
+    if not _engine.is_usable():
+        return None
+    return _engine
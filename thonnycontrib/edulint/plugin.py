@@ -0,0 +1,599 @@
+"""The Thonny side of thonny-edulint: the analyzer, its configuration page and load_plugin"""
+import logging
+import subprocess
+import sys
+import json
+from functools import partial
+from pathlib import Path
+import traceback
+import os
+import time
+
+from tkinter import ttk
+
+from thonny import get_workbench, ui_utils
+from thonny.config_ui import ConfigurationPage
+from thonny.languages import tr
+from thonny.running import get_front_interpreter_for_subprocess
+
+from thonnycontrib.edulint.view import EduLintView, SubprocessProgramAnalyzer, add_program_analyzer
+from thonnycontrib.edulint.update_dialog import check_updates_with_notification, UpdateDialog
+from thonnycontrib.edulint.reporting import get_reporting_user_id, get_reporting_server_settings, send_code, send_results, send_errors, send_spooled_reports, close_reporting, refresh_allowed_report_kinds, EdulintReportingFirstTimeDialog
+from thonnycontrib.edulint.announcement_dialog import check_for_announcement, AnnouncementDialog
+from thonnycontrib.edulint.worker import get_worker
+from thonnycontrib.edulint.inprocess import get_inprocess_engine
+from thonnycontrib.edulint.process_pool import get_process_pool
+from thonnycontrib.edulint.result_cache import result_cache, compute_cache_key
+from thonnycontrib.edulint.incremental import incremental_index
+from thonnycontrib.edulint.version_checker import PackageInfoManager
+from thonnycontrib.edulint.explanations import get_explanation_rst, load_explanations_in_background
+from thonnycontrib.edulint.finding import Finding
+from thonnycontrib.edulint.source_snapshot import SourceSnapshot
+
+
+class LintingError(Exception):
+    pass
+
+
+class EdulintAnalyzer(SubprocessProgramAnalyzer):
+    """The analyzer itself"""
+
+    def __init__(self, on_completion):
+        super().__init__(on_completion)
+        self._worker = None
+        self._worker_request_id = None
+        self._cache_key = None
+        self._started_at = None
+        self._main_file_path = None
+        self._remaining_paths = set()
+        self._warnings_per_file = {}
+        self._main_config = None
+        self._imported_file_jobs = {}
+        self._deferred_imported_paths = []
+        self._edulint_version = None
+        self._main_source = None
+        self._incremental_source = None
+
+    def is_enabled(self):
+        """Returns if the user has the option enabled"""
+        return get_workbench().get_option("edulint.enabled")
+
+    # kudos for env preparation goes to @ettore-galli https://github.com/ettore-galli/thonny-black-formatter/blob/main/thonnycontrib/black_formatter/__init__.py#L41
+    # we just copy the env and pass it as variable, instead of overwriting os.environ thonny-wide
+    def prepare_run_environment(self):
+        env = os.environ.copy()
+
+        plugins_folders = [folder for folder in sys.path if "plugins" in folder]
+        plugins_folder = os.path.join(plugins_folders[0])
+        binfolder = plugins_folder.replace("lib/python/site-packages", "bin")
+
+        env["PYTHONPATH"] = plugins_folder + (
+            ":" + env["PYTHONPATH"] if "PYTHONPATH" in env.keys() else ""
+        )
+        env["PATH"] = binfolder + ":" + plugins_folder + ":" + env["PATH"]
+        return env
+
+    def start_analysis(self, main_file_path, imported_file_paths):
+        """Runs edulint on the currently open file."""
+        self._main_source = self._get_source(main_file_path)
+        if get_workbench().get_option("edulint.enable_code_remote_reporting", default=False):
+            send_code(main_file_path, self._get_text(self._main_source))
+
+        # the view shows the findings without explanations until they are loaded
+        load_explanations_in_background()
+
+        edulint_version = PackageInfoManager.get_local_module_version("edulint")
+        self._edulint_version = edulint_version
+        imported_file_paths = set(imported_file_paths) - {main_file_path}
+        self._main_file_path = main_file_path
+        self._remaining_paths = {main_file_path, *imported_file_paths}
+
+        for path in sorted(imported_file_paths):
+            self._start_imported_file_analysis(path, edulint_version)
+
+        self._cache_key = compute_cache_key(main_file_path, imported_file_paths, edulint_version, self.sources)
+        cached = result_cache.get(self._cache_key)
+        if cached is not None:
+            # The result isn't reported again: it was reported when it was computed, and it's cached only
+            # for the same code and edulint version. The code itself was reported above, so the run still is.
+            self._count_successful_lint()
+            self._file_done(main_file_path, list(cached.warnings), cached.config)
+            return
+
+        self._started_at = time.perf_counter()
+        if get_workbench().get_option("edulint.incremental_analysis"):
+            self._incremental_source = self._get_text(self._main_source)
+            if self._incremental_source is not None:
+                plan = incremental_index.plan(main_file_path, self._incremental_source, edulint_version)
+                if plan is not None:
+                    self._start_incremental_analysis(main_file_path, plan)
+                    return
+
+        if get_workbench().get_option("edulint.use_in_process_engine"):
+            self._worker = get_inprocess_engine(get_front_interpreter_for_subprocess())
+        if self._worker is None:
+            self._worker = get_worker(get_front_interpreter_for_subprocess(), self.prepare_run_environment())
+
+        if self._worker is not None:
+            self._worker_request_id = self._worker.submit(
+                [main_file_path],
+                [],
+                partial(self._on_worker_completion, main_file_path),
+                self._on_worker_partial if self.partial_warnings_handler is not None else None,
+                self.import_dirs,
+            )
+        else:
+            self._start_subprocess_analysis(main_file_path)
+
+    def _start_imported_file_analysis(self, path, edulint_version):
+        """Imported modules are linted on their own, skipping unchanged ones.
+
+        The changed ones wait for the main file's results, and then run at a lower priority.
+        """
+        cache_key = compute_cache_key(path, [], edulint_version, self.sources)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            self._file_done(path, list(cached.warnings))
+            return
+        self._deferred_imported_paths.append((path, cache_key))
+
+    def _start_deferred_imported_file_analyses(self):
+        for path, cache_key in self._deferred_imported_paths:
+            self._imported_file_jobs[path] = get_process_pool().submit(
+                self._get_edulint_command(path),
+                self.prepare_run_environment(),
+                partial(self._parse_imported_file_warnings, path, cache_key),
+                low_priority=True,
+            )
+        self._deferred_imported_paths = []
+
+    def _parse_imported_file_warnings(self, path, cache_key, _, out_lines, err_lines):
+        job = self._imported_file_jobs.pop(path, None)
+        if err_lines:
+            logging.getLogger("EduLint").error("".join(err_lines))
+
+        out = "".join(out_lines)
+        try:
+            edulint_result = json.loads(out)
+        except json.decoder.JSONDecodeError:
+            logging.getLogger("EduLint").error("failed to parse EduLint's JSON output for %s: '%s'", path, out)
+            self._file_done(path, [])
+            return
+
+        warnings = [self._edulint_finding_to_thonny_format(finding) for finding in edulint_result["problems"]]
+        config = edulint_result["configs"][0] if len(edulint_result.get("configs", [])) == 1 else None
+        if self._is_unchanged(path) and job is not None and job.started_at is not None:
+            result_cache.put(cache_key, warnings, config, time.perf_counter() - job.started_at)
+        self._file_done(path, warnings)
+
+    def _file_done(self, path, warnings, config=None):
+        if self.cancelled:
+            return
+
+        self._warnings_per_file[path] = warnings
+        if config is not None:
+            self._main_config = config
+        self._remaining_paths.discard(path)
+
+        paths = sorted(self._warnings_per_file, key=lambda p: (p != self._main_file_path, p))
+        warnings_so_far = [w for p in paths for w in self._warnings_per_file[p]]
+        if not self._remaining_paths:
+            self.completion_handler(self, warnings_so_far, self._main_config)
+        elif path == self._main_file_path:
+            # the main file's warnings are shown right away, the imported modules' come later
+            self.completion_handler(self, warnings_so_far, self._main_config, final=False)
+            self._start_deferred_imported_file_analyses()
+
+    def _on_worker_completion(self, main_file_path, out, err, failed):
+        self._worker_request_id = None
+        if failed:
+            logging.getLogger("EduLint").warning("EduLint engine failed, falling back to a one-shot process.")
+            self._start_subprocess_analysis(main_file_path)
+            return
+        self._parse_and_output_warnings(main_file_path, None, [out], [err] if err else [])
+
+    def _on_worker_partial(self, edulint_findings):
+        warnings = [self._edulint_finding_to_thonny_format(finding) for finding in edulint_findings]
+        self.partial_warnings_handler(self, warnings)
+
+    @staticmethod
+    def _get_edulint_command(file_path):
+        python_executable_path = get_front_interpreter_for_subprocess()
+        return [python_executable_path, "-m", "edulint", "check", "--disable-version-check", "--json", file_path]
+
+    def _prepare_analysis_environment(self, *import_dirs):
+        """The run environment, with import_dirs and the analyzer's ones searched for imports first."""
+        env = self.prepare_run_environment()
+        env["PYTHONPATH"] = os.pathsep.join([*import_dirs, *self.import_dirs, env["PYTHONPATH"]])
+        return env
+
+    def _start_subprocess_analysis(self, main_file_path):
+        self._proc = ui_utils.popen_with_ui_thread_callback(
+            self._get_edulint_command(main_file_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            env=self._prepare_analysis_environment(),
+            on_completion=partial(self._parse_and_output_warnings, main_file_path),
+        )
+
+    def _start_incremental_analysis(self, main_file_path, plan):
+        """Analyzes only the changed parts of a large file, see thonnycontrib.edulint.incremental."""
+        try:
+            reduced_path = plan.write_reduced_module()
+        except OSError as e:
+            logging.getLogger("EduLint").warning("Could not write the reduced module: %s", e)
+            self._start_subprocess_analysis(main_file_path)
+            return
+
+        self._proc = ui_utils.popen_with_ui_thread_callback(
+            self._get_edulint_command(reduced_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            # imports are still resolved from the file's own directory
+            env=self._prepare_analysis_environment(os.path.dirname(main_file_path)),
+            on_completion=partial(self._parse_incremental_warnings, main_file_path, plan),
+        )
+
+    def _parse_incremental_warnings(self, main_file_path, plan, _, out_lines, err_lines):
+        if self.cancelled:
+            return
+
+        try:
+            edulint_result = json.loads("".join(out_lines))
+            problems = plan.merge(edulint_result["problems"])
+        except (json.decoder.JSONDecodeError, KeyError, TypeError):
+            problems = None
+
+        if problems is None:
+            logging.getLogger("EduLint").info("Analyzing %s in full, the incremental result didn't fit.", main_file_path)
+            self._start_subprocess_analysis(main_file_path)
+            return
+
+        edulint_result["problems"] = problems
+        self._parse_and_output_warnings(main_file_path, None, [json.dumps(edulint_result)], err_lines)
+
+    def cancel_analysis(self):
+        if self._worker_request_id is not None:
+            self._worker.cancel(self._worker_request_id)
+            self._worker_request_id = None
+        for job in self._imported_file_jobs.values():
+            get_process_pool().cancel(job)
+        self._imported_file_jobs = {}
+        self._deferred_imported_paths = []
+        super().cancel_analysis()
+
+    def _parse_and_output_warnings(self, main_file_path, _, out_lines, err_lines):
+        """Parses the edulint output and sends it to thonny"""
+
+        if err_lines:
+            logging.getLogger("EduLint").error("".join(err_lines))
+
+        if get_workbench().get_option("edulint.enable_exception_remote_reporting", default=False):
+            err_str = "".join(err_lines)
+            if err_str:
+                send_errors(main_file_path, err_str)
+                # TODO: This is covering edulint errors, but not thonny edulint errors
+
+        out = "".join(out_lines)
+        if get_workbench().get_option("edulint.enable_result_remote_reporting", default=False):
+            send_results(main_file_path, out)
+
+        try:
+            edulint_result = json.loads(out)
+        except json.decoder.JSONDecodeError as e:
+            logging.getLogger("EduLint").error("failed to parse EduLint's JSON output: '%s'", out)
+            logging.getLogger("EduLint").error(e, exc_info=True)
+
+            if get_workbench().get_option("edulint.enable_exception_remote_reporting", default=False):
+                send_errors(main_file_path, traceback.format_exc())
+
+            warnings = [
+                Finding(
+                    "EMPTY",
+                    1,
+                    1,
+                    "X000",
+                    "Linting failed. Try running EduLint again or restart Thonny.",
+                    enabled_by="thonny-edulint",
+                    explanation_rst="",
+                )
+            ]
+            self._file_done(main_file_path, warnings)
+            return
+
+        warnings = []
+        for edulint_finding in edulint_result["problems"]:
+            thonny_finding = self._edulint_finding_to_thonny_format(edulint_finding)
+            warnings.append(thonny_finding)
+
+        if len(edulint_result["configs"]) != 1:
+            config = None
+        else:
+            config = edulint_result["configs"][0]
+
+        self._count_successful_lint()
+
+        # the linters read the files themselves, their results are only kept if they saw the same content
+        unchanged = self._is_unchanged(main_file_path)
+        if self._incremental_source is not None and unchanged:
+            incremental_index.record(
+                main_file_path, self._incremental_source, edulint_result["problems"], config, self._edulint_version
+            )
+
+        if self._started_at is not None and unchanged:
+            # a copy analyzed elsewhere (the editor's buffer in lint-as-you-type mode) is in a temporary
+            # directory of this session, so its results are only kept in memory
+            result_cache.put(
+                self._cache_key, warnings, config, time.perf_counter() - self._started_at, persist=not self.import_dirs
+            )
+
+        self._file_done(main_file_path, warnings, config)
+
+    @staticmethod
+    def _count_successful_lint():
+        if get_workbench().get_option("edulint.enable_first_time_reporting_dialog"):
+            n_successful_lints_until_first_time_reporting_dialog = get_workbench().get_option("edulint.n_successful_lints_until_first_time_reporting_dialog") - 1
+            get_workbench().set_option("edulint.n_successful_lints_until_first_time_reporting_dialog", n_successful_lints_until_first_time_reporting_dialog)
+
+            if n_successful_lints_until_first_time_reporting_dialog <= 0 and get_workbench().get_option("edulint.has_user_seen_reporting_dialog", False) is False:
+                get_workbench().set_option("edulint.has_user_seen_reporting_dialog", True)
+                get_workbench().event_generate("<<EduLintOpenReportingFirstTimeDialog>>", when="tail")
+
+    def _get_source(self, path):
+        """The snapshot of the file taken by the view, or a new one if there is none."""
+        if path not in self.sources:
+            try:
+                self.sources[path] = SourceSnapshot.read(path)
+            except OSError:
+                return None
+        return self.sources[path]
+
+    @staticmethod
+    def _get_text(source):
+        try:
+            return source.text if source is not None else None
+        except (SyntaxError, UnicodeDecodeError):
+            return None
+
+    def _is_unchanged(self, path):
+        source = self.sources.get(path)
+        return source is not None and source.is_current()
+
+    @classmethod
+    def _edulint_finding_to_thonny_format(cls, edulint_finding):
+        # explanations are looked up by code only when the finding is shown, see Finding.explanation_rst
+        return Finding.from_edulint(edulint_finding)
+
+    @classmethod
+    def _get_single_edulint_explanation_in_rst(cls, code: str) -> str:
+        return get_explanation_rst(code)
+
+
+class EdulintConfigPage(ConfigurationPage):
+    def __init__(self, master):
+        super().__init__(master)
+
+        self.add_checkbox(
+            "edulint.enabled",
+            "Enable EduLint analysis\n"
+            "Enabling EduLint analysis disables PyLint for Assistant, "
+            "as EduLint provides equivalent and improved functionality.",
+            row=2,
+            columnspan=2,
+        )
+
+        self.add_checkbox(
+            "edulint.open_edulint_on_warnings",
+            tr("Open EduLint automatically when it has warnings for your code"),
+            row=3,
+            columnspan=2,
+        )
+        self.add_checkbox(
+            "edulint.disable_version_check",
+            tr("Disable checks for a new version."),
+            row=4,
+            columnspan=2,
+        )
+        self.add_checkbox(
+            "edulint.use_warm_worker",
+            tr("Keep EduLint running in the background for faster checks"),
+            row=5,
+            columnspan=2,
+        )
+        self.add_checkbox(
+            "edulint.use_in_process_engine",
+            tr(
+                "Run EduLint inside Thonny instead of in a separate process (experimental)\n"
+                "While it runs, it changes Thonny's module search path and logging, which may affect other plugins."
+            ),
+            row=6,
+            columnspan=2,
+        )
+        self.add_checkbox(
+            "edulint.lint_as_you_type",
+            tr("Check the code while you type, without saving it"),
+            row=7,
+            columnspan=2,
+        )
+
+        empty_space = ttk.Label(self, text="")
+        empty_space.grid(row=8, columnspan=2, pady=20)
+
+        reporting_headline = ttk.Label(self, text=tr("Report to EduLint servers"), font="BoldTkDefaultFont")
+        reporting_headline.grid(row=9, columnspan=2)
+
+        reporting_intro = ttk.Label(self, text=tr("To futher improve EduLint and research code quality we need data about your usage of EduLint. Will you help us collect this anonymous data?"))
+        reporting_intro.grid(row=10, columnspan=2)
+
+        reporting_disabled_label = '    [not-collected-by-server]'
+        reporting_disabled_text = "[not-collected-by-server]: Our server currently doesn't want this type of data, so this EduLint instance won't send it even if you allow it. This may change in future, so feel free to set your desired settings now.\n\n"
+
+        self.add_checkbox(
+            "edulint.enable_result_remote_reporting",
+            tr("Send the linting results, i.e. which issues appeared in you code." + (reporting_disabled_label if get_workbench().get_option("edulint.force_disable_result_remote_reporting") else "")),
+            row=11,
+            columnspan=2,
+        )
+
+        self.add_checkbox(
+            "edulint.enable_code_remote_reporting",
+            tr("Send the code itself." +
+               (reporting_disabled_label if get_workbench().get_option("edulint.force_disable_code_remote_reporting") else "")
+            ),
+            row=12,
+            columnspan=2,
+        )
+        self.add_checkbox(
+            "edulint.enable_exception_remote_reporting",
+            tr("Send the logs for exceptions/errors." +
+               (reporting_disabled_label if get_workbench().get_option("edulint.force_disable_exception_remote_reporting") else "")
+            ),
+            row=13,
+            columnspan=2,
+        )
+
+        reporting_outro = ttk.Label(self, text=tr(  # TODO: Dynamic fields like this area likely impossible to translate.
+            (reporting_disabled_text if any((
+                get_workbench().get_option("edulint.force_disable_result_remote_reporting"),
+                get_workbench().get_option("edulint.force_disable_code_remote_reporting"),
+                get_workbench().get_option("edulint.force_disable_exception_remote_reporting"),
+            )) else "") +
+            "The data is used for the following purposes:\n"
+            " - Improvement of EduLint\n"
+            " - Academic research\n"
+            "All data used for academic research undergoes additional anonymization first to ensure it doesn't contain any personally identifiable information.\n"
+            "\n"
+            "If you previously submitted some data and wish to remove them, send an email to privacy@edulint.com\n"
+            "with subject 'Thonny-Edulint Data Request'. In the body of the email include the following identifier:\n"
+            f"   {get_reporting_user_id()}"
+            ), justify="left", anchor="w"
+        )
+        reporting_outro.grid(row=14, columnspan=2, sticky = "W")
+
+    def apply(self):
+        if get_workbench().get_option("edulint.enabled"):
+            get_workbench().set_option("assistance.use_pylint", False)
+        refresh_allowed_report_kinds()
+
+
+def check_current_script():
+    editor = get_workbench().get_editor_notebook().get_current_editor()
+    if not editor:
+        return
+
+    if not editor.get_filename():
+        return
+
+    filename = editor.save_file()
+    if not filename:
+        # user has cancelled file saving
+        return
+
+    get_workbench().event_generate(
+        "ToplevelResponse",
+        filename=filename,
+    )
+
+    get_workbench().show_view("EduLintView")
+
+
+def _create_result_store():
+    from thonnycontrib.edulint.result_store import ResultStore, get_result_store_path
+
+    return ResultStore(get_result_store_path())
+
+
+def load_plugin():
+    """Adds the edulint analyzer"""
+    get_workbench().add_view(EduLintView, "EduLint", "se", visible_by_default=False)
+    add_program_analyzer(EdulintAnalyzer)
+
+    get_workbench().add_configuration_page("edulint", "EduLint", EdulintConfigPage, 81)
+    get_workbench().set_default("edulint.enabled", True)
+    get_workbench().set_default("edulint.open_edulint_on_warnings", False)
+    get_workbench().set_default("edulint.disable_version_check", False)
+    get_workbench().set_default("edulint.use_warm_worker", False)
+    get_workbench().set_default("edulint.use_in_process_engine", False)
+    get_workbench().set_default("edulint.lint_as_you_type", False)
+    # share of the time live analyses may run, the rest of the CPU stays with the student
+    get_workbench().set_default("edulint.live_cpu_budget", 0.25)
+    get_workbench().set_default("edulint.persist_results", True)
+    # re-analyze only the changed parts of large files
+    get_workbench().set_default("edulint.incremental_analysis", False)
+
+    # User can choose which data should be sent.
+    get_workbench().set_default("edulint.enable_code_remote_reporting", False)
+    get_workbench().set_default("edulint.enable_result_remote_reporting", False)
+    get_workbench().set_default("edulint.enable_exception_remote_reporting", False)
+
+    # Server can remotely force client to stop sending data.
+    get_workbench().set_default("edulint.force_disable_code_remote_reporting", False)
+    get_workbench().set_default("edulint.force_disable_result_remote_reporting", False)
+    get_workbench().set_default("edulint.force_disable_exception_remote_reporting", False)
+
+    get_workbench().set_default("edulint.enable_first_time_reporting_dialog", False)
+    get_workbench().set_default("edulint.has_user_seen_reporting_dialog", False)
+    get_workbench().set_default("edulint.n_successful_lints_until_first_time_reporting_dialog", 8)
+
+    # give the queued reports a moment to be sent, the spooled ones are kept for the next session
+    get_workbench().bind("WorkbenchClose", lambda event=None: close_reporting(), True)
+
+    if get_workbench().get_option("edulint.persist_results"):
+        result_cache.store_factory = _create_result_store
+
+    if get_workbench().get_option("edulint.enabled"):
+        get_workbench().set_default("assistance.use_pylint", False)
+        get_workbench().set_option("assistance.use_pylint", False)
+
+    def toggle_view_visibility(view_id):
+        visibility_flag = get_workbench().get_variable("view." + view_id + ".visible")
+
+        if visibility_flag.get():
+            get_workbench().hide_view(view_id)
+        else:
+            get_workbench().show_view(view_id)
+
+    get_workbench().add_command(
+        "check_current_script",
+        "EduLint",
+        tr("Check with EduLint"),
+        caption=tr("Check with EduLint"),
+        handler=check_current_script,
+        default_sequence="<F9>",
+        group=0,
+        image=str(Path(__file__).parent / "broom-green.png"),
+        include_in_toolbar=not get_workbench().in_simple_mode(),
+    )
+    get_workbench().add_command(
+        "view_edulint_tab",
+        "EduLint",
+        tr("View EduLint tab"),
+        handler=lambda: toggle_view_visibility("EduLintView"),
+        flag_name="view.EduLintView.visible",
+        group=1,
+    )
+    get_workbench().add_command(
+        "show_edulint_options",
+        "EduLint",
+        tr("EduLint Options..."),
+        lambda: get_workbench().show_options("edulint"),
+        group=180
+    )
+    get_workbench().add_command(
+        "show_update_window",
+        "EduLint",
+        tr("Check for updates"),
+        lambda: partial(check_updates_with_notification, ttl = 0, open_window_always = True)(),
+        group=200
+    )
+
+    # Always use <<event>> for call that may come from threads. Tkinter ensures it runs on main thread. Thonny's custom implementation (i.e. without <<event>>) doesn't and it may get  processed on non-main thread.
+    get_workbench().bind("<<EduLintOpenUpdateWindow>>", lambda _: ui_utils.show_dialog(UpdateDialog(get_workbench())), add=True)
+    get_workbench().bind("<<EduLintOpenReportingFirstTimeDialog>>", lambda _: ui_utils.show_dialog(EdulintReportingFirstTimeDialog(get_workbench())), add=True)
+    get_workbench().bind("<<EduLintOpenAnnouncementDialog>>", lambda _: ui_utils.show_dialog(AnnouncementDialog(get_workbench())), add=True)
+    # Network requests wait until Thonny has started, so they don't compete with its startup
+    get_workbench().after_idle(get_reporting_server_settings)  # This has it's own async wrapper
+    get_workbench().after_idle(check_for_announcement)  # This has it's own async wrapper
+    get_workbench().after_idle(send_spooled_reports)
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import time
+from collections import deque
+from logging import getLogger
+from typing import Callable, Dict, List, Optional
+
+from thonny import ui_utils
+
+logger = getLogger("EduLint")
+
+
+if os.name == "nt":
+    _LOW_PRIORITY_POPEN_KWARGS = {"creationflags": subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+else:
+    # preexec_fn isn't safe with threads running, the priority is lowered after the spawn instead
+    _LOW_PRIORITY_POPEN_KWARGS = {}
+
+
+def _lower_priority(proc: subprocess.Popen) -> None:
+    if not hasattr(os, "setpriority"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, proc.pid, 10)
+    except OSError as e:  # the process may have finished already
+        logger.debug("Could not lower the priority of %s: %s", proc.pid, e)
+
+
+class PoolJob:
+    def __init__(self, args: List[str], env: Dict[str, str], on_completion: Callable, low_priority: bool = False):
+        self.args = args
+        self.env = env
+        self.on_completion = on_completion
+        self.low_priority = low_priority
+        self.proc: Optional[subprocess.Popen] = None
+        self.started_at: Optional[float] = None  # time.perf_counter() when the process started, not when queued
+        self.cancelled = False
+
+
+class BoundedProcessPool:
+    """Runs subprocesses with at most `max_workers` of them alive at once.
+
+    Jobs complete on the UI thread with the same arguments as ui_utils.popen_with_ui_thread_callback
+    passes (proc, out_lines, err_lines). Low priority jobs only start when no other job is queued,
+    and their processes get a lower OS priority.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._queue = deque()
+        self._low_priority_queue = deque()
+        self._running: List[PoolJob] = []
+
+    def submit(self, args: List[str], env: Dict[str, str], on_completion: Callable, low_priority: bool = False) -> PoolJob:
+        job = PoolJob(args, env, on_completion, low_priority)
+        (self._low_priority_queue if low_priority else self._queue).append(job)
+        self._start_queued()
+        return job
+
+    def cancel(self, job: PoolJob):
+        job.cancelled = True
+        if job.proc is not None:
+            job.proc.kill()
+        else:
+            try:
+                (self._low_priority_queue if job.low_priority else self._queue).remove(job)
+            except ValueError:
+                pass
+
+    def _start_queued(self):
+        while (self._queue or self._low_priority_queue) and len(self._running) < self.max_workers:
+            job = (self._queue or self._low_priority_queue).popleft()
+            self._running.append(job)
+            job.started_at = time.perf_counter()
+            try:
+                job.proc = ui_utils.popen_with_ui_thread_callback(
+                    job.args,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    universal_newlines=True,
+                    env=job.env,
+                    on_completion=lambda proc, out_lines, err_lines, job=job: self._on_job_completion(
+                        job, proc, out_lines, err_lines
+                    ),
+                    **(_LOW_PRIORITY_POPEN_KWARGS if job.low_priority else {}),
+                )
+                if job.low_priority:
+                    _lower_priority(job.proc)
+            except OSError as e:
+                logger.error("Could not start %s: %s", job.args, e)
+                self._running.remove(job)
+                job.on_completion(None, [], [str(e)])
+
+    def _on_job_completion(self, job: PoolJob, proc, out_lines, err_lines):
+        self._running.remove(job)
+        self._start_queued()
+        if not job.cancelled:
+            job.on_completion(proc, out_lines, err_lines)
+
+
+_pool: Optional[BoundedProcessPool] = None
+
+
+def get_process_pool() -> BoundedProcessPool:
+    global _pool
+    if _pool is None:
+        _pool = BoundedProcessPool()
+    return _pool
@@ -1,8 +1,8 @@
 # Copied from https://github.com/GiraffeReversed/edulint-web/blob/main/setup.py
 
-import requests
 from typing import Dict, Any, List, Optional
 from collections import defaultdict
+from dataclasses import dataclass
 import argparse
 
 from .utils import Version
@@ -35,10 +35,88 @@ def _only_last_patch_of_each_minor(versions: List[Version]) -> List[Version]:
     return sorted_patches
 
 
+SIMPLE_INDEX_URL = "https://pypi.org/simple/"
+SIMPLE_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"  # PEP 691
+SDIST_EXTENSIONS = (".tar.gz", ".tar.bz2", ".tgz", ".zip", ".tar")
+
+
+@dataclass
+class IndexResponse:
+    versions: Optional[List[Version]]  # None if the index hasn't changed since the validators were given
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def _file_version(filename: str) -> Optional[str]:
+    if filename.endswith(".whl"):  # name-version-tags.whl, with dashes in the name replaced
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+    for extension in SDIST_EXTENSIONS:
+        if filename.endswith(extension):  # name-version.tar.gz, the name may contain dashes
+            return filename[:-len(extension)].rpartition("-")[2] or None
+    return None
+
+
+def _fully_released_simple_versions(data: Dict[str, Any]) -> List[Version]:
+    """The same selection as _fully_released_versions, from the PEP 691 JSON of a project."""
+    files_per_version: Dict[str, list] = defaultdict(list)
+    for file in data.get("files", []):
+        version_id = _file_version(file.get("filename", ""))
+        if version_id is not None:
+            files_per_version[version_id].append(file)
+
+    # the list of versions is only in API 1.1+ (PEP 700), older indexes give just the files
+    version_ids = data.get("versions", list(files_per_version))
+    valid_versions: List[Version] = []
+    for version_id in version_ids:
+        files = files_per_version.get(version_id, [])
+        is_yanked: bool = any(file.get("yanked") for file in files)  # False, or True / the reason
+        version_parsed: Optional[Version] = Version.parse(version_id)
+
+        if files and not is_yanked and version_parsed:
+            valid_versions.append(version_parsed)
+
+    return valid_versions
+
+
+def fetch_versions(
+    package_name: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    index_url: str = SIMPLE_INDEX_URL,
+    timeout: float = 3,
+) -> IndexResponse:
+    """Fully released versions of the package, from the compact JSON simple index.
+
+    With the validators of a previous response, the request is conditional, and an unchanged
+    index answers with an empty 304, for which versions is None.
+    """
+    import requests  # deferred, it's slow to import and only needed for version checks
+
+    headers = {"Accept": SIMPLE_JSON_CONTENT_TYPE}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    response = requests.get(f"{index_url.rstrip('/')}/{package_name}/", headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return IndexResponse(None, etag, last_modified)
+    response.raise_for_status()
+
+    if response.headers.get("Content-Type", "").split(";")[0].strip() != SIMPLE_JSON_CONTENT_TYPE:
+        # an index without PEP 691, fall back to the full project JSON
+        return IndexResponse(_fully_released_versions(requests.get(f"https://pypi.org/pypi/{package_name}/json", timeout=timeout).json()))
+
+    return IndexResponse(
+        _fully_released_simple_versions(response.json()),
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
+
+
 def get_versions(package_name: str = 'edulint') -> List[Version]:
-    edulint_info = requests.get(f"https://pypi.org/pypi/{package_name}/json", timeout=3).json()
-    version_ids: List[Version] = _fully_released_versions(edulint_info)
-    return version_ids
+    return fetch_versions(package_name).versions
 
 
 
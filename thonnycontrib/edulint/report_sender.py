@@ -0,0 +1,203 @@
+import gzip
+import json
+import queue
+import random
+import threading
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = getLogger("EduLint")
+
+_STOP = object()
+
+
+@dataclass
+class _Report:
+    data: Dict[str, Any]
+    headers: Optional[Dict[str, str]] = None
+    callback: Optional[Callable[[Any], None]] = None  # called with the requests.Response
+
+    @property
+    def batchable(self) -> bool:
+        return self.headers is None and self.callback is None
+
+
+class ReportSender:
+    """Sends JSON reports to one URL from a single background thread, over a pooled HTTP session.
+
+    Reports wait in a bounded queue; when it's full, new ones are dropped rather than blocking
+    Thonny. Failed requests (connection errors, timeouts, 429 and 5xx responses) are retried
+    with exponential backoff. If max_batch is more than 1, reports queued at the same time
+    are sent together as {"type": "batch", "records": [...]}, gzip-compressed if compress is set.
+    Reports with headers or a callback are always sent on their own.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_queue: int = 200,
+        max_batch: int = 1,
+        compress: bool = False,
+        timeout: Tuple[float, float] = (5.0, 15.0),  # connect, read
+        max_attempts: int = 4,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 30.0,
+    ):
+        self.url = url
+        self.max_batch = max_batch
+        self.compress = compress
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._session = None
+        self._stopping = threading.Event()
+
+        self.n_sent = 0
+        self.n_dropped = 0
+        self.n_requests = 0
+
+    def submit(self, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None, callback=None) -> bool:
+        """Queues the report; False if it was dropped because the queue is full or the sender closed."""
+        if self._stopping.is_set():
+            return False
+        try:
+            self._queue.put_nowait(_Report(data, headers, callback))
+        except queue.Full:
+            self.n_dropped += 1
+            logger.warning("EduLint reporting queue is full, dropping a report.")
+            return False
+
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="EduLintReportSender", daemon=True)
+                self._thread.start()
+        return True
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Gives the queued reports up to timeout seconds to be sent, then stops retrying."""
+        with self._thread_lock:
+            thread = self._thread
+        if thread is None:
+            self._stopping.set()
+            if self._session is not None:
+                self._session.close()
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._stopping.set()
+
+    def _run(self):
+        while True:
+            report = self._queue.get()
+            if report is _STOP:
+                self._stopping.set()
+                break
+
+            batch = [report]
+            stop_after = False
+            while report.batchable and len(batch) < self.max_batch:
+                try:
+                    following = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if following is _STOP:
+                    stop_after = True
+                    break
+                if not following.batchable:
+                    self._send_with_retries([following])
+                    continue
+                batch.append(following)
+
+            self._send_with_retries(batch)
+            if stop_after:
+                self._stopping.set()
+                break
+
+        if self._session is not None:
+            self._session.close()
+
+    def send(self, records: List[Dict[str, Any]]) -> int:
+        """Sends the records right away, in batches of max_batch, without retrying.
+
+        Returns how many of them were delivered; it stops at the first batch that fails.
+        Used by senders which keep the records themselves until they are delivered.
+        """
+        delivered = 0
+        for start in range(0, len(records), self.max_batch):
+            batch = [_Report(data) for data in records[start:start + self.max_batch]]
+            _, retry = self._post(batch)
+            if retry:
+                break
+            delivered += len(batch)
+            self.n_sent += len(batch)
+        return delivered
+
+    def _prepare_request(self, batch: List[_Report]) -> Tuple[bytes, Dict[str, str]]:
+        if len(batch) == 1:
+            payload = batch[0].data
+        else:
+            payload = {"type": "batch", "records": [report.data for report in batch]}
+
+        body = json.dumps(payload).encode("utf8")
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        headers.update(batch[0].headers or {})
+        return body, headers
+
+    def _post(self, batch: List[_Report]) -> Tuple[Any, bool]:
+        """The response (None if there was none) and whether the request should be retried."""
+        import requests  # deferred, it's slow to import and only needed once something gets sent
+
+        with self._thread_lock:
+            if self._session is None:
+                self._session = requests.Session()
+
+        body, headers = self._prepare_request(batch)
+        self.n_requests += 1
+        try:
+            response = self._session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.info("Sending EduLint report failed: %s", e)
+            return None, True
+        return response, response.status_code == 429 or response.status_code >= 500
+
+    def _send_with_retries(self, batch: List[_Report]):
+        for attempt in range(self.max_attempts):
+            response, retry = self._post(batch)
+            if not retry:
+                self.n_sent += len(batch)
+                self._call_back(batch, response)
+                return
+
+            if attempt + 1 < self.max_attempts and not self._stopping.is_set():
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt)
+                # jitter, so that many Thonnys coming back online don't retry at once
+                if self._stopping.wait(delay * random.uniform(0.5, 1.0)):
+                    break
+            else:
+                break
+
+        self.n_dropped += len(batch)
+        logger.warning("Giving up sending %d EduLint report(s).", len(batch))
+        if response is not None:  # the server answered, even if with an error
+            self._call_back(batch, response)
+
+    @staticmethod
+    def _call_back(batch: List[_Report], response):
+        for report in batch:
+            if report.callback is not None:
+                try:
+                    report.callback(response)
+                except Exception:
+                    logger.exception("EduLint report callback failed")
@@ -0,0 +1,397 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from thonnycontrib.edulint.report_sender import ReportSender
+
+logger = getLogger("EduLint")
+
+SPOOL_EXTENSION = ".jsonl"
+PENDING_PREFIX = "pending-"  # left by a session which closed before sending everything, free to take over
+
+
+def get_report_spool_dir() -> str:
+    from platformdirs import PlatformDirs
+
+    return os.path.join(PlatformDirs(appname="thonny-edulint").user_data_dir, "report_spool")
+
+
+def _lock_file(f: BinaryIO) -> Optional[bool]:
+    """Tries to lock the open file exclusively, without waiting, for as long as it stays open.
+
+    True if it's locked, False if another Thonny holds the lock, None if it can't be told: on Windows
+    (where a file open in another Thonny can't be renamed away anyway) or without file locks (e.g. NFS).
+    """
+    if os.name == "nt":
+        return None
+    import fcntl
+
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+    except OSError:
+        return None
+
+
+@dataclass
+class _SpoolFile:
+    path: str
+    offset: int = 0  # the records before it are sent or dropped
+    base: int = 0  # bytes removed from the start of the file, offsets and sizes count them in
+    lock_handle: Optional[BinaryIO] = None  # keeps an adopted file locked against other Thonnys
+
+
+class ReportSpool:
+    """Keeps reports on disk until they are delivered, so that they survive being offline and restarts.
+
+    append() writes one JSON line to this session's append-only spool file and returns. A background
+    thread sends the records in batches of at most max_batch_records and max_batch_bytes, at latest
+    flush_interval seconds after they were appended, and backs off while the server can't be reached.
+    is_allowed is asked about each record right before it is sent; the records it refuses are dropped.
+
+    The unsent records are kept under max_bytes by dropping the oldest. Spool files of sessions which
+    closed with unsent records (or crashed) are taken over and sent by the next session. A session
+    keeps its files locked, so that a running one is told apart from a crashed one; where files
+    can't be locked, the files of other sessions are only taken over after stale_seconds.
+    """
+
+    def __init__(
+        self,
+        sender: ReportSender,
+        is_allowed: Callable[[Dict[str, Any]], bool],
+        get_spool_dir: Callable[[], str] = get_report_spool_dir,
+        max_bytes: int = 5 * 1024 * 1024,
+        max_batch_records: int = 50,
+        max_batch_bytes: int = 256 * 1024,
+        flush_interval: float = 10.0,
+        max_retry_interval: float = 300.0,
+        stale_seconds: float = 24 * 60 * 60,  # without locks, files of other sessions are treated as crashed after this
+    ):
+        self.sender = sender
+        self.is_allowed = is_allowed
+        self._get_spool_dir = get_spool_dir
+        self.max_bytes = max_bytes
+        self.max_batch_records = max_batch_records
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.max_retry_interval = max_retry_interval
+        self.stale_seconds = stale_seconds
+
+        self._lock = threading.RLock()  # guards this session's file, which the UI thread appends to
+        self._spool_dir = None
+        self._own: Optional[_SpoolFile] = None
+        self._own_handle = None
+        self._own_size = 0
+        self._adopted: List[_SpoolFile] = []  # oldest first
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+        self.n_sent = 0
+        self.n_dropped = 0
+
+    def append(self, record: Dict[str, Any]) -> bool:
+        """Stores the record to be sent; False if it couldn't be stored."""
+        line = (json.dumps(record) + "\n").encode("utf8")
+        with self._lock:
+            if self._stopping.is_set():
+                return False
+            try:
+                if self._own_handle is None:
+                    self._open_own_file()
+                if self._own_size - self._own.base + len(line) > 2 * self.max_bytes:
+                    # the flusher can't keep up, make room right away
+                    self._drop_oldest(self._own, self._own_size, self._own_size - self._own.offset + len(line) - self.max_bytes)
+                    self._compact_own()
+                self._own_handle.write(line)
+                self._own_handle.flush()
+                self._own_size += len(line)
+            except OSError as e:
+                self.n_dropped += 1
+                logger.warning("Could not store EduLint report: %s", e)
+                return False
+            unsent = self._own_size - self._own.offset
+
+        self.start()
+        if unsent >= self.max_batch_bytes or unsent > self.max_bytes:
+            self._wake.set()
+        return True
+
+    def start(self) -> None:
+        """Starts the background sending, including the records left by previous sessions."""
+        with self._lock:
+            if self._thread is None and not self._stopping.is_set():
+                self._thread = threading.Thread(target=self._run, name="EduLintReportSpool", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Stops sending and leaves the unsent records for the next session."""
+        self._stopping.set()
+        self._wake.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+        with self._lock:
+            files = self._adopted + ([self._own] if self._own is not None else [])
+            for i, spool_file in enumerate(files):
+                self._hand_over(spool_file, i)
+            for spool_file in self._adopted:
+                if spool_file.lock_handle is not None:
+                    spool_file.lock_handle.close()
+            if self._own_handle is not None:
+                self._own_handle.close()
+                self._own_handle = None
+            self._adopted = []
+            self._own = None
+        self.sender.close(0)
+
+    def _open_own_file(self) -> None:
+        spool_dir = self._get_dir()
+        os.makedirs(spool_dir, exist_ok=True)
+        self._own = _SpoolFile(os.path.join(spool_dir, "%d-%d%s" % (os.getpid(), int(time.time()), SPOOL_EXTENSION)))
+        self._own_handle = open(self._own.path, "ab")
+        _lock_file(self._own_handle)
+        self._own_size = self._own_handle.tell()
+
+    def _get_dir(self) -> str:
+        if self._spool_dir is None:
+            self._spool_dir = self._get_spool_dir()
+        return self._spool_dir
+
+    def _run(self):
+        self._adopt_files()
+        failures = 0
+        delay = self.flush_interval
+        while True:
+            if failures:
+                self._stopping.wait(delay)  # appending more doesn't bring the server back sooner
+            else:
+                self._wake.wait(delay)
+                self._wake.clear()
+            if self._stopping.is_set():
+                break
+
+            try:
+                self._enforce_cap()
+                delivered = self._flush()
+            except OSError as e:
+                logger.warning("Could not read EduLint report spool: %s", e)
+                delivered = False
+
+            if delivered:
+                failures = 0
+                delay = self.flush_interval
+            else:
+                failures += 1
+                # jitter, so that many Thonnys coming back online don't send at once
+                delay = min(self.max_retry_interval, self.flush_interval * 2 ** failures) * random.uniform(0.5, 1.0)
+
+    def _adopt_files(self) -> None:
+        spool_dir = self._get_dir()
+        try:
+            paths = [os.path.join(spool_dir, name) for name in os.listdir(spool_dir) if name.endswith(SPOOL_EXTENSION)]
+            paths.sort(key=os.path.getmtime)
+        except OSError:
+            return
+
+        own_path = self._own.path if self._own is not None else None
+        for path in paths:
+            if path == own_path:
+                continue
+            handle = None
+            try:
+                if os.name != "nt":  # Windows can't rename a file open even in this process
+                    handle = open(path, "rb")
+                locked = _lock_file(handle) if handle is not None else None
+                if locked is False:
+                    handle.close()
+                    continue  # another Thonny which is running
+                if (
+                    locked is None
+                    and not os.path.basename(path).startswith(PENDING_PREFIX)
+                    and time.time() - os.path.getmtime(path) < self.stale_seconds
+                ):
+                    if handle is not None:
+                        handle.close()
+                    continue  # can't tell, probably another Thonny which is running
+                # renaming it claims it, if another Thonny is quicker, the rename fails
+                claimed = os.path.join(spool_dir, "%d-%d-adopted-%d%s" % (os.getpid(), int(time.time()), len(self._adopted), SPOOL_EXTENSION))
+                os.replace(path, claimed)
+                os.utime(claimed)
+            except OSError:
+                if handle is not None:
+                    handle.close()
+                continue
+            self._adopted.append(_SpoolFile(claimed, lock_handle=handle))
+
+    def _unsent_files(self) -> List[Tuple[_SpoolFile, int]]:
+        """(file, size) of the files with unsent records, oldest first."""
+        result = []
+        for spool_file in self._adopted:
+            size = os.path.getsize(spool_file.path)
+            if size > spool_file.offset:
+                result.append((spool_file, size))
+        with self._lock:
+            if self._own is not None and self._own_size > self._own.offset:
+                result.append((self._own, self._own_size))
+        return result
+
+    def _flush(self) -> bool:
+        """Sends everything which is unsent; False if the server couldn't be reached."""
+        while not self._stopping.is_set():
+            unsent = self._unsent_files()
+            if not unsent:
+                return True
+            spool_file, size = unsent[0]
+
+            lines = self._read_lines(spool_file, size, self.max_batch_records, self.max_batch_bytes)
+            if not lines and spool_file is self._own:
+                return True  # only a line which isn't completely written yet
+            records = []
+            for end, line in lines:
+                record = self._decode(line)
+                records.append((end, record if record is not None and self.is_allowed(record) else None))
+
+            to_send = [record for _, record in records if record is not None]
+            n_delivered = self.sender.send(to_send) if to_send else 0
+            self.n_sent += n_delivered
+            self.n_dropped += len(records) - len(to_send)
+
+            offset = spool_file.offset
+            remaining = n_delivered
+            for end, record in records:
+                if record is not None:
+                    if remaining == 0:
+                        break
+                    remaining -= 1
+                offset = end
+            self._set_offset(spool_file, offset)
+
+            if n_delivered < len(to_send):
+                return False
+            self._remove_if_done(spool_file)
+        return True
+
+    def _read_lines(self, spool_file: _SpoolFile, size: int, max_lines: int, max_bytes: int) -> List[Tuple[int, bytes]]:
+        """(end offset, line) of the complete lines after the file's offset, at least one line if there is one."""
+        result = []
+        position = spool_file.offset
+        with self._lock if spool_file is self._own else nullcontext():  # so that it's not compacted meanwhile
+            with open(spool_file.path, "rb") as f:
+                f.seek(position - spool_file.base)
+                while position < size and len(result) < max_lines:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break  # still being written, or cut off by a crash, which _remove_if_done deals with
+                    if result and position + len(line) - spool_file.offset > max_bytes:
+                        break
+                    position += len(line)
+                    result.append((position, line))
+        return result
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) else None
+
+    def _set_offset(self, spool_file: _SpoolFile, offset: int) -> None:
+        with self._lock:
+            spool_file.offset = max(spool_file.offset, offset)  # the UI thread may have dropped some meanwhile
+
+    def _remove_if_done(self, spool_file: _SpoolFile) -> None:
+        if spool_file in self._adopted:
+            size = os.path.getsize(spool_file.path)
+            lines = self._read_lines(spool_file, size, 1, self.max_batch_bytes)
+            if not lines:  # nothing but possibly a line cut off by a crash
+                os.remove(spool_file.path)
+                self._adopted.remove(spool_file)
+                if spool_file.lock_handle is not None:
+                    spool_file.lock_handle.close()
+            return
+
+        with self._lock:
+            if self._own_handle is not None and self._own.offset == self._own_size:
+                self._own_handle.truncate(0)
+                self._own.base = self._own_size
+
+    def _enforce_cap(self) -> None:
+        unsent = self._unsent_files()
+        excess = sum(size - spool_file.offset for spool_file, size in unsent) - self.max_bytes
+        for spool_file, size in unsent:
+            if excess <= 0:
+                break
+            excess -= self._drop_oldest(spool_file, size, excess)
+
+        with self._lock:
+            own = self._own
+            if self._own_handle is not None and own.offset > own.base and self._own_size - own.base > self.max_bytes:
+                self._compact_own()
+
+    def _drop_oldest(self, spool_file: _SpoolFile, size: int, n_bytes: int) -> int:
+        """Drops the oldest records, at least n_bytes of them if the file has them; returns how many bytes it dropped."""
+        with self._lock if spool_file is self._own else nullcontext():
+            offset = spool_file.offset
+            n_dropped = 0
+            with open(spool_file.path, "rb") as f:
+                f.seek(offset - spool_file.base)
+                while offset - spool_file.offset < n_bytes and offset < size:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    n_dropped += 1
+            dropped_bytes = offset - spool_file.offset
+            spool_file.offset = offset
+        if n_dropped:
+            self.n_dropped += n_dropped
+            logger.warning("EduLint report spool is full, dropped the oldest %d reports.", n_dropped)
+        return dropped_bytes
+
+    def _compact_own(self) -> None:
+        """Removes the sent and dropped records from the start of this session's file, with the lock held."""
+        temp_path = self._own.path + ".tmp"
+        with open(self._own.path, "rb") as source, open(temp_path, "wb") as target:
+            source.seek(self._own.offset - self._own.base)
+            target.write(source.read())
+        if os.name == "nt":  # an open file can't be renamed there
+            self._own_handle.close()
+            os.replace(temp_path, self._own.path)
+            self._own_handle = open(self._own.path, "ab")
+        else:
+            handle = open(temp_path, "ab")
+            _lock_file(handle)  # before it replaces the file, so that the file is never unlocked
+            self._own_handle.close()
+            os.replace(temp_path, self._own.path)
+            self._own_handle = handle
+        self._own.base = self._own.offset
+
+    def _hand_over(self, spool_file: _SpoolFile, index: int) -> None:
+        """Leaves the unsent part of the file to the next session, with the lock held."""
+        try:
+            with open(spool_file.path, "rb") as f:
+                f.seek(spool_file.offset - spool_file.base)
+                unsent = f.read()
+            if unsent.strip():
+                pending_path = os.path.join(
+                    os.path.dirname(spool_file.path),
+                    "%s%d-%d-%d%s" % (PENDING_PREFIX, int(time.time()), os.getpid(), index, SPOOL_EXTENSION),
+                )
+                with open(pending_path + ".tmp", "wb") as f:
+                    f.write(unsent)
+                os.replace(pending_path + ".tmp", pending_path)
+            os.remove(spool_file.path)
+        except OSError as e:
+            logger.warning("Could not keep the unsent EduLint reports: %s", e)
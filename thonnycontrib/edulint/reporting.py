@@ -1,14 +1,13 @@
 import platform
 import os
 import hashlib
-import json
 import logging
 import threading
 import re
 
-from thonnycontrib.edulint.version_checker import PackageInfoManager
-from platformdirs import PlatformDirs
-import requests
+from thonnycontrib.edulint.report_sender import ReportSender
+from thonnycontrib.edulint.report_spool import ReportSpool
+from thonnycontrib.edulint.state_store import user_id_state
 from tkinter import ttk
 
 from thonny import get_workbench
@@ -52,6 +51,7 @@ Clicking No will keep settings of reporting as is (disabled by default). You can
         get_workbench().set_option("edulint.enable_code_remote_reporting", True)
         get_workbench().set_option("edulint.enable_result_remote_reporting", True)
         get_workbench().set_option("edulint.enable_exception_remote_reporting", True)
+        refresh_allowed_report_kinds()
         get_workbench().show_options("edulint")
         self._close()
 
@@ -77,19 +77,19 @@ def get_reporting_user_id() -> str:
             return ID_FAILURE
 
     def ensure_persistent_id() -> str:
-        filepath = os.path.join(PlatformDirs(appname="thonny-edulint").user_data_dir, "user_id.json")
-        PackageInfoManager._create_json_file_if_doesnt_exist(filepath)  # TODO: This method should probably be in utils file
-
-        with open(filepath, "r", encoding="utf8") as f:
-            user_id_content = json.load(f)
-        if user_id_content.get("user_id", None):
-            return user_id_content.get("user_id")
-        
-        user_id = generate_new_id()
-        if user_id != ID_FAILURE:
-            with open(filepath, "w", encoding="utf8") as f:
-                json.dump({'user_id': user_id}, f, indent=4)
-        return user_id
+        user_id = user_id_state.get("user_id")
+        if user_id:
+            return user_id
+
+        def set_new_id_if_missing(data: dict) -> str:
+            if not data.get("user_id"):
+                user_id = generate_new_id()
+                if user_id == ID_FAILURE:
+                    return user_id
+                data["user_id"] = user_id
+            return data["user_id"]
+
+        return user_id_state.update(set_new_id_if_missing)
 
     try:
         return ensure_persistent_id()
@@ -101,17 +101,72 @@ def get_file_session_id(filepath) -> str:
     return f"{get_reporting_user_id()}:{fileid}"
 
 
-def _post_sync(url: str, json_data: dict, headers: dict, callback: callable = None):
-    try:
-        logging.getLogger("EduLint").info("Sending reporting POST.")
-        resp = requests.post(url, json=json_data, headers=headers)
-        if callback:
-            callback(resp)
-    except Exception as e:
-        logging.getLogger("EduLint").error(e, exc_info=True)
+_report_senders = {}
+_report_senders_lock = threading.Lock()
+_report_spool = None
+
+# report type -> the suffix of the options allowing it
+_SPOOLED_REPORT_KINDS = {"code": "code", "result": "result", "error": "exception"}
+# the kinds the options allow, read on the UI thread, as the spool checks them from its own thread
+_allowed_report_kinds = frozenset()
+
+
+def _create_report_sender(url: str) -> ReportSender:
+    # the endpoint is only known to take single, uncompressed records, so nothing is batched yet
+    return ReportSender(url, max_batch=1, compress=False)
+
+
+def get_report_sender(url: str) -> ReportSender:
+    with _report_senders_lock:
+        if url not in _report_senders:
+            _report_senders[url] = _create_report_sender(url)
+        return _report_senders[url]
+
+
+def refresh_allowed_report_kinds():
+    """To be called on the UI thread whenever the reporting options may have changed."""
+    global _allowed_report_kinds
+    _allowed_report_kinds = frozenset(
+        kind
+        for kind in _SPOOLED_REPORT_KINDS.values()
+        if get_workbench().get_option(f"edulint.enable_{kind}_remote_reporting", default=False)
+        and not get_workbench().get_option(f"edulint.force_disable_{kind}_remote_reporting")
+    )
+
+
+def _is_spooled_report_allowed(record: dict) -> bool:
+    # checked again when sending, the user or the server may have disabled reporting since
+    return _SPOOLED_REPORT_KINDS.get(record.get("type")) in _allowed_report_kinds
+
+
+def get_report_spool() -> ReportSpool:
+    global _report_spool
+    with _report_senders_lock:
+        if _report_spool is None:
+            # a sender of its own, the spool's thread sends with it directly
+            _report_spool = ReportSpool(_create_report_sender(REPORTING_URL), _is_spooled_report_allowed)
+        return _report_spool
+
 
-def post_async(url: str, json_data: dict, headers: dict = None, callback: callable = None): 
-    threading.Thread(target=_post_sync, args=(url, json_data, headers, callback)).start()
+def send_spooled_reports():
+    """Starts sending the reports left unsent by previous sessions."""
+    refresh_allowed_report_kinds()
+    get_report_spool().start()
+
+
+def close_reporting(timeout: float = 2.0):
+    with _report_senders_lock:
+        senders = list(_report_senders.values())
+        spool = _report_spool
+    for sender in senders:
+        sender.close(timeout / max(len(senders), 1))
+    if spool is not None:
+        spool.close(timeout)
+
+
+def post_async(url: str, json_data: dict, headers: dict = None, callback: callable = None):
+    logging.getLogger("EduLint").info("Queueing reporting POST.")
+    get_report_sender(url).submit(json_data, headers, callback)
 
 def post_async_with_session_id(filepath: str, type: str, data: dict, callback: callable = None):
     common_data = {
@@ -120,19 +175,31 @@ def post_async_with_session_id(filepath: str, type: str, data: dict, callback: c
     }
     post_async(REPORTING_URL, json_data={**common_data, **data}, callback=callback)
 
+def spool_with_session_id(filepath: str, type: str, data: dict):
+    """For reports which don't need an answer: they are stored and sent once the server is reachable."""
+    common_data = {
+        'type': type,
+        'session_id': get_file_session_id(filepath),
+    }
+    refresh_allowed_report_kinds()
+    get_report_spool().append({**common_data, **data})
+
 # WARNING: The following functions MUST NEVER fail and be ASYNC
 
-def send_code(filepath: str):
+def send_code(filepath: str, file_content: str = None):
+    """file_content is the analyzed content, if it's already read."""
     if get_workbench().get_option(f"edulint.force_disable_code_remote_reporting"):
         logging.getLogger("EduLint").debug("Source code not sent, reporting is remotely disabled.")
         return
 
-    try:
-        with open(filepath, 'r') as f:  # TODO: do we need to set encoding (especially on Windows?)
-            file_content = f.read()
-    except Exception as e:
-        logging.getLogger("EduLint").error(e, exc_info=True)
-    post_async_with_session_id(filepath, 'code', {
+    if file_content is None:
+        try:
+            with open(filepath, 'r') as f:  # TODO: do we need to set encoding (especially on Windows?)
+                file_content = f.read()
+        except Exception as e:
+            logging.getLogger("EduLint").error(e, exc_info=True)
+            return
+    spool_with_session_id(filepath, 'code', {
         'code': file_content, # TODO: Should we base64 this? 
     })
 
@@ -141,7 +208,7 @@ def send_results(filepath: str, results: str):
         logging.getLogger("EduLint").debug("Linting results not sent, reporting is remotely disabled.")
         return
 
-    post_async_with_session_id(filepath, 'result', {
+    spool_with_session_id(filepath, 'result', {
         'results': results, # TODO: Should we base64 this? 
     })
 
@@ -158,12 +225,12 @@ def send_errors(filepath: str, err: str):
             logging.getLogger("EduLint").error(e, exc_info=True)
             return text
     
-    if get_workbench().get_option(f"edulint.force_disable_code_remote_reporting"):
+    if get_workbench().get_option(f"edulint.force_disable_exception_remote_reporting"):
         logging.getLogger("EduLint").debug("Stacktrace not sent, reporting is remotely disabled.")
         return
 
     err = sanitize_stacktrace(err)
-    post_async_with_session_id(filepath, 'error', {
+    spool_with_session_id(filepath, 'error', {
         'errors': err,  # TODO: Should we base64 this? 
     })
 
@@ -171,14 +238,20 @@ def send_errors(filepath: str, err: str):
 def get_reporting_server_settings():
     post_async_with_session_id(filepath="filepath", type='thonny-settings', data={}, callback=process_reporting_settings_result)
 
-def process_reporting_settings_result(resp: requests.Response):
+def process_reporting_settings_result(resp: "requests.Response"):
+    global _allowed_report_kinds
     logging.getLogger("EduLint").debug(f"Reporting settings: parsing server response {resp}")
     if resp.status_code != 200:
         get_workbench().set_option("edulint.force_disable_code_remote_reporting", True)
         get_workbench().set_option("edulint.force_disable_result_remote_reporting", True)
         get_workbench().set_option("edulint.force_disable_exception_remote_reporting", True)
+        _allowed_report_kinds = frozenset()
         return
     data = resp.json()
+    # this runs in the sender's thread, so the spool learns about the forced changes from the response
+    _allowed_report_kinds = frozenset(
+        kind for kind in _allowed_report_kinds if not data.get(f"force_disable_{kind}_remote_reporting")
+    )
     
     whitelisted_thonny_edulint_keys = [
         "force_disable_code_remote_reporting",
@@ -0,0 +1,150 @@
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from thonnycontrib.edulint.finding import Finding
+from thonnycontrib.edulint.source_snapshot import SourceSnapshot
+
+logger = getLogger("EduLint")
+
+
+@dataclass
+class CachedResult:
+    warnings: List[Finding]
+    config: Optional[Dict[str, Any]]
+    config_fingerprint: str
+    duration: float  # how long the analysis took, i.e. how much each hit saves
+
+
+def _hash_file_into(hasher, path: str, sources: Mapping[str, SourceSnapshot]):
+    if path in sources:
+        content = sources[path].data
+    else:
+        with open(path, "rb") as f:
+            content = f.read()
+    hasher.update(path.encode("utf8") + b"\0" + str(len(content)).encode() + b"\0")
+    hasher.update(content)
+
+
+def compute_cache_key(
+    main_file_path: str,
+    imported_file_paths: Iterable[str],
+    edulint_version: Optional[str],
+    sources: Optional[Mapping[str, SourceSnapshot]] = None,
+) -> Optional[str]:
+    """Content-addressed key of one analysis; None if some of the files can't be read.
+
+    Files with a snapshot in sources are not read again.
+    """
+    sources = sources or {}
+    hasher = hashlib.sha256()
+    hasher.update(f"edulint={edulint_version}\0".encode("utf8"))
+    try:
+        _hash_file_into(hasher, main_file_path, sources)
+        for path in sorted(imported_file_paths):
+            _hash_file_into(hasher, path, sources)
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+
+def config_fingerprint(config: Optional[Dict[str, Any]]) -> str:
+    """Identifies the resolved config file, including its content if it is a local file."""
+    if config is None:
+        return ""
+    config_file = str(config.get("config-file", ""))
+    if os.path.isabs(config_file) and os.path.isfile(config_file):
+        try:
+            with open(config_file, "rb") as f:
+                return config_file + ":" + hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return ""
+    return config_file
+
+
+class ResultCache:
+    """Bounded LRU cache of converted EduLint results, optionally backed by a persistent store."""
+
+    def __init__(self, max_entries: int = 64, store=None):
+        self.max_entries = max_entries
+        self._store = store  # thonnycontrib.edulint.result_store.ResultStore
+        # creates the store on first use, so that it costs nothing until the first analysis
+        self.store_factory = None
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def store(self):
+        if self._store is None and self.store_factory is not None:
+            self._store = self.store_factory()
+            self.store_factory = None
+        return self._store
+
+    @store.setter
+    def store(self, store):
+        self._store = store
+
+    def get(self, key: Optional[str]) -> Optional[CachedResult]:
+        if key is None:
+            entry = None
+        else:
+            entry = self._entries.get(key)
+            from_disk = entry is None and self.store is not None
+            if from_disk:
+                entry = self.store.get(key)
+
+        if entry is not None and entry.config_fingerprint != config_fingerprint(entry.config):
+            self._entries.pop(key, None)  # the config file changed since
+            if self.store is not None:
+                self.store.delete(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            logger.info("EduLint result cache miss (hits: %d, misses: %d)", self.hits, self.misses)
+            return None
+
+        self._remember(key, entry)
+        self.hits += 1
+        if from_disk:
+            self.disk_hits += 1
+        self.saved_seconds += entry.duration
+        logger.info(
+            "EduLint result cache hit (hits: %d, of them from disk: %d, misses: %d, analysis time saved: %.1f s)",
+            self.hits, self.disk_hits, self.misses, self.saved_seconds,
+        )
+        return entry
+
+    def _remember(self, key: str, entry: CachedResult):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(
+        self,
+        key: Optional[str],
+        warnings: List[Finding],
+        config: Optional[Dict[str, Any]],
+        duration: float,
+        persist: bool = True,
+    ):
+        """persist=False keeps the result in memory only, e.g. if its paths don't outlive the session."""
+        if key is None:
+            return
+        entry = CachedResult(list(warnings), config, config_fingerprint(config), duration)
+        self._remember(key, entry)
+        if persist and self.store is not None:
+            self.store.put(key, entry)
+
+    def clear(self):
+        self._entries.clear()
+
+
+result_cache = ResultCache()
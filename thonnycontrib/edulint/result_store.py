@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+from logging import getLogger
+from pathlib import Path
+from typing import Optional
+
+from thonnycontrib.edulint.finding import Finding
+from thonnycontrib.edulint.result_cache import CachedResult
+
+logger = getLogger("EduLint")
+
+
+def get_result_store_path() -> str:
+    from platformdirs import PlatformDirs
+
+    return os.path.join(PlatformDirs(appname="thonny-edulint").user_data_dir, "results.sqlite3")
+
+
+class ResultStore:
+    """On-disk counterpart of ResultCache, shared by all Thonny instances of the user.
+
+    Corrupted databases are moved aside and started anew, locked ones are skipped -- losing
+    a cached result only means the code gets analyzed again. It is used from the UI thread, so
+    it never waits for a lock held by another Thonny instance, a busy database is a miss.
+    """
+
+    def __init__(self, path: str, max_size_bytes: int = 20 * 1024 * 1024):
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+            journal_mode = connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if str(journal_mode).lower() != "wal":
+                # e.g. on a network drive (NFS, SMB) without the shared memory WAL needs
+                logger.info(
+                    "EduLint result store %s can't use WAL (%s), using a rollback journal.", self.path, journal_mode
+                )
+                # readers block writers without WAL, more of the lookups will be misses
+                connection.execute("PRAGMA journal_mode=DELETE")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, config_fingerprint TEXT, payload BLOB, size INTEGER, last_used REAL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def _reset(self):
+        # other Thonny instances may have the files open, so they are renamed rather than removed,
+        # the journal goes too, so that it isn't applied to the new database
+        logger.error("EduLint result store %s is corrupted, starting a new one.", self.path)
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.replace(self.path + suffix, self.path + ".corrupt" + suffix)
+            except FileNotFoundError:
+                pass
+            except OSError as e:  # on Windows, while another instance has it open
+                logger.warning("Could not move the corrupted EduLint result store aside: %s", e)
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except sqlite3.Error:
+                pass
+            self._connection = None
+
+    def _run(self, operation, default=None):
+        try:
+            return operation(self._connect())
+        except sqlite3.OperationalError as e:  # e.g. locked by another Thonny instance
+            logger.info("EduLint result store unavailable: %s", e)
+        except sqlite3.DatabaseError:
+            self._reset()
+        except OSError as e:
+            logger.warning("EduLint result store unavailable: %s", e)
+        return default
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        def operation(connection):
+            row = connection.execute(
+                "SELECT config_fingerprint, payload FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            try:
+                data = json.loads(zlib.decompress(row[1]).decode("utf8"))
+                result = CachedResult(
+                    [Finding.from_dict(warning) for warning in data["warnings"]], data["config"], row[0], data["duration"]
+                )
+            except (zlib.error, ValueError, KeyError, TypeError):
+                connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+
+            try:
+                connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.OperationalError:  # another instance is writing, the hit counts anyway
+                pass
+            return result
+
+        return self._run(operation)
+
+    def put(self, key: str, entry: CachedResult):
+        payload = zlib.compress(
+            json.dumps({
+                # explanations are looked up by code again, no need to store them with every finding
+                "warnings": [warning.to_dict(include_explanation=False) for warning in entry.warnings],
+                "config": entry.config,
+                "duration": entry.duration,
+            }).encode("utf8")
+        )
+
+        def operation(connection):
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, entry.config_fingerprint, payload, len(payload), time.time()),
+                )
+                self._evict(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+        self._run(operation)
+
+    def _evict(self, connection):
+        total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+
+        # evict least recently used down to 3/4 of the cap, so that we don't evict on every put
+        to_free = total_size - self.max_size_bytes * 3 // 4
+        for key, size in connection.execute("SELECT key, size FROM results ORDER BY last_used").fetchall():
+            if to_free <= 0:
+                break
+            connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            to_free -= size
+
+    def delete(self, key: str):
+        self._run(lambda connection: connection.execute("DELETE FROM results WHERE key = ?", (key,)))
@@ -0,0 +1,95 @@
+import time
+from logging import getLogger
+from typing import Any, Callable, Hashable, Optional, Union
+
+logger = getLogger("EduLint")
+
+
+class AnalysisScheduler:
+    """Coalesces bursts of analysis requests, so that rapid repeated runs don't each spawn an analysis.
+
+    Requests are debounced and only the latest one is started -- everything it superseded is dropped.
+    A request identical to the analysis already in flight (same file, same content fingerprint)
+    is dropped as well, as its result is going to be the same. The fingerprint may be given as a
+    callable, which is only called when the request is about to start (e.g. if it reads the files
+    the analysis depends on). Starting any other request replaces
+    the one in flight, so there is never more than one running analysis per file.
+
+    Timers are provided by the caller (e.g. a widget's `after` and `after_cancel`), so the scheduler
+    itself doesn't depend on Tk.
+    """
+
+    def __init__(
+        self,
+        start: Callable[[Any], None],
+        schedule: Callable[[int, Callable[[], None]], Any],
+        unschedule: Callable[[Any], None],
+        debounce_ms: int = 150,
+        max_in_flight_age: float = 60.0,
+    ):
+        self._start = start
+        self._schedule = schedule
+        self._unschedule = unschedule
+        self.debounce_ms = debounce_ms
+        # an analysis which didn't finish in this time is not trusted to ever finish
+        self.max_in_flight_age = max_in_flight_age
+
+        self._pending = None  # (key, fingerprint, payload) of the latest request
+        self._timer = None
+        self._in_flight = None  # (key, fingerprint, started_at)
+
+        self.n_requested = 0
+        self.n_started = 0
+
+    def request(
+        self,
+        key: Hashable,
+        fingerprint: Union[Hashable, Callable[[], Optional[Hashable]], None],
+        payload: Any,
+        delay_ms: Optional[int] = None,
+    ):
+        """delay_ms may postpone the start beyond the usual debounce, never below it.
+
+        A None fingerprint means the request is never considered identical to another one.
+        """
+        self.n_requested += 1
+        self._pending = (key, fingerprint, payload)
+
+        if self._timer is not None:
+            self._unschedule(self._timer)
+        self._timer = self._schedule(max(self.debounce_ms, delay_ms or 0), self._fire)
+
+    def _fire(self):
+        self._timer = None
+        if self._pending is None:
+            return
+        key, fingerprint, payload = self._pending
+        self._pending = None
+        if callable(fingerprint):
+            fingerprint = fingerprint()
+
+        if self._in_flight is not None and fingerprint is not None:
+            in_flight_key, in_flight_fingerprint, started_at = self._in_flight
+            if (
+                (in_flight_key, in_flight_fingerprint) == (key, fingerprint)
+                and time.monotonic() - started_at < self.max_in_flight_age
+            ):
+                logger.debug("Skipping analysis of %s, the same code is being analyzed already.", key)
+                return
+
+        self.n_started += 1
+        logger.debug("Starting analysis %d of %d requested.", self.n_started, self.n_requested)
+        self._in_flight = (key, fingerprint, time.monotonic())
+        self._start(payload)
+
+    def analysis_finished(self, key: Hashable):
+        if self._in_flight is not None and self._in_flight[0] == key:
+            self._in_flight = None
+
+    def cancel(self):
+        """Drops the pending request and forgets the one in flight (its owner cancels it)."""
+        if self._timer is not None:
+            self._unschedule(self._timer)
+            self._timer = None
+        self._pending = None
+        self._in_flight = None
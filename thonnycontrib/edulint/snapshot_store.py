@@ -0,0 +1,252 @@
+import difflib
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Callable, Dict, List, Optional
+
+logger = getLogger("EduLint")
+
+# fields of a snapshot stored as deltas against the previous snapshot of the same main file
+_DELTA_FIELDS = ("main_file_source", "warnings_rst", "warnings")
+_COPY_OP_SIZE = 16  # estimated memory taken by one copy operation of a delta
+
+
+def get_snapshot_spill_dir() -> str:
+    from platformdirs import PlatformDirs
+
+    return os.path.join(PlatformDirs(appname="thonny-edulint").user_data_dir, "snapshots")
+
+
+def _compute_delta(base: str, text: str) -> list:
+    """Lines of text as ranges of base's lines to copy, (start, end) tuples, and strings to insert."""
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+    delta = []
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, base_lines, lines, autojunk=False).get_opcodes():
+        if op == "equal":
+            delta.append((i1, i2))
+        elif j2 > j1:
+            delta.append("".join(lines[j1:j2]))
+    return delta
+
+
+def _apply_delta(base: str, delta: list) -> str:
+    base_lines = base.splitlines(keepends=True)
+    return "".join(part if isinstance(part, str) else "".join(base_lines[part[0]:part[1]]) for part in delta)
+
+
+def _delta_size(delta: list) -> int:
+    return sum(len(part) if isinstance(part, str) else _COPY_OP_SIZE for part in delta)
+
+
+@dataclass
+class _StoredSnapshot:
+    other_fields: Dict[str, Any]
+    texts: Dict[str, Any] = field(default_factory=dict)  # field -> ("full", text) or ("delta", delta)
+    imported_files: Optional[Dict[str, str]] = None  # name -> hash of the content in SnapshotStore._blobs
+    size: int = 0
+
+
+class SnapshotStore:
+    """History of the analyzed code and EduLint's responses, for the feedback dialog.
+
+    Consecutive snapshots of a file are nearly identical, so the sources and the responses are kept
+    as line deltas against the previous snapshot of the same main file, with a full copy every
+    keyframe_interval snapshots. Imported files are shared by their content's hash. Once the history
+    takes more than max_memory_bytes, the oldest snapshots are written to a file of this session
+    in the user data dir, which is bounded by max_spill_bytes (beyond it, the oldest are dropped).
+    """
+
+    def __init__(
+        self,
+        get_spill_dir: Callable[[], str] = get_snapshot_spill_dir,
+        max_memory_bytes: int = 2 * 1024 * 1024,
+        max_spill_bytes: int = 50 * 1024 * 1024,
+        keyframe_interval: int = 20,
+    ):
+        self._get_spill_dir = get_spill_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.keyframe_interval = keyframe_interval
+
+        self._snapshots: Dict[str, List[_StoredSnapshot]] = {}
+        self._latest_texts: Dict[str, Dict[str, str]] = {}  # full texts of the latest snapshot per main file
+        self._since_keyframe: Dict[str, int] = {}
+        self._blobs: Dict[str, list] = {}  # hash -> [content, reference count]
+        self._order = deque()  # main files in the order their snapshots were added, oldest first
+        self._spilled_keys = set()
+        self._spill_path = None
+        self.memory_size = 0
+        self.n_dropped = 0
+
+    def add(self, key: str, snapshot: Dict[str, Any]) -> None:
+        snapshot = dict(snapshot)
+        stored = _StoredSnapshot({})
+
+        imported_files = snapshot.pop("imported_files", None)
+        if imported_files is not None:
+            stored.imported_files = {name: self._add_blob(content) for name, content in imported_files.items()}
+
+        previous_texts = self._latest_texts.get(key, {})
+        is_keyframe = self._since_keyframe.get(key, self.keyframe_interval) >= self.keyframe_interval
+        latest_texts = {}
+        for name in _DELTA_FIELDS:
+            if name not in snapshot:
+                continue
+            text = self._encode_text(name, snapshot.pop(name))
+            latest_texts[name] = text
+            if is_keyframe or name not in previous_texts:
+                stored.texts[name] = ("full", text)
+                stored.size += len(text)
+            else:
+                delta = _compute_delta(previous_texts[name], text)
+                stored.texts[name] = ("delta", delta)
+                stored.size += _delta_size(delta)
+
+        stored.other_fields = snapshot
+        stored.size += sum(len(str(value)) for value in snapshot.values())
+
+        self._snapshots.setdefault(key, []).append(stored)
+        self._latest_texts[key] = latest_texts
+        self._since_keyframe[key] = 1 if is_keyframe else self._since_keyframe[key] + 1
+        self._order.append(key)
+        self.memory_size += stored.size
+
+        while self.memory_size > self.max_memory_bytes and self._order:
+            self._spill_oldest()
+
+    def get_snapshots(self, key: str) -> List[Dict[str, Any]]:
+        """All snapshots of the main file, oldest first, as they were added."""
+        result = self._read_spilled(key) if key in self._spilled_keys else []
+
+        texts = {}
+        for stored in self._snapshots.get(key, []):
+            texts = self._reconstruct_texts(stored, texts)
+            result.append(self._to_snapshot(stored, texts))
+        return result
+
+    def close(self) -> None:
+        if self._spill_path is not None:
+            try:
+                os.remove(self._spill_path)
+            except OSError:
+                pass
+            self._spill_path = None
+
+    @staticmethod
+    def _encode_text(name: str, value: Any) -> str:
+        if name == "warnings":  # one warning per line, so that unchanged warnings are copied
+            return "".join(json.dumps(warning, sort_keys=True) + "\n" for warning in value)
+        return value
+
+    @staticmethod
+    def _decode_text(name: str, text: str) -> Any:
+        if name == "warnings":
+            return [json.loads(line) for line in text.splitlines()]
+        return text
+
+    def _add_blob(self, content: str) -> str:
+        digest = hashlib.sha256(content.encode("utf8", errors="surrogatepass")).hexdigest()
+        if digest in self._blobs:
+            self._blobs[digest][1] += 1
+        else:
+            self._blobs[digest] = [content, 1]
+            self.memory_size += len(content)
+        return digest
+
+    def _release_blob(self, digest: str) -> None:
+        blob = self._blobs[digest]
+        blob[1] -= 1
+        if blob[1] == 0:
+            del self._blobs[digest]
+            self.memory_size -= len(blob[0])
+
+    @staticmethod
+    def _reconstruct_texts(stored: _StoredSnapshot, previous_texts: Dict[str, str]) -> Dict[str, str]:
+        texts = {}
+        for name, (kind, value) in stored.texts.items():
+            texts[name] = value if kind == "full" else _apply_delta(previous_texts[name], value)
+        return texts
+
+    def _to_snapshot(self, stored: _StoredSnapshot, texts: Dict[str, str]) -> Dict[str, Any]:
+        snapshot = dict(stored.other_fields)
+        if stored.imported_files is not None:
+            snapshot["imported_files"] = {name: self._blobs[digest][0] for name, digest in stored.imported_files.items()}
+        for name, text in texts.items():
+            snapshot[name] = self._decode_text(name, text)
+        return snapshot
+
+    def _spill_oldest(self) -> None:
+        key = self._order.popleft()
+        snapshots = self._snapshots[key]
+        oldest = snapshots.pop(0)
+        texts = self._reconstruct_texts(oldest, {})  # the oldest one kept in memory is always full
+
+        if snapshots:
+            # the next one becomes the oldest, so it must not depend on the spilled one
+            following = snapshots[0]
+            following_texts = self._reconstruct_texts(following, texts)
+            for name, text in following_texts.items():
+                if following.texts[name][0] == "delta":
+                    self.memory_size += len(text) - _delta_size(following.texts[name][1])
+                    following.size += len(text) - _delta_size(following.texts[name][1])
+                    following.texts[name] = ("full", text)
+        else:
+            del self._snapshots[key]
+            self._since_keyframe.pop(key, None)  # the next one can't be a delta against a spilled one
+
+        self._write_spilled(key, self._to_snapshot(oldest, texts))
+        for digest in (oldest.imported_files or {}).values():
+            self._release_blob(digest)
+        self.memory_size -= oldest.size
+
+    def _write_spilled(self, key: str, snapshot: Dict[str, Any]) -> None:
+        try:
+            if self._spill_path is None:
+                spill_dir = self._get_spill_dir()
+                os.makedirs(spill_dir, exist_ok=True)
+                self._remove_stale_spill_files(spill_dir)
+                self._spill_path = os.path.join(spill_dir, "%d-%d.jsonl" % (os.getpid(), int(time.time())))
+
+            line = json.dumps({"key": key, "snapshot": snapshot}) + "\n"
+            if os.path.exists(self._spill_path) and os.path.getsize(self._spill_path) + len(line) > self.max_spill_bytes:
+                self.n_dropped += 1
+                logger.debug("EduLint snapshot history is full, dropping a snapshot of %s", key)
+                return
+
+            with open(self._spill_path, "a", encoding="utf8") as f:
+                f.write(line)
+            self._spilled_keys.add(key)
+        except OSError as e:
+            self.n_dropped += 1
+            logger.warning("Could not write EduLint snapshot history: %s", e)
+
+    def _read_spilled(self, key: str) -> List[Dict[str, Any]]:
+        result = []
+        try:
+            with open(self._spill_path, encoding="utf8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.decoder.JSONDecodeError:
+                        continue
+                    if record.get("key") == key:
+                        result.append(record["snapshot"])
+        except (OSError, TypeError) as e:
+            logger.warning("Could not read EduLint snapshot history: %s", e)
+        return result
+
+    @staticmethod
+    def _remove_stale_spill_files(spill_dir: str, max_age_seconds: float = 24 * 60 * 60) -> None:
+        """Spill files are removed when Thonny closes, these are left behind by crashed sessions."""
+        for name in os.listdir(spill_dir):
+            path = os.path.join(spill_dir, name)
+            try:
+                if time.time() - os.path.getmtime(path) > max_age_seconds:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,63 @@
+import ast
+import hashlib
+import io
+import os
+import tokenize
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class SourceSnapshot:
+    """A file's content as it was when an analysis started.
+
+    Read once and shared by everything the analysis needs it for (the feedback snapshot, reporting,
+    the cache key, the incremental analysis, finding imports), so that they all see the same content.
+    The text, the hash and the AST are computed on first use.
+    """
+
+    path: str
+    data: bytes
+    stat: Optional[Tuple[int, int]]  # (mtime, size) when read, None if the content isn't from the file
+
+    @classmethod
+    def read(cls, path: str) -> "SourceSnapshot":
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        return cls(path, data, (stat.st_mtime_ns, stat.st_size))
+
+    @classmethod
+    def from_text(cls, path: str, text: str) -> "SourceSnapshot":
+        """For content which isn't saved, e.g. the editor's buffer."""
+        return cls(path, text.encode("utf8", errors="surrogatepass"), None)
+
+    @cached_property
+    def text(self) -> str:
+        """Decoded the same way as thonny.common.read_source does, including the newline translation."""
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(self.data).readline)
+        with io.TextIOWrapper(io.BytesIO(self.data), encoding) as f:
+            return f.read()
+
+    @cached_property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    @cached_property
+    def tree(self) -> Optional[ast.Module]:
+        """None if the source can't be parsed."""
+        try:
+            return ast.parse(self.data, self.path)
+        except (SyntaxError, ValueError):
+            return None
+
+    def is_current(self) -> bool:
+        """Whether the file still has this content, judging by its mtime and size."""
+        if self.stat is None:
+            return False
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == self.stat
@@ -0,0 +1,136 @@
+import copy
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging import getLogger
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = getLogger("EduLint")
+
+
+def get_state_dir() -> str:
+    from platformdirs import PlatformDirs
+
+    return PlatformDirs(appname="thonny-edulint").user_data_dir
+
+
+@contextmanager
+def _file_lock(lock_path: str):
+    """Exclusive lock shared by all Thonny instances using the same user data dir."""
+    with open(lock_path, "a+b") as f:
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # retries for about 10 s, then raises
+            else:
+                import fcntl
+
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            locked = True
+        except OSError as e:
+            # e.g. a network home directory without locking, the atomic rename still prevents corruption
+            logger.info("Could not lock %s: %s", lock_path, e)
+            locked = False
+
+        try:
+            yield
+        finally:
+            if locked:
+                if os.name == "nt":
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class JsonStateFile:
+    """A small JSON object the plugin keeps in its user data dir, like user_id.json or versions.json.
+
+    The file is loaded once and served from memory. Another Thonny may change it, so it's checked
+    for changes (by its mtime and size) at most every revalidate_seconds. Updates lock the file
+    against other Thonny instances, apply the change to its current content and write it to a temp
+    file which then replaces it, so that a reader never sees a half-written file.
+    """
+
+    def __init__(self, filename: str, get_dir: Callable[[], str] = get_state_dir, revalidate_seconds: float = 5.0):
+        self.filename = filename
+        self._get_dir = get_dir
+        self.revalidate_seconds = revalidate_seconds
+
+        self._lock = threading.RLock()
+        self._path = None
+        self._data: Optional[Dict[str, Any]] = None
+        self._stat: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self.n_loads = 0
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = os.path.join(self._get_dir(), self.filename)
+        return self._path
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if self._data is None or time.monotonic() - self._checked_at > self.revalidate_seconds:
+                self._reload_if_changed()
+            return copy.deepcopy(self._data.get(key, default))
+
+    def update(self, change: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Calls change with the file's current content to modify it in place, then saves the result.
+
+        Returns what change returned. The file is only written if its content changed.
+        """
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            with _file_lock(self.path + ".lock"):
+                self._reload_if_changed()
+                data = copy.deepcopy(self._data)
+                result = change(data)
+                if data != self._data:
+                    self._write(data)
+            return result
+
+    def _read_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload_if_changed(self) -> None:
+        self._checked_at = time.monotonic()
+        stat = self._read_stat()
+        if self._data is not None and stat == self._stat:
+            return
+
+        data = {}
+        if stat is not None:
+            try:
+                with open(self.path, "r", encoding="utf8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read %s, starting with an empty one: %s", self.path, e)
+            if not isinstance(data, dict):
+                data = {}
+        self._data = data
+        self._stat = stat
+        self.n_loads += 1
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.path)
+        self._data = data
+        self._stat = self._read_stat()
+        self._checked_at = time.monotonic()
+
+
+user_id_state = JsonStateFile("user_id.json")
+versions_state = JsonStateFile("versions.json")
@@ -1,3 +1,4 @@
+import threading
 from logging import getLogger
 
 from tkinter import ttk
@@ -5,7 +6,7 @@ from tkinter import ttk
 from thonny import get_workbench
 from thonny.ui_utils import CommonDialog
 
-from thonnycontrib.edulint.version_checker import PackageInfoManager, update_awaiting
+from thonnycontrib.edulint.version_checker import CHECKED_PACKAGES, PackageInfoManager, update_awaiting
 
 logger = getLogger(__name__)
 
@@ -14,12 +15,23 @@ def check_updates_with_notification(ttl: int = 600, open_window_always: bool = F
     if get_workbench().get_option("edulint.disable_version_check", default=False) and not open_window_always:
         return
 
-    is_update_waiting = update_awaiting(ttl)
-    if is_update_waiting or open_window_always:
+    if open_window_always:
+        # the dialog opens right away and shows the results of these checks once they finish
+        for package_name in CHECKED_PACKAGES:
+            PackageInfoManager.get_latest_version_async(package_name, ttl)
         get_workbench().event_generate("<<EduLintOpenUpdateWindow>>", when="tail")
+        return
+
+    def open_window_if_outdated():
+        if update_awaiting(ttl):
+            get_workbench().event_generate("<<EduLintOpenUpdateWindow>>", when="tail")
+
+    threading.Thread(target=open_window_if_outdated, name="EduLintUpdateNotification", daemon=True).start()
 
 
 class UpdateDialog(CommonDialog):
+    POLL_INTERVAL_MS = 100
+
     def __init__(self, master):
         super().__init__(master=master)
         main_frame = ttk.Frame(self)
@@ -31,23 +43,45 @@ class UpdateDialog(CommonDialog):
 
         padx = 15
 
-        try:
-            edulint_is_outdated = PackageInfoManager.is_update_waiting("edulint")
-            edulint_local_version = PackageInfoManager.get_local_module_version("edulint")
-            edulint_latest_version = PackageInfoManager.get_latest_version("edulint")
+        # the checks run in the background, started here unless they already are
+        self._checks = {package_name: PackageInfoManager.get_latest_version_async(package_name) for package_name in CHECKED_PACKAGES}
+        self._local_versions = {package_name: PackageInfoManager.get_local_module_version(package_name) for package_name in CHECKED_PACKAGES}
+
+        self._intro_label = ttk.Label(
+            main_frame,
+            text="Checking for the newest versions...\n\n" + self._describe_current_state("checking...", "checking..."),
+            wraplength=550,
+        )
+        self._intro_label.grid(row=1, column=0, columnspan=3, sticky="nw", padx=padx, pady=(15, 15))
 
-            thonny_edulint_is_outdated = PackageInfoManager.is_update_waiting("thonny-edulint")
-            thonny_edulint_local_version = PackageInfoManager.get_local_module_version("thonny-edulint")
-            thonny_edulint_latest_version = PackageInfoManager.get_latest_version("thonny-edulint")
+        self._show_results_when_checked()
+
+    def _describe_current_state(self, edulint_latest_version, thonny_edulint_latest_version) -> str:
+        return f"""\nCurrent state:
+EduLint: installed version = {self._local_versions["edulint"]}; newest version = {edulint_latest_version}
+Thonny-EduLint: installed version = {self._local_versions["thonny-edulint"]}; newest version = {thonny_edulint_latest_version}"""
+
+    def _show_results_when_checked(self):
+        if not self.winfo_exists():  # closed meanwhile
+            return
+        if not all(check.done() for check in self._checks.values()):
+            self.after(self.POLL_INTERVAL_MS, self._show_results_when_checked)
+            return
+
+        try:
+            edulint_latest_version = self._checks["edulint"].result()
+            thonny_edulint_latest_version = self._checks["thonny-edulint"].result()
         except Exception:
-            error_label = ttk.Label(
-                main_frame,
+            logger.exception("Checking for the newest versions failed")
+            self._intro_label.configure(
                 text="An error occurred while checking for current and latest version. Maybe you're "
                      "not connected to Internet?",
             )
-            error_label.grid(row=1, column=0, columnspan=3, sticky="nw", padx=padx, pady=(15, 15))
             return
 
+        edulint_is_outdated = PackageInfoManager.is_outdated(self._local_versions["edulint"], edulint_latest_version)
+        thonny_edulint_is_outdated = PackageInfoManager.is_outdated(self._local_versions["thonny-edulint"], thonny_edulint_latest_version)
+
         no_updates = "You have the newest version.\n\n"      
         
         update_thonny_edulint_instructions = """
@@ -64,21 +98,16 @@ You can update through:
 After that, you have to restart Thonny.\n\n
 """
 
-        current_state = f"""\nCurrent state:
-EduLint: installed version = {edulint_local_version}; newest version = {edulint_latest_version}
-Thonny-EduLint: installed version = {thonny_edulint_local_version}; newest version = {thonny_edulint_latest_version}"""
+        current_state = self._describe_current_state(edulint_latest_version, thonny_edulint_latest_version)
 
-        intro_label = ttk.Label(
-            main_frame,
+        self._intro_label.configure(
             text=(
                 (update_thonny_edulint_instructions if thonny_edulint_is_outdated else "") +
                 (update_just_edulint_instructions if edulint_is_outdated and not thonny_edulint_is_outdated else "") +
                 (no_updates if not edulint_is_outdated and not thonny_edulint_is_outdated else "") +
                 current_state
             ),
-            wraplength=550,
         )
-        intro_label.grid(row=1, column=0, columnspan=3, sticky="nw", padx=padx, pady=(15, 15))
 
     def _close(self, event=None):
         self.destroy()
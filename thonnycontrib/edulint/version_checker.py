@@ -1,81 +1,75 @@
-from typing import Optional, Tuple
-import os
-import json
-from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass, asdict, fields
+import threading
 import time
-from pathlib import Path
-
-from platformdirs import PlatformDirs
-from dataclasses_json import dataclass_json
 
 from . import pypi_helper
+from .state_store import versions_state
+from .version_probe import get_installed_version
+
+_running_checks: Dict[str, "Future"] = {}  # package name -> the future of its running check
+_checks_lock = threading.Lock()
 
 def current_timestamp() -> int:
     return int(time.time())
 
 
-@dataclass_json
 @dataclass
 class PackageInfo:
     version: Optional[str] = None
     last_update_started: int = 0
+    # validators of the index response the version comes from, for conditional requests
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "PackageInfo":
+        known_fields = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known_fields})
 
-class PackageInfoManager:
-    @staticmethod
-    def get_local_module_version(package_name: str) -> Optional[str]:
-        try:
-            from importlib.metadata import version  # This is only available in Python >= 3.8
-            return version(package_name)
-        except:
-            pass
-
-        try:
-            import pkg_resources  # Part of setuptools, which might not be installed. But I don't want to include them as dependency.
-            return pkg_resources.get_distribution(package_name).version
-        except:
-            pass
+    def to_dict(self) -> dict:
+        return asdict(self)
 
-        return None
 
+class PackageInfoManager:
     @staticmethod
-    def _create_json_file_if_doesnt_exist(filepath: str):
-        if os.path.exists(filepath):
-            return
-        Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, "w", encoding="utf8") as f:
-            f.write("{}")
+    def get_local_module_version(package_name: str) -> Optional[str]:
+        return get_installed_version(package_name)
 
     @classmethod
-    def _package_info_path(cls):
-        filepath = os.path.join(PlatformDirs(appname="thonny-edulint").user_data_dir, "versions.json")
-        cls._create_json_file_if_doesnt_exist(filepath)
-        return filepath 
+    def _save_package_info_locally(
+        cls, package_name: str, version = None, last_update_started: Optional[int] = None,
+        etag: Optional[str] = None, last_modified: Optional[str] = None,
+    ) -> PackageInfo:
+        def change(data: dict) -> PackageInfo:
+            package_info = PackageInfo.from_dict(data.get(package_name, {}))
+            if version:
+                package_info.version = version
+                package_info.etag = etag
+                package_info.last_modified = last_modified
+            if last_update_started:
+                package_info.last_update_started = last_update_started
+            data[package_name] = package_info.to_dict()
+            return package_info
 
-    @classmethod
-    def _save_package_info_locally(cls, package_name: str, version = None, last_update_started: Optional[int] = None) -> PackageInfo:
-        with open(cls._package_info_path(), "r", encoding="utf8") as f:
-            data = json.load(f)
-
-        package_info = PackageInfo.from_dict(data.get(package_name, {}))
-
-        if version:
-            package_info.version = version
-        if last_update_started:
-            package_info.last_update_started = last_update_started
-            
-        data[package_name] = package_info.to_dict()
-        with open(cls._package_info_path(), "w", encoding="utf8") as f:   # I'm aware there is possible race condition between read write. Risk accepted.
-            json.dump(data, f, indent=4)
-        
-        return package_info
+        return versions_state.update(change)
 
     @classmethod
     def _get_package_info_locally(cls, package_name: str) -> PackageInfo:
-        with open(cls._package_info_path(), "r", encoding="utf8") as f:
-            data = json.load(f)
+        return PackageInfo.from_dict(versions_state.get(package_name, {}))
+
+    @classmethod
+    def _claim_update(cls, package_name: str, ttl: int) -> bool:
+        """Marks the update as started, unless another Thonny has started it within the ttl."""
+        def change(data: dict) -> bool:
             package_info = PackageInfo.from_dict(data.get(package_name, {}))
-            return package_info
+            if current_timestamp() < package_info.last_update_started + ttl:
+                return False
+            package_info.last_update_started = current_timestamp()
+            data[package_name] = package_info.to_dict()
+            return True
+
+        return versions_state.update(change)
 
     @classmethod
     def get_latest_version(cls, package_name: str, ttl = 600) -> Optional[str]:
@@ -84,24 +78,62 @@ class PackageInfoManager:
             return package_info.version  # The might be None if the previous request didn't finish yet or if it failed.
 
         try:
-            cls._save_package_info_locally(package_name, last_update_started=current_timestamp())
+            if not cls._claim_update(package_name, ttl):
+                return cls._get_package_info_locally(package_name).version
             # print("pip request")  # TODO: Remove
-            versions = pypi_helper.get_versions(package_name)
-            sorted_versions = list(sorted(versions, key = lambda x: (x.major, x.minor, x.micro)))
+            if package_info.version is not None:
+                response = pypi_helper.fetch_versions(package_name, package_info.etag, package_info.last_modified)
+            else:
+                response = pypi_helper.fetch_versions(package_name)
+
+            if response.versions is None:  # not modified since the stored version was fetched
+                return package_info.version
+
+            sorted_versions = list(sorted(response.versions, key = lambda x: (x.major, x.minor, x.micro)))
             latest_version_str = str(sorted_versions[-1])
-            cls._save_package_info_locally(package_name, version=latest_version_str)
+            cls._save_package_info_locally(
+                package_name, version=latest_version_str, etag=response.etag, last_modified=response.last_modified
+            )
             return latest_version_str
         except Exception as _:
             return None
 
     @classmethod
-    def is_update_waiting(cls, package_name: str, ttl = 600) -> bool:
-        local_package_version = cls.get_local_module_version(package_name)
+    def get_latest_version_async(cls, package_name: str, ttl = 600) -> "Future[Optional[str]]":
+        """Like get_latest_version, on a background thread. Callers asking while a check
+        of the package is running get that check's future instead of starting another one."""
+        from concurrent.futures import Future
+
+        with _checks_lock:
+            future = _running_checks.get(package_name)
+            if future is not None:
+                return future
+
+            future = Future()
+            package_info = cls._get_package_info_locally(package_name)
+            if current_timestamp() < package_info.last_update_started + ttl:
+                future.set_result(package_info.version)  # no need for a thread
+                return future
+            _running_checks[package_name] = future
+
+        def check():
+            try:
+                future.set_result(cls.get_latest_version(package_name, ttl))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with _checks_lock:
+                    if _running_checks.get(package_name) is future:
+                        del _running_checks[package_name]
+
+        threading.Thread(target=check, name=f"EduLintVersionCheck-{package_name}", daemon=True).start()
+        return future
+
+    @staticmethod
+    def is_outdated(local_package_version: Optional[str], latest_version: Optional[str]) -> bool:
         if local_package_version is None: # unable to determine local package version
             return False
 
-        latest_version = cls.get_latest_version(package_name, ttl)
-        
         def versiontuple(v):
             return tuple(map(int, (v.split("."))))
 
@@ -110,12 +142,26 @@ class PackageInfoManager:
         except Exception:
             return local_package_version != latest_version  # Fallback
 
+    @classmethod
+    def is_update_waiting(cls, package_name: str, ttl = 600) -> bool:
+        local_package_version = cls.get_local_module_version(package_name)
+        if local_package_version is None: # unable to determine local package version
+            return False
+
+        latest_version = cls.get_latest_version_async(package_name, ttl).result()
+        return cls.is_outdated(local_package_version, latest_version)
+
+
+CHECKED_PACKAGES = ("edulint", "thonny-edulint")
+
 
 def update_awaiting(ttl: int = 600) -> bool:
-    is_edulint_outdated = PackageInfoManager.is_update_waiting("edulint", ttl)
-    is_thonny_edulint_outdated = PackageInfoManager.is_update_waiting("thonny-edulint", ttl)
-    any_updates = is_edulint_outdated or is_thonny_edulint_outdated
-    return bool(any_updates)  # converting from None, True, False to just bool
+    # both checks run at once, so this waits only for the slower one
+    checks = {package_name: PackageInfoManager.get_latest_version_async(package_name, ttl) for package_name in CHECKED_PACKAGES}
+    return any(
+        PackageInfoManager.is_outdated(PackageInfoManager.get_local_module_version(package_name), check.result())
+        for package_name, check in checks.items()
+    )
 
 
 if __name__ == "__main__":
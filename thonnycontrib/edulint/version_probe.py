@@ -0,0 +1,33 @@
+from functools import lru_cache
+from logging import getLogger
+from typing import Optional
+
+logger = getLogger("EduLint")
+
+
+@lru_cache(maxsize=None)
+def get_installed_version(distribution_name: str) -> Optional[str]:
+    """Version of the installed distribution, or None if it isn't installed.
+
+    Read from the distribution's metadata, so the package isn't imported (importing pylint or mypy
+    takes hundreds of milliseconds). Memoized for the session: upgrades take a restart of Thonny anyway.
+    """
+    try:
+        from importlib import metadata  # This is only available in Python >= 3.8
+    except ImportError:
+        metadata = None
+
+    if metadata is not None:
+        try:
+            return metadata.version(distribution_name)
+        except metadata.PackageNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Could not read the version of %s", distribution_name)
+            return None
+
+    try:
+        import pkg_resources  # Part of setuptools, which might not be installed. But I don't want to include them as dependency.
+        return pkg_resources.get_distribution(distribution_name).version
+    except Exception:
+        return None
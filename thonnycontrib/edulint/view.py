@@ -1,13 +1,20 @@
-import ast
 import datetime
+import difflib
 import os.path
+import re
+import shutil
+import tempfile
 import textwrap
+import time
 import tkinter as tk
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
 from logging import getLogger
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from thonny import get_runner, get_workbench, rst_utils, tktextext, ui_utils
-from thonny.common import ToplevelResponse, read_source
+from thonny.common import ToplevelResponse
 from thonny.ui_utils import scrollbar_style
 
 try:
@@ -16,12 +23,49 @@ except ImportError:
     STRING_PSEUDO_FILENAME = "<string>"  # Workaround to hopefully also support Thonny < 4.0.0 
 
 from thonnycontrib.edulint.feedback_dialog import FeedbackDialog
+from thonnycontrib.edulint.finding import Finding, FindingIndex, stable_keys
+from thonnycontrib.edulint.import_graph import import_graph
+from thonnycontrib.edulint.result_cache import compute_cache_key
+from thonnycontrib.edulint.scheduler import AnalysisScheduler
+from thonnycontrib.edulint.snapshot_store import SnapshotStore
+from thonnycontrib.edulint.source_snapshot import SourceSnapshot
 
 
 logger = getLogger(__name__)
 _program_analyzer_classes: List["ProgramAnalyzer"] = []
 ASK_FEEDBACK = False
 
+# Explanations are rendered only when their topic is first opened, until then the topic body
+# contains just this marker around the explanation's index in EduLintView._lazy_explanations
+LAZY_EXPLANATION_MARKER = "\u2060"
+_LAZY_EXPLANATION_RE = re.compile(LAZY_EXPLANATION_MARKER + r"(\d+)" + LAZY_EXPLANATION_MARKER)
+
+# Warnings are rendered in slices of at most this long, so that Thonny stays responsive
+# even with hundreds of them. The first slice is rendered right away, the rest when Tk is idle.
+RENDER_SLICE_SECONDS = 0.015
+
+# Each warning is rendered as a block tagged with this prefix and a number, so that later results
+# can replace just the blocks that changed (see EduLintView._update_blocks)
+BLOCK_TAG_PREFIX = "edulint-block-"
+
+# In lint-as-you-type mode, the buffer is analyzed once the student stops typing for this long
+LIVE_DEBOUNCE_MS = 1000
+
+
+@dataclass
+class _Block:
+    filename: str
+    key: tuple  # identifies the warning across runs, see finding.stable_keys
+    signature: tuple  # what the block was rendered from, it's re-rendered when this changes
+
+
+@dataclass
+class _BlockEntry:
+    tag: str
+    block: _Block
+    fragment: str
+    expanded: bool = False
+
 
 class EduLintView(tktextext.TextFrame):
     def __init__(self, master):
@@ -42,10 +86,38 @@ class EduLintView(tktextext.TextFrame):
         )
 
         self._analyzer_instances = []
-        self._accepted_warning_sets = []
-
-        self._snapshots_per_main_file = {}
+        self._accepted_warnings = {}  # analyzer -> (its warnings, whether they are final)
+
+        self._lazy_explanations = []
+        self._lazy_explanation_ids = {}
+        self._bound_toggles = set()
+
+        # displayed warnings by their tags, which may include blocks not rendered because of a cancel
+        self._blocks: Dict[str, _Block] = {}
+        self._block_count = 0
+        self._displayed_main_file = None
+        # files with a section of warnings in the view, None while the sections are being rendered
+        self._displayed_files: Optional[List[str]] = []
+        self._previous_keys_per_main_file = {}
+
+        # RST fragments of warnings and callables (e.g. the conclusion) waiting to be rendered, in order
+        self._render_queue = deque()
+        self._render_job = None
+        self._render_chunk_size = 10
+
+        self._snapshot_store = SnapshotStore()
+        # the snapshot being filled in, it goes to the store when the next one starts
         self._current_snapshot = None
+        self._current_snapshot_key = None
+
+        self._scheduler = AnalysisScheduler(lambda args: self._run_analysis(*args), self.after, self.after_cancel)
+
+        self._live_scheduler = AnalysisScheduler(
+            self._run_live_analysis, self.after, self.after_cancel, debounce_ms=LIVE_DEBOUNCE_MS
+        )
+        self._live_buffer_dir = None
+        self._live_analysis = None  # (buffer_path, real_path, started_at) of the running live analysis
+        self._live_not_before = 0.0
 
         main_font = tk.font.nametofont("TkDefaultFont")
 
@@ -58,6 +130,9 @@ class EduLintView(tktextext.TextFrame):
             self.text.tag_bind("feedback_link", "<ButtonRelease-1>", self._ask_feedback, True)
 
         get_workbench().bind("ToplevelResponse", self.handle_toplevel_response, True)
+        get_workbench().bind_class("EditorCodeViewText", "<<TextChange>>", self._on_editor_text_change, True)
+        get_workbench().bind("WorkbenchClose", self._remove_live_buffer_dir, True)
+        get_workbench().bind("WorkbenchClose", lambda event=None: self._snapshot_store.close(), True)
 
     def handle_toplevel_response(self, msg: ToplevelResponse) -> None:
         # Can be called by event system or by Workbench
@@ -70,101 +145,285 @@ class EduLintView(tktextext.TextFrame):
             # Shell commands may be used to investigate the problem, don't clear assistance
             return
 
-        self._clear()
+        # a real run supersedes analyzing the buffer
+        self._live_scheduler.cancel()
 
-        from thonny.plugins.cpython_frontend import LocalCPythonProxy
-
-        if not isinstance(get_runner().get_backend_proxy(), LocalCPythonProxy):
+        if not _is_local_cpython_backend():
             # TODO: add some support for MicroPython as well
+            self._scheduler.cancel()
+            self._clear()
             return
 
+        source = None
+        if msg.get("filename") and os.path.exists(msg["filename"]):
+            try:
+                # the file is read just here, everything the analysis needs its content for shares this
+                source = SourceSnapshot.read(msg["filename"])
+            except OSError as e:
+                logger.warning("Could not read %s: %s", msg["filename"], e)
+
+        if source is not None:
+            self._scheduler.request(source.path, partial(_analysis_fingerprint, source), (msg, source))
+        else:
+            self._scheduler.cancel()
+            self._run_analysis(msg)
+
+    def _run_analysis(self, msg: ToplevelResponse, source: Optional[SourceSnapshot] = None) -> None:
+        if source is not None:
+            self._prepare_view(source.path)
+        else:
+            self._clear()
+
         # prepare for snapshot
         # TODO: should distinguish between <string> and <stdin> ?
-        key = msg.get("filename", STRING_PSEUDO_FILENAME)
+        self._start_snapshot(msg.get("filename", STRING_PSEUDO_FILENAME))
+
+        if source is not None:
+            self.main_file_path = source.path
+            self._start_program_analyses(source, _get_imported_user_files(source.path, source))
+        else:
+            self.main_file_path = None
+            self._present_conclusion(None, [])
+
+    def _start_snapshot(self, key):
+        if self._current_snapshot is not None:
+            self._snapshot_store.add(self._current_snapshot_key, self._current_snapshot)
         self._current_snapshot = {
             "timestamp": datetime.datetime.now().isoformat()[:19],
             "main_file_path": key,
         }
-        self._snapshots_per_main_file.setdefault(key, [])
-        self._snapshots_per_main_file[key].append(self._current_snapshot)
+        self._current_snapshot_key = key
 
-        if msg.get("filename") and os.path.exists(msg["filename"]):
-            self.main_file_path = msg["filename"]
-            source = read_source(msg["filename"])
-            self._start_program_analyses(
-                msg["filename"], source, _get_imported_user_files(msg["filename"], source)
-            )
-        else:
-            self.main_file_path = None
-            self._present_conclusion(None, [])
+    def _on_editor_text_change(self, event=None):
+        if not get_workbench().get_option("edulint.lint_as_you_type"):
+            return
+
+        editor = get_workbench().get_editor_notebook().get_current_editor()
+        if editor is None or event is not None and event.widget is not editor.get_text_widget():
+            return
+
+        filename = editor.get_filename()
+        if not filename or not os.path.isfile(filename) or not _is_local_cpython_backend():
+            # untitled or remote files don't have a directory their imports could be resolved from
+            return
+
+        if self._live_analysis is not None:
+            # the code it analyzes is outdated already, don't let it take CPU from the next one
+            self._cancel_analyses()
+            self._finish_live_analysis()
+
+        source = editor.get_content()
+        fingerprint = partial(_analysis_fingerprint, SourceSnapshot.from_text(filename, source))
+        delay_ms = int(max(0.0, self._live_not_before - time.monotonic()) * 1000)
+        self._live_scheduler.request(filename, fingerprint, (filename, source), delay_ms)
+
+    def _run_live_analysis(self, payload):
+        """Analyzes the editor's buffer as if it was saved, without touching the file itself."""
+        filename, source = payload
+        try:
+            buffer_source = self._write_live_buffer(filename, source)
+        except (OSError, UnicodeEncodeError) as e:
+            logger.warning("Could not prepare the buffer of %s for analysis: %s", filename, e)
+            self._live_scheduler.analysis_finished(filename)
+            return
+
+        self._scheduler.cancel()
+        self._prepare_view(filename)
+        self._start_snapshot(filename)
+        self.main_file_path = filename
+        self._live_analysis = (buffer_source.path, filename, time.monotonic())
+        self._start_program_analyses(
+            SourceSnapshot.from_text(filename, source),
+            _get_imported_user_files(filename, buffer_source),
+            buffer_source,
+        )
+
+    def _write_live_buffer(self, filename, source) -> SourceSnapshot:
+        if self._live_buffer_dir is None or not os.path.isdir(self._live_buffer_dir):
+            self._live_buffer_dir = tempfile.mkdtemp(prefix="thonny-edulint-")
+
+        # same name as the real file, so that the module name seen by the linters matches
+        buffer_path = os.path.join(self._live_buffer_dir, os.path.basename(filename))
+        data = source.encode("utf8")
+        with open(buffer_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            stat = os.fstat(f.fileno())
+        return SourceSnapshot(buffer_path, data, (stat.st_mtime_ns, stat.st_size))
+
+    def _remove_live_buffer_dir(self, event=None):
+        if self._live_buffer_dir is not None:
+            shutil.rmtree(self._live_buffer_dir, ignore_errors=True)
+            self._live_buffer_dir = None
+
+    def _finish_live_analysis(self):
+        """Postpones the next live analysis so that they take at most edulint.live_cpu_budget of the time."""
+        if self._live_analysis is None:
+            return
+        _, real_path, started_at = self._live_analysis
+        self._live_analysis = None
+        self._live_scheduler.analysis_finished(real_path)
+
+        budget = min(max(get_workbench().get_option("edulint.live_cpu_budget", 0.25), 0.01), 1.0)
+        elapsed = time.monotonic() - started_at
+        self._live_not_before = time.monotonic() + elapsed * (1 / budget - 1)
+
+    def _map_live_buffer_paths(self, warnings):
+        if self._live_analysis is None:
+            return warnings
+        buffer_path, real_path, _ = self._live_analysis
+        buffer_path = os.path.normcase(buffer_path)
+        return [
+            w.replace(filename=real_path) if os.path.normcase(os.path.abspath(w.filename)) == buffer_path else w
+            for w in warnings
+        ]
 
     def _append_text(self, chars, tags=()):
         self.text.direct_insert("end", chars, tags=tags)
 
-    def _clear(self):
-        self._accepted_warning_sets.clear()
+    def _cancel_analyses(self):
+        self._accepted_warnings.clear()
         for wp in self._analyzer_instances:
             wp.cancel_analysis()
         self._analyzer_instances = []
-        self.text.clear()
 
-    def _start_program_analyses(self, main_file_path, main_file_source, imported_file_paths):
+    def _clear(self):
+        self._finish_live_analysis()
+        self._cancel_analyses()
+        self._cancel_rendering()
+        self._reset_text()
+        self._displayed_main_file = None
+
+    def _prepare_view(self, main_file_path):
+        """Keeps the file's warnings on display while it's analyzed again, so that the results only update them."""
+        if main_file_path != self._displayed_main_file or self._displayed_files is None:
+            self._clear()
+        else:
+            self._finish_live_analysis()
+            self._cancel_analyses()
+            self._cancel_rendering()
+            if "conclusion" in self.text.mark_names():
+                self.text.direct_delete("conclusion", "end-1c")
+        self._displayed_main_file = main_file_path
+
+    def _reset_text(self):
+        self.text.clear()
+        self.text.mark_unset("conclusion")
+        self._lazy_explanations = []
+        self._lazy_explanation_ids = {}
+        self._bound_toggles = set()
+        self._blocks = {}
+        self._displayed_files = []
+
+    def _start_program_analyses(self, main_source, imported_file_paths, analyzed_source=None):
+        """analyzed_source is what the analyzers get instead of main_source, if that isn't saved in its file."""
+        main_file_path = main_source.path
         for cls in _program_analyzer_classes:
             analyzer = cls(self._accept_warnings)
+            analyzer.partial_warnings_handler = self._accept_partial_warnings
             if analyzer.is_enabled():
                 self._analyzer_instances.append(analyzer)
 
         if not self._analyzer_instances:
+            self._scheduler.analysis_finished(main_file_path)
+            self._finish_live_analysis()
             return
 
-        self._append_text("\nAnalyzing your code ...", ("em",))
+        self._append_progress("\nAnalyzing your code ...")
+
+        imported_sources = {}
+        for path in imported_file_paths:
+            try:
+                imported_sources[path] = SourceSnapshot.read(path)
+            except OSError as e:
+                logger.warning("Could not read %s: %s", path, e)
 
         # save snapshot of current source
         self._current_snapshot["main_file_path"] = main_file_path
-        self._current_snapshot["main_file_source"] = main_file_source
+        self._current_snapshot["main_file_source"] = main_source.text
         self._current_snapshot["imported_files"] = {
-            name: read_source(name) for name in imported_file_paths
+            name: source.text for name, source in imported_sources.items()
         }
 
         # start the analysis
+        analyzed_source = analyzed_source or main_source
+        # a copy elsewhere still imports the modules next to the real file
+        import_dirs = [os.path.dirname(main_file_path)] if analyzed_source is not main_source else []
         for analyzer in self._analyzer_instances:
-            analyzer.start_analysis(main_file_path, imported_file_paths)
+            analyzer.sources = {analyzed_source.path: analyzed_source, **imported_sources}
+            analyzer.import_dirs = import_dirs
+            analyzer.start_analysis(analyzed_source.path, set(imported_sources))
 
         if get_workbench().get_option("edulint.open_edulint_on_warnings"):
             get_workbench().show_view("EduLintView")
 
-    def _accept_warnings(self, analyzer, warnings, config):
+    def _append_progress(self, text):
+        # everything from here on is replaced by the final results
+        self.text.mark_set("analysis_progress", "end-1c")
+        self.text.mark_gravity("analysis_progress", "left")
+        self._append_text(text, ("em",))
+
+    def _accept_warnings(self, analyzer, warnings, config, final=True):
+        """An analyzer may report the warnings found so far (final=False) before the final ones."""
         if analyzer.cancelled:
             return
 
-        self._accepted_warning_sets.append(warnings)
-        if len(self._accepted_warning_sets) == len(self._analyzer_instances):
-            warnings = [w for ws in self._accepted_warning_sets for w in ws]
-            self._present_warnings(warnings)
-            self._present_conclusion(config, warnings)
+        self._accepted_warnings[analyzer] = (self._map_live_buffer_paths(_as_findings(warnings)), final)
+        if len(self._accepted_warnings) < len(self._analyzer_instances):
+            return
 
-    def _present_summary(self, warnings):
+        accepted = [self._accepted_warnings[a] for a in self._analyzer_instances]
+        warnings = [w for ws, _ in accepted for w in ws]
+        if all(is_final for _, is_final in accepted):
+            self._scheduler.analysis_finished(self.main_file_path)
+            self._finish_live_analysis()
+            changes = self._present_warnings(warnings)
+            self._render_later(partial(self._present_conclusion, config, warnings, changes))
+        else:
+            self._present_warnings(warnings, final=False)
+            self._render_later(self._present_interim_conclusion)
+
+    def _accept_partial_warnings(self, analyzer, warnings):
+        if analyzer.cancelled or not warnings or self._blocks:
+            # the results of the previous run stay on display until the final ones update them
+            return
+
+        warnings = sorted(
+            self._map_live_buffer_paths(_as_findings(warnings)), key=lambda x: (x.filename, x.lineno or 0)
+        )
+        for i, warning in enumerate(warnings):
+            self._render_later(self._format_warning(warning, i == len(warnings) - 1) + "\n")
+
+    def _present_summary(self, warnings, changes=None):
         self._append_text("\n")
         rst = "Summary: "
         if len(warnings) == 0:
-            return rst + "no problems detected"
+            rst += "no problems detected"
+        else:
+            enabler_counts = FindingIndex(warnings).enabler_counts
+            rst += ", ".join(
+                f"{enabler if enabler is not None else 'undetermined origin'}: {enabler_counts[enabler]}"
+                for enabler in sorted(enabler_counts, key=lambda e: (e is None, e or ""))
+            )
 
-        enabler_counts = {
-            enabler: len([w for w in warnings if w["enabled_by"] == enabler])
-            for enabler in sorted(set(
-                w["enabled_by"] for w in warnings
-            ))
-        }
-        rst += ", ".join(
-            f"{enabler if enabler is not None else 'undetermined origin'}: {count}"
-            for enabler, count in enabler_counts.items()
-        )
+        if changes is not None and any(changes):
+            rst += "\n\nSince the last run: %d fixed, %d new" % changes
         rst += "\n\n"
         return rst
 
-    def _present_conclusion(self, config, warnings):
+    def _present_interim_conclusion(self):
+        # replaced by the final results, or by the next analysis like the conclusion
+        self.text.mark_set("conclusion", "end-1c")
+        self.text.mark_gravity("conclusion", "left")
+        self._append_progress("\nStill analyzing ...")
+
+    def _present_conclusion(self, config, warnings, changes=None):
+        # everything from here on is replaced when the file is analyzed again
+        self.text.mark_set("conclusion", "end-1c")
+        self.text.mark_gravity("conclusion", "left")
+
         if self.main_file_path is not None and os.path.exists(self.main_file_path):
-            self.text.append_rst(self._present_summary(warnings))
+            self.text.append_rst(self._present_summary(warnings, changes))
 
             if config is not None:
                 self.text.append_rst(f"used configuration: {config.get('config-file', 'unknown')}", ("em",))
@@ -179,93 +438,334 @@ class EduLintView(tktextext.TextFrame):
         if ASK_FEEDBACK and len(warnings) > 0:
             self._append_feedback_link()
 
-    def _present_warnings(self, warnings):
-        self.text.direct_delete("end-2l linestart", "end-1c lineend")
-
-        if not warnings:
-            return
-
-        rst = (
+    def _present_warnings(self, warnings, final=True) -> Optional[Tuple[int, int]]:
+        """Shows the warnings and returns how many were fixed and how many are new since the last run.
+
+        Warnings which aren't final are compared with the last run, but don't become the last run.
+
+        If the view shows the same files' warnings already, only the blocks of the warnings which
+        changed are replaced, so that the scroll position and the opened explanations stay as they were.
+        """
+        self._cancel_rendering()  # preliminary warnings not rendered yet
+        scroll_anchor = self._get_scroll_anchor()
+        self.text.direct_delete("analysis_progress", "end-1c")
+
+        # Pylint may give double warnings (eg. when module imports itself), the index drops them
+        by_file = FindingIndex(warnings).by_file
+        files = list(by_file)
+        displayed = self._get_displayed_blocks()
+        update = bool(files) and files == self._displayed_files and all(f in displayed for f in files)
+        if not update:
+            self._reset_text()
+
+        sources = {}
+        if self._current_snapshot.get("main_file_source") is not None:
+            sources.update(self._current_snapshot.get("imported_files", {}))
+            sources[self._current_snapshot["main_file_path"]] = self._current_snapshot["main_file_source"]
+        previous_keys = self._previous_keys_per_main_file.get(self.main_file_path)
+
+        header_rst = (
             self._get_rst_prelude()
             + rst_utils.create_title("What to improve")
             + ":remark:`%s`\n\n" % "Addressing these suggestions can fix some bugs and makes your code more readable."
         )
-
-        by_file = {}
-        for warning in warnings:
-            if warning["filename"] not in by_file:
-                by_file[warning["filename"]] = []
-            if warning not in by_file[warning["filename"]]:
-                # Pylint may give double warnings (eg. when module imports itself)
-                by_file[warning["filename"]].append(warning)
-
-        for filename in by_file:
-            if len(by_file) > 1:
-                rst += "`%s <%s>`__\n\n" % (
-                    os.path.basename(filename),
-                    self._format_file_url(dict(filename=filename)),
-                )
+        rst = header_rst
+        sections = {}
+        current_keys = set()
+        n_new = 0
+        for filename in files:
             file_warnings = sorted(
-                by_file[filename], key=lambda x: (x.get("lineno", 0), -x.get("relevance", 1))
+                by_file[filename], key=lambda x: (x.lineno or 0, -(1 if x.relevance is None else x.relevance))
             )
-
-            for i, warning in enumerate(file_warnings):
-                rst += self._format_warning(warning, i == len(file_warnings) - 1) + "\n"
-
-            rst += "\n"
-
-        self.text.append_rst(rst)
+            entries = []
+            for i, (warning, key) in enumerate(zip(file_warnings, stable_keys(file_warnings, sources))):
+                is_new = previous_keys is not None and key not in previous_keys
+                last = i == len(file_warnings) - 1
+                self._block_count += 1
+                tag = BLOCK_TAG_PREFIX + str(self._block_count)
+                fragment = self._format_warning(warning, last, tag, is_new) + "\n"
+                entries.append(_BlockEntry(tag, _Block(filename, key, (warning, last, is_new)), fragment))
+                current_keys.add(key)
+                n_new += is_new
+            entries[-1].fragment += "\n"
+            sections[filename] = entries
+
+            if len(files) > 1:
+                rst += self._format_file_header(filename)
+            rst += "".join(entry.fragment for entry in entries)
+
+        if update:
+            self._update_blocks(sections, displayed)
+        elif files:
+            self._displayed_files = None
+            self.text.append_rst(header_rst)
+            for filename, entries in sections.items():
+                if len(files) > 1:
+                    self._render_later(self._format_file_header(filename))
+                for entry in entries:
+                    self._blocks[entry.tag] = entry.block
+                    self._render_later(entry.fragment)
+            self._render_later(partial(self._finish_sections, files))
+        self._render_later(partial(self._restore_scroll, scroll_anchor))
+
+        self._render_pending()  # the first screenful right away
 
         # save snapshot
         self._current_snapshot["warnings_rst"] = rst
-        self._current_snapshot["warnings"] = warnings
+        self._current_snapshot["warnings"] = [w.to_dict(include_explanation=False) for w in warnings]
 
-        if get_workbench().get_option("edulint.open_edulint_on_warnings"):
+        if warnings and get_workbench().get_option("edulint.open_edulint_on_warnings"):
             get_workbench().show_view("EduLintView")
 
-    def _format_warning(self, warning, last):
-        prepared_enabler = f"[{warning['enabled_by']}] " if warning["enabled_by"] is not None else ""
-        prepared_msg = warning["msg"].splitlines()[0]
+        if not final:
+            return None
+        self._previous_keys_per_main_file[self.main_file_path] = current_keys
+        if previous_keys is None:
+            return None
+        return len(previous_keys - current_keys), n_new
+
+    def _format_file_header(self, filename):
+        return "`%s <%s>`__\n\n" % (os.path.basename(filename), format_file_url(filename, None, None))
+
+    def _finish_sections(self, files):
+        self._displayed_files = files
+
+    def _get_displayed_blocks(self) -> Dict[str, List[Tuple[str, _Block]]]:
+        """The tags and blocks of the displayed warnings, per file, in the order they are displayed."""
+        positions = {}
+        for tag in list(self._blocks):
+            ranges = self.text.tag_ranges(tag)
+            if ranges:
+                positions[tag] = tuple(map(int, str(ranges[0]).split(".")))
+            else:
+                del self._blocks[tag]  # its rendering was cancelled
+
+        displayed = {}
+        for tag in sorted(positions, key=positions.get):
+            displayed.setdefault(self._blocks[tag].filename, []).append((tag, self._blocks[tag]))
+        return displayed
+
+    def _update_blocks(self, sections: Dict[str, List[_BlockEntry]], displayed):
+        """Replaces the displayed blocks with the given ones, keeping those which render the same."""
+        removed = []
+        for filename, entries in sections.items():
+            old = displayed[filename]
+            kept = {}
+            matcher = difflib.SequenceMatcher(
+                None, [block.key for _, block in old], [entry.block.key for entry in entries], autojunk=False
+            )
+            for op, i1, i2, j1, j2 in matcher.get_opcodes():
+                if op != "equal":
+                    continue
+                for (tag, block), entry in zip(old[i1:i2], entries[j1:j2]):
+                    if block.signature == entry.block.signature:
+                        kept[entry.tag] = tag
+                    else:
+                        entry.expanded = self._is_expanded(tag)
+
+            # new blocks go after the preceding kept one, the first ones before everything of the file
+            position = ("before", old[0][0])
+            run = []
+            for entry in entries:
+                if entry.tag in kept:
+                    if run:
+                        self._render_later(partial(self._insert_blocks, position, run))
+                        run = []
+                    position = ("after", kept[entry.tag])
+                    continue
+
+                self._blocks[entry.tag] = entry.block
+                run.append(entry)
+                if len(run) >= self._render_chunk_size:
+                    self._render_later(partial(self._insert_blocks, position, run))
+                    position = ("after", entry.tag)
+                    run = []
+            if run:
+                self._render_later(partial(self._insert_blocks, position, run))
+
+            removed.extend(tag for tag, _ in old if tag not in kept.values())
+
+        self._render_later(partial(self._remove_blocks, removed))
+
+    def _insert_blocks(self, position, entries: List[_BlockEntry]):
+        where, anchor_tag = position
+        ranges = self.text.tag_ranges(anchor_tag)
+        if not ranges:
+            return
+        self.text.mark_set("block_insert", ranges[0] if where == "before" else ranges[-1])
+        self.text.mark_gravity("block_insert", "right")
+        self.text.insert_rst("block_insert", self._get_rst_prelude() + "".join(entry.fragment for entry in entries))
+
+        self._bind_lazy_explanations()
+        for entry in entries:
+            toggle = self._get_toggle(entry.tag) if entry.expanded else None
+            if toggle is not None:
+                self.text.nametowidget(toggle[0]).event_generate("<1>")
+
+    def _remove_blocks(self, tags):
+        for tag in tags:
+            ranges = self.text.tag_ranges(tag)
+            if ranges:
+                self.text.direct_delete(ranges[0], ranges[-1])
+            self._blocks.pop(tag, None)
+
+    def _get_toggle(self, block_tag):
+        """The +/- label of the block's topic and the tag of its body, None if it has no explanation."""
+        ranges = self.text.tag_ranges(block_tag)
+        if not ranges:
+            return None
+        for tag in self.text.tag_names(ranges[0]):
+            if tag.startswith("_UT_") and tag.endswith("_title"):
+                return self.text.window_cget(ranges[0], "window"), tag[: -len("_title")] + "_body"
+        return None
+
+    def _is_expanded(self, block_tag):
+        toggle = self._get_toggle(block_tag)
+        return toggle is not None and self.text.tag_cget(toggle[1], "elide") not in ("1", 1, True)
+
+    def _get_scroll_anchor(self):
+        """The key of the topmost visible warning."""
+        for tag in self.text.tag_names("@0,0"):
+            if tag in self._blocks:
+                return self._blocks[tag].key
+        return None
+
+    def _restore_scroll(self, key):
+        if key is None:
+            return
+        for tag, block in self._blocks.items():
+            ranges = self.text.tag_ranges(tag) if block.key == key else None
+            if ranges:
+                self.text.yview(ranges[0])
+                return
+
+    def _format_warning(self, warning, last, block_tag=None, is_new=False):
+        prepared_enabler = f"[{warning.enabled_by}] " if warning.enabled_by is not None else ""
+        prepared_msg = (warning.msg.splitlines() or [""])[0]
         title = rst_utils.escape(prepared_enabler + prepared_msg)
-        if warning.get("lineno") is not None:
-            url = self._format_file_url(warning)
-            if warning.get("lineno"):
-                title = "`Line %d <%s>`__ : %s" % (warning["lineno"], url, title)
-
-        if warning.get("explanation_rst"):
-            explanation_rst = warning["explanation_rst"]
-        elif warning.get("explanation"):
-            explanation_rst = rst_utils.escape(warning["explanation"])
+        if warning.lineno:
+            url = format_file_url(warning.filename, warning.lineno, warning.col_offset)
+            title = "`Line %d <%s>`__ : %s" % (warning.lineno, url, title)
+        if is_new:
+            title += " :light:`(new)`"
+
+        explanation_rst = warning.get_explanation_rst(wait=False)
+        if explanation_rst is None:
+            # EduLint's explanations are still being loaded, it's looked up when the topic is opened
+            lazy_explanation, lazy_key = warning, (warning.code, warning.more_info_url)
+            topic_class = "toggle"
         else:
-            explanation_rst = ""
-
-        if warning.get("more_info_url"):
-            explanation_rst += "\n\n`More info online <%s>`__" % warning["more_info_url"]
+            explanation_rst = _with_more_info(explanation_rst, warning.more_info_url)
+            lazy_explanation = lazy_key = explanation_rst
+            topic_class = "toggle" if explanation_rst else "empty"
 
-        explanation_rst = explanation_rst.strip()
-        topic_class = "toggle" if explanation_rst else "empty"
-        if not explanation_rst:
+        if not lazy_explanation:
             explanation_rst = "n/a"
+        else:
+            index = self._lazy_explanation_ids.setdefault(lazy_key, len(self._lazy_explanations))
+            if index == len(self._lazy_explanations):
+                self._lazy_explanations.append(lazy_explanation)
+            explanation_rst = "%s%d%s" % (LAZY_EXPLANATION_MARKER, index, LAZY_EXPLANATION_MARKER)
 
         return (
             ".. topic:: %s\n" % title
             + "    :class: "
             + topic_class
             + ("" if last else ", tight")
+            + (", " + block_tag if block_tag else "")
             + "\n"
             + "    \n"
             + textwrap.indent(explanation_rst, "    ")
             + "\n\n"
         )
 
+    def _render_later(self, item):
+        """Queues an RST fragment (rendered with the prelude) or a callable to be rendered after what is queued already."""
+        self._render_queue.append(item)
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render_pending)
+
+    def _render_pending(self):
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+
+        deadline = time.perf_counter() + RENDER_SLICE_SECONDS
+        while self._render_queue and time.perf_counter() < deadline:
+            if callable(self._render_queue[0]):
+                self._render_queue.popleft()()
+                continue
+
+            chunk = []
+            while self._render_queue and isinstance(self._render_queue[0], str) and len(chunk) < self._render_chunk_size:
+                chunk.append(self._render_queue.popleft())
+            started = time.perf_counter()
+            self.text.append_rst(self._get_rst_prelude() + "".join(chunk))
+            # aim for chunks taking a third of a slice
+            per_fragment = max((time.perf_counter() - started) / len(chunk), 1e-5)
+            self._render_chunk_size = max(1, min(100, int(RENDER_SLICE_SECONDS / 3 / per_fragment)))
+
+        self._bind_lazy_explanations()
+        if self._render_queue:
+            self._render_job = self.after_idle(self._render_pending)
+
+    def _cancel_rendering(self):
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+        self._render_queue.clear()
+
+    def _bind_lazy_explanations(self):
+        # toggle topics are rendered with a label (the +/- box) at the start of their title
+        for window_name in map(str, self.text.window_names()):
+            if window_name in self._bound_toggles:
+                continue
+            self._bound_toggles.add(window_name)
+
+            for tag in self.text.tag_names(window_name):
+                if tag.startswith("_UT_") and tag.endswith("_title"):
+                    body_tag = tag[: -len("_title")] + "_body"
+                    self.text.nametowidget(window_name).bind(
+                        "<1>", lambda event, body_tag=body_tag: self._expand_lazy_explanation(body_tag), True
+                    )
+                    break
+
+    def _expand_lazy_explanation(self, body_tag):
+        ranges = self.text.tag_ranges(body_tag)
+        if not ranges:
+            return
+        start, end = ranges[0], ranges[-1]
+
+        match = _LAZY_EXPLANATION_RE.search(self.text.get(start, end))
+        if match is None:
+            return  # already expanded
+
+        index = int(match.group(1))
+        explanation = self._lazy_explanations[index]
+        if isinstance(explanation, Finding):
+            explanation_rst = explanation.get_explanation_rst(wait=False)
+            if explanation_rst is None:
+                # the marker stays until the explanations are loaded
+                self.after(200, lambda: self._expand_lazy_explanation(body_tag))
+                return
+            explanation = _with_more_info(explanation_rst, explanation.more_info_url) or "n/a"
+            self._lazy_explanations[index] = explanation
+
+        self.text.direct_delete(start, end)
+        self.text.mark_set("lazy_explanation", start)
+        self.text.mark_gravity("lazy_explanation", "right")
+        block_tags = tuple(tag for tag in self.text.tag_names(start) if tag.startswith(BLOCK_TAG_PREFIX))
+        self.text.insert_rst(
+            "lazy_explanation",
+            self._get_rst_prelude() + explanation,
+            (body_tag, "topic_body") + block_tags,
+        )
+
     def _append_feedback_link(self):
         self._append_text("Was it helpful or confusing?\n", ("a", "feedback_link"))
 
-    def _format_file_url(self, atts):
-        return format_file_url(atts["filename"], atts.get("lineno"), atts.get("col_offset"))
-
     def _ask_feedback(self, event=None):
-        all_snapshots = self._snapshots_per_main_file[self._current_snapshot["main_file_path"]]
+        all_snapshots = self._snapshot_store.get_snapshots(self._current_snapshot_key) + [self._current_snapshot]
 
         # TODO: select only snapshots which are not sent yet
         snapshots = all_snapshots
@@ -276,7 +776,68 @@ class EduLintView(tktextext.TextFrame):
         return ".. default-role:: code\n\n" + ".. role:: light\n\n" + ".. role:: remark\n\n"
 
 
+class _TextInsertingAtMark:
+    """Lets rst_utils' rendering visitor, which always appends at the end, insert at a mark instead."""
+
+    def __init__(self, text, mark):
+        self._text = text
+        self._mark = mark
+
+    def _translate(self, index):
+        return self._mark if index in ("end", "end-1c") else index
+
+    def direct_insert(self, index, chars, tags=None, **kw):
+        self._text.direct_insert(self._translate(index), chars, tags, **kw)
+
+    def index(self, index):
+        return self._text.index(self._translate(index))
+
+    def __getitem__(self, key):
+        return self._text[key]
+
+    def __getattr__(self, name):
+        return getattr(self._text, name)
+
+    def __setattr__(self, name, value):
+        # e.g. tkinter's child counter, when the visitor creates the +/- label of a topic
+        if name in ("_text", "_mark"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._text, name, value)
+
+
 class EduLintRstText(rst_utils.RstText):
+    def insert_rst(self, mark, rst_source, global_tags=()):
+        """Like append_rst, but renders at the given mark (which should have right gravity)."""
+        try:
+            import docutils.core
+
+            doc = docutils.core.publish_doctree(rst_source)
+            visitor = self.create_visitor(doc, global_tags)
+            visitor.text = _TextInsertingAtMark(self, mark)
+            doc.walkabout(visitor)
+        except Exception:
+            logger.exception("Could not render explanation")
+            self.direct_insert(mark, rst_source + "\n", global_tags)
+
+    def create_visitor(self, doc, global_tags=()):
+        visitor = super().create_visitor(doc, global_tags)
+        visit_topic = visitor.visit_topic
+
+        def visit_topic_in_block(node):
+            # the topic of a warning has the tag of its block among its classes, see EduLintView._format_warning
+            block_tags = [cls for cls in node.attributes["classes"] if cls.startswith(BLOCK_TAG_PREFIX)]
+            for tag in block_tags:
+                visitor._add_tag(tag)
+            try:
+                return visit_topic(node)
+            finally:
+                for tag in block_tags:
+                    visitor._pop_tag(tag)
+
+        visitor.visit_topic = visit_topic_in_block
+        return visitor
+
     def configure_tags(self):
         super().configure_tags()
 
@@ -299,6 +860,13 @@ class EduLintRstText(rst_utils.RstText):
 class ProgramAnalyzer:
     def __init__(self, on_completion):
         self.completion_handler = on_completion
+        # may be called with preliminary warnings before completion_handler gets the final ones,
+        # set by the view after construction
+        self.partial_warnings_handler = None
+        # path -> SourceSnapshot of the analyzed files, as they were read when the analysis was requested
+        self.sources = {}
+        # directories imports are resolved from before the analyzed file's own one, like PYTHONPATH
+        self.import_dirs = []
         self.cancelled = False
 
     def is_enabled(self):
@@ -322,42 +890,37 @@ class SubprocessProgramAnalyzer(ProgramAnalyzer):
             self._proc.kill()
 
 
-def _get_imported_user_files(main_file, source=None):
+def _get_imported_user_files(main_file, source: Optional[SourceSnapshot] = None):
     assert os.path.isabs(main_file)
+    return import_graph.get_imported_files(main_file, source)
 
-    if source is None:
-        source = read_source(main_file)
 
-    try:
-        root = ast.parse(source, main_file)
-    except SyntaxError:
-        return set()
+def _analysis_fingerprint(source: SourceSnapshot) -> Optional[str]:
+    """Covers the main file and the user's modules it imports, as a change in either changes the result."""
+    return compute_cache_key(source.path, _get_imported_user_files(source.path, source), None, {source.path: source})
 
-    main_dir = os.path.dirname(main_file)
-    module_names = set()
-    # TODO: at the moment only considers non-package modules
-    for node in ast.walk(root):
-        if isinstance(node, ast.Import):
-            for item in node.names:
-                module_names.add(item.name)
-        elif isinstance(node, ast.ImportFrom):
-            module_names.add(node.module)
 
-    imported_files = set()
+def _is_local_cpython_backend():
+    from thonny.plugins.cpython_frontend import LocalCPythonProxy
 
-    for file in {name + ext for ext in [".py", ".pyw"] for name in module_names}:
-        possible_path = os.path.join(main_dir, file)
-        if os.path.exists(possible_path):
-            imported_files.add(possible_path)
-
-    return imported_files
-    # TODO: add recursion
+    return isinstance(get_runner().get_backend_proxy(), LocalCPythonProxy)
 
 
 def add_program_analyzer(cls):
     _program_analyzer_classes.append(cls)
 
 
+def _with_more_info(explanation_rst, more_info_url):
+    if more_info_url:
+        explanation_rst += "\n\n`More info online <%s>`__" % more_info_url
+    return explanation_rst.strip()
+
+
+def _as_findings(warnings):
+    # analyzers registered by other plugins may still report dicts
+    return [w if isinstance(w, Finding) else Finding.from_dict(w) for w in warnings]
+
+
 def format_file_url(filename, lineno, col_offset):
     s = "thonny-editor://" + rst_utils.escape(filename).replace(" ", "%20")
     if lineno is not None:
@@ -0,0 +1,243 @@
+"""Client side of the long-lived EduLint worker (see worker_server.py)."""
+import json
+import os
+import queue
+import subprocess
+import threading
+from logging import getLogger
+from typing import Callable, Dict, List, Optional, Sequence
+
+from thonny import get_workbench
+
+logger = getLogger("EduLint")
+
+WORKER_SERVER_PATH = os.path.join(os.path.dirname(__file__), "worker_server.py")
+
+# on_completion(out, err, failed) -- `failed` means the worker died and the request should be re-run elsewhere
+WorkerCallback = Callable[[str, str, bool], None]
+# on_partial(problems) -- preliminary problems in edulint's JSON format, final ones come in on_completion
+PartialCallback = Callable[[List[dict]], None]
+
+
+class EdulintWorker:
+    MAX_CRASHES = 3
+    POLL_DELAY_MS = 50
+
+    def __init__(self, python_executable: str, env: Dict[str, str]):
+        self._python_executable = python_executable
+        self._requested_env = dict(env)
+        self._env = dict(env)
+        self._env["PYTHONIOENCODING"] = "utf-8"
+
+        self._proc: Optional[subprocess.Popen] = None
+        self._generation = 0
+        self._n_crashes = 0
+        self._retired_generations = set()
+
+        self._next_id = 0
+        self._pending: Dict[int, dict] = {}
+        self._responses = queue.Queue()
+        self._polling = False
+
+    def is_usable(self) -> bool:
+        return self._n_crashes < self.MAX_CRASHES
+
+    def runs_with(self, python_executable: str, env: Dict[str, str]) -> bool:
+        return python_executable == self._python_executable and env == self._requested_env
+
+    def is_running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self):
+        self._generation += 1
+        generation = self._generation
+        logger.info("Starting EduLint worker process (generation %d).", generation)
+
+        try:
+            self._proc = subprocess.Popen(
+                [self._python_executable, WORKER_SERVER_PATH],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                encoding="utf-8",
+                env=self._env,
+            )
+        except OSError as e:
+            logger.error("Could not start EduLint worker: %s", e)
+            self._proc = None
+            # its requests fail the same way as if it exited right away
+            self._responses.put({"exited": True, "generation": generation})
+            return
+
+        def read_responses(stream):
+            for line in stream:
+                try:
+                    response = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    logger.error("EduLint worker sent malformed response: '%s'", line)
+                    continue
+                response["generation"] = generation
+                self._responses.put(response)
+            self._responses.put({"exited": True, "generation": generation})
+
+        def read_errors(stream):
+            for line in stream:
+                logger.debug("EduLint worker: %s", line.rstrip())
+
+        threading.Thread(target=read_responses, args=(self._proc.stdout,), daemon=True).start()
+        threading.Thread(target=read_errors, args=(self._proc.stderr,), daemon=True).start()
+
+    def _write(self, message: dict) -> bool:
+        try:
+            self._proc.stdin.write(json.dumps(message) + "\n")
+            self._proc.stdin.flush()
+            return True
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error("Could not write to EduLint worker: %s", e)
+            return False
+
+    def _send_request(self, request_id: int):
+        if not self.is_running():
+            self._start()
+
+        request = self._pending[request_id]
+        request["generation"] = self._generation
+        if self._proc is None:
+            return
+        self._write({
+            "id": request_id,
+            "command": "check",
+            "files": request["files"],
+            "options": request["options"],
+            "stream": request["on_partial"] is not None,
+            "paths": request["import_dirs"],
+        })
+
+    def submit(
+        self,
+        files: List[str],
+        options: List[str],
+        on_completion: WorkerCallback,
+        on_partial: Optional[PartialCallback] = None,
+        import_dirs: Sequence[str] = (),
+    ) -> int:
+        """import_dirs are searched for imports before the files' own directories, like PYTHONPATH."""
+        self._next_id += 1
+        request_id = self._next_id
+        self._pending[request_id] = {
+            "files": list(files),
+            "options": list(options),
+            "import_dirs": list(import_dirs),
+            "on_completion": on_completion,
+            "on_partial": on_partial,
+        }
+
+        self._send_request(request_id)
+        self._schedule_poll()
+        return request_id
+
+    def cancel(self, request_id: int):
+        """Cooperative cancel -- the worker skips the request (or drops its result), but keeps running."""
+        if self._pending.pop(request_id, None) is not None and self.is_running():
+            self._write({"id": request_id, "command": "cancel"})
+
+    def _retire(self):
+        if self.is_running():
+            self._write({"command": "shutdown"})
+        self._retired_generations.add(self._generation)
+        self._proc = None
+
+    def shutdown(self):
+        """Stops the worker, its unfinished requests fail so that they are re-run elsewhere."""
+        self._retire()
+        failed_requests = [self._pending[request_id] for request_id in sorted(self._pending)]
+        self._pending.clear()
+        for request in failed_requests:
+            request["on_completion"]("", "", True)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            get_workbench().after(self.POLL_DELAY_MS, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                response = self._responses.get_nowait()
+            except queue.Empty:
+                break
+            self._process_response(response)
+
+        if self._pending:
+            self._schedule_poll()
+
+    def _process_response(self, response: dict):
+        if response.get("exited"):
+            self._handle_exit(response["generation"])
+            return
+
+        if response["generation"] in self._retired_generations:
+            return
+
+        request_id = response.get("id")
+        if request_id not in self._pending:
+            return  # cancelled on our side
+
+        if response.get("restart"):
+            logger.info("EduLint version changed, restarting EduLint worker.")
+            self._retire()
+            self._start()
+            for pending_id in sorted(self._pending):
+                self._send_request(pending_id)
+            return
+
+        if response.get("cancelled"):
+            self._pending.pop(request_id)
+            return
+
+        if "partial" in response:
+            self._pending[request_id]["on_partial"](response["partial"])
+            return
+
+        request = self._pending.pop(request_id)
+        request["on_completion"](response.get("out", ""), response.get("err", ""), False)
+
+    def _handle_exit(self, generation: int):
+        if generation in self._retired_generations:
+            return  # a process we have already replaced
+
+        self._n_crashes += 1
+        logger.error("EduLint worker exited unexpectedly (%d. time).", self._n_crashes)
+        if generation == self._generation:
+            self._proc = None
+
+        # requests sent to a newer process are unaffected
+        failed_ids = [
+            request_id for request_id in sorted(self._pending) if self._pending[request_id]["generation"] == generation
+        ]
+        for request_id in failed_ids:
+            self._pending.pop(request_id)["on_completion"]("", "", True)
+
+
+_worker: Optional[EdulintWorker] = None
+
+
+def get_worker(python_executable: str, env: Dict[str, str]) -> Optional[EdulintWorker]:
+    """Returns the shared worker, or None if it's turned off or kept crashing and should not be used anymore.
+
+    A worker started with another interpreter or environment (e.g. after the user switched the
+    interpreter in Thonny's options) is replaced.
+    """
+    global _worker
+    enabled = get_workbench().get_option("edulint.use_warm_worker")
+    if _worker is not None and (not enabled or not _worker.runs_with(python_executable, env)):
+        _worker.shutdown()
+        _worker = None
+    if not enabled:
+        return None
+    if _worker is None:
+        _worker = EdulintWorker(python_executable, env)
+    if not _worker.is_usable():
+        return None
+    return _worker
@@ -0,0 +1,273 @@
+"""Long-lived EduLint process serving check requests over stdin/stdout.
+
+The process is started by thonnycontrib.edulint.worker with the same environment
+as the one-shot ``python -m edulint check --json`` call. It is run as a plain script,
+so it must not import anything from Thonny or from the rest of the plugin.
+
+Protocol (one JSON object per line):
+    request:  {"id": 1, "command": "check", "files": ["/abs/path.py"], "options": [], "stream": false, "paths": []}
+              -- "paths" are resolved imports from before the files' own directories, like PYTHONPATH
+    request:  {"id": 1, "command": "cancel"}
+    request:  {"command": "shutdown"}
+    response: {"id": 1, "partial": [<edulint problem>, ...]}  -- only if "stream" was requested
+    response: {"id": 1, "out": "<edulint --json output>", "err": "<stderr output>"}
+    response: {"id": 1, "cancelled": true}
+    response: {"id": 1, "restart": true}  -- edulint was upgraded, the process exits
+"""
+
+import copy
+import json
+import os
+import queue
+import sys
+import threading
+import traceback
+from contextlib import contextmanager
+from io import StringIO
+from typing import Callable, List, Optional, Tuple
+
+
+def get_installed_edulint_version() -> Optional[str]:
+    try:
+        from importlib.metadata import version
+        return version("edulint")
+    except Exception:
+        return None
+
+
+class CheckCancelled(Exception):
+    pass
+
+
+def _check_code_in_stages(files: List[str], options: List[str], on_partial: Callable[[List[dict]], None]):
+    """Same as edulint.check_code, but reports preliminary problems after each linter finishes.
+
+    Preliminary problems are not yet filtered by overrides between linters, so the final
+    result may differ from their union.
+    """
+    from loguru import logger
+    from edulint.config.config import get_cmd_args, get_config_many
+    from edulint.option_parses import get_option_parses
+    from edulint.options import Option
+    from edulint.linting import linting
+    from edulint.linting.overrides import get_overriders
+    from edulint.linting.problem import Problem
+    from edulint.linting.tweakers import get_tweakers
+
+    for path in files:
+        if not os.path.exists(path):
+            logger.critical(f"FileNotFoundError: {path}")
+            return None
+
+    file_configs = get_config_many(files, get_cmd_args(options), option_parses=get_option_parses())
+    tweakers = get_tweakers()
+
+    problems = []
+    try:
+        for files_or_dirs, config, lang_translations in file_configs:
+            stages = [linting.lint_edulint]
+            if not config[Option.NO_FLAKE8]:
+                stages.append(linting.lint_flake8)
+            stages.append(linting.lint_pylint)
+
+            partition_problems = []
+            for stage in stages:
+                stage_problems = stage(files_or_dirs, config)
+                partition_problems.extend(stage_problems)
+
+                preliminary = [
+                    linting.translate(lang_translations, problem)
+                    for problem in linting.apply_tweaks(copy.deepcopy(stage_problems), tweakers, config)
+                ]
+                if preliminary:
+                    on_partial(json.loads(Problem.schema().dumps(preliminary, many=True)))
+
+            result = linting.apply_overrides(partition_problems, get_overriders())
+            result = linting.apply_tweaks(result, tweakers, config)
+            problems.extend(
+                linting.translate(lang_translations, problem)
+                for problem in linting.sort(files_or_dirs, result)
+            )
+    except (TimeoutError, json.decoder.JSONDecodeError, linting.EduLintLinterFailedException) as e:
+        logger.critical(f"EduLint linting failed: {e}")
+        return None
+
+    return file_configs, linting.sort(files, problems)
+
+
+_original_get_ast = None
+
+
+def _undo_plugin_patches():
+    """edulint's patcher plugin wraps PyLinter.get_ast each time pylint registers it. In a long-lived
+    process the wrappers would pile up, running the analyses once more with every check."""
+    global _original_get_ast
+    from pylint.lint import PyLinter
+
+    if _original_get_ast is None:
+        _original_get_ast = PyLinter.get_ast
+    else:
+        PyLinter.get_ast = _original_get_ast
+
+
+@contextmanager
+def _prepended_sys_path(paths: List[str]):
+    if not paths:
+        yield
+        return
+    sys.path[:0] = paths
+    try:
+        yield
+    finally:
+        for path in paths:
+            try:
+                sys.path.remove(path)
+            except ValueError:
+                pass
+
+
+def check_to_json(
+    files: List[str],
+    options: List[str],
+    on_partial: Optional[Callable[[List[dict]], None]] = None,
+    paths: Optional[List[str]] = None,
+) -> Tuple[str, str]:
+    """Lints the files and returns the same stdout and stderr as `edulint check --json` would.
+
+    If on_partial is given, it is called with preliminary problems as the individual linters finish.
+    paths are put in front of sys.path for the check, as PYTHONPATH would be for `edulint check`.
+    """
+    with _prepended_sys_path(list(paths or [])):
+        return _check_to_json(files, options, on_partial)
+
+
+def _check_to_json(
+    files: List[str], options: List[str], on_partial: Optional[Callable[[List[dict]], None]]
+) -> Tuple[str, str]:
+    from loguru import logger
+    from edulint.edulint import check_code, to_json
+
+    err = StringIO()
+    logger.remove()
+    logger.add(err, level="WARNING", format="{name}: {message}", colorize=False, diagnose=False, backtrace=False, catch=False)
+
+    _undo_plugin_patches()
+    try:
+        import astroid
+        astroid.MANAGER.clear_cache()  # otherwise pylint would see stale versions of already linted modules
+    except Exception:
+        pass
+
+    result = None
+    if on_partial is not None:
+        try:
+            result = _check_code_in_stages(files, options, on_partial)
+        except (ImportError, AttributeError):  # edulint's internals changed, lint in one go
+            result = check_code(files, options)
+    else:
+        result = check_code(files, options)
+
+    if result is None:
+        return "", err.getvalue()
+    return to_json(*result) + "\n", err.getvalue()
+
+
+class WorkerServer:
+    def __init__(self, stdin, stdout):
+        self._stdin = stdin
+        self._stdout = stdout
+        self._requests = queue.Queue()
+        self._cancelled = set()
+        self._cancelled_lock = threading.Lock()
+
+        import edulint
+        self._loaded_version = edulint.__version__
+
+    def _send(self, response: dict):
+        self._stdout.write(json.dumps(response) + "\n")
+        self._stdout.flush()
+
+    def _read_requests(self):
+        for line in self._stdin:
+            try:
+                request = json.loads(line)
+            except json.decoder.JSONDecodeError:
+                continue
+
+            if request.get("command") == "cancel":
+                with self._cancelled_lock:
+                    self._cancelled.add(request.get("id"))
+            else:
+                self._requests.put(request)
+        self._requests.put({"command": "shutdown"})
+
+    def _is_cancelled(self, request_id) -> bool:
+        with self._cancelled_lock:
+            if request_id in self._cancelled:
+                self._cancelled.discard(request_id)
+                return True
+            return False
+
+    def serve(self):
+        threading.Thread(target=self._read_requests, daemon=True).start()
+
+        while True:
+            request = self._requests.get()
+            if request.get("command") == "shutdown":
+                return
+
+            request_id = request.get("id")
+            if self._is_cancelled(request_id):
+                self._send({"id": request_id, "cancelled": True})
+                continue
+
+            installed_version = get_installed_edulint_version()
+            if installed_version is not None and installed_version != self._loaded_version:
+                self._send({"id": request_id, "restart": True})
+                return
+
+            def send_partial(problems):
+                with self._cancelled_lock:
+                    if request_id in self._cancelled:
+                        raise CheckCancelled()
+                self._send({"id": request_id, "partial": problems})
+
+            # anything printed by the linters must not end up in the protocol stream
+            sys.stdout = sys.stderr
+            try:
+                out, err = check_to_json(
+                    request["files"],
+                    request.get("options", []),
+                    send_partial if request.get("stream") else None,
+                    request.get("paths", []),
+                )
+            except CheckCancelled:
+                out, err = "", ""
+            except Exception:
+                out, err = "", traceback.format_exc()
+            finally:
+                sys.stdout = self._stdout
+
+            if self._is_cancelled(request_id):
+                self._send({"id": request_id, "cancelled": True})
+            else:
+                self._send({"id": request_id, "out": out, "err": err})
+
+
+def main() -> int:
+    try:
+        from edulint.explanations import update_explanations
+        update_explanations(False)
+    except Exception:
+        traceback.print_exc()
+
+    WorkerServer(sys.stdin, sys.stdout).serve()
+    return 0
+
+
+if __name__ == "__main__":
+    # run as a script, the plugin's directory comes first on the path, where its modules (utils,
+    # plugin, view...) would shadow the student's ones
+    if sys.path and os.path.abspath(sys.path[0] or os.curdir) == os.path.dirname(os.path.abspath(__file__)):
+        del sys.path[0]
+    sys.exit(main())